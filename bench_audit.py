@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 19:42:18
+project: auto_send
+filename: bench_audit.py
+version: 1.0
+"""
+
+"""生成大量发送记录并测量按目标、按时间范围查询的耗时
+
+用法: python bench_audit.py [记录数] [目标数]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from audit import AuditLog
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label}: {len(result)} 条，{(time.perf_counter() - start) * 1000:.1f} ms")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    targets = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    random.seed(0)
+    end = datetime(2026, 10, 1)
+    start = end - timedelta(days=365)
+    step = (end - start) / count
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "audit.log")
+        log = AuditLog(path)
+        t0 = time.perf_counter()
+        for i in range(count):
+            at = start + step * i
+            log.append(
+                {
+                    "at": at.isoformat(timespec="milliseconds"),
+                    "job_id": None,
+                    "target": f"群{random.randrange(targets)}",
+                    "content_hash": None,
+                    "phases_ms": {"send": 0.05},
+                    "outcome": "sent",
+                }
+            )
+        print(f"写入 {count} 条: {time.perf_counter() - t0:.1f} s，"
+              f"数据 {os.path.getsize(path) / 1e6:.1f} MB，索引 {os.path.getsize(path + '.idx') / 1e6:.1f} MB")
+        log.close()
+
+        t0 = time.perf_counter()
+        log = AuditLog(path)
+        log.query("群0", limit=1)
+        print(f"重新打开并重建目标链头: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        quarter = end - timedelta(days=91)
+        timed("群7 最近一个季度", lambda: log.query("群7", quarter, end, limit=count))
+        timed("群7 最近 100 条", lambda: log.query("群7", limit=100))
+        timed("全部目标 某一天", lambda: log.query(None, quarter, quarter + timedelta(days=1), limit=count))
+        timed("全部目标 最近 1000 条", lambda: log.query(limit=1000))
+        log.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 20:31:07
+project: auto_send
+filename: bench_import.py
+version: 1.0
+"""
+
+"""生成大量任务行的 CSV，测量批量导入(校验 + 单事务写入任务库 + 加入调度)的耗时
+
+用法: python bench_import.py [行数]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import importer
+from engine import JobEngine
+from job_store import JobStore
+
+
+def write_rows(path, count):
+    start = datetime.now() + timedelta(days=1)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["目标", "内容", "类型", "发送时间", "日期", "每天发送时间", "规则"])
+        for i in range(count):
+            kind = i % 4
+            if kind == 0:
+                at = (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+                writer.writerow([f"群{i}", f"通知 {i}", "", at, "", "", ""])
+            elif kind == 1:
+                writer.writerow([f"群{i};群{i + 1}", f"周报 {i}", "每周", "", "0,4", "08:00", ""])
+            elif kind == 2:
+                writer.writerow([f"群{i}", f"月报 {i}", "每月", "", "-1", "17:30", ""])
+            else:
+                writer.writerow([f"群{i}", f"提醒 {i}", "", "", "", "", f"{i % 60} 9 * * 1-5"])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.csv")
+        write_rows(path, count)
+        print(f"CSV {count} 行，{os.path.getsize(path) / 1e6:.1f} MB")
+
+        result = importer.load_file(path)
+        print(f"校验: {result.summary()}")
+
+        store = JobStore(os.path.join(tmp, "jobs.db"))
+        engine = JobEngine(lambda job, fire_time: None, lambda job: 5.0, store=store)
+        t0 = time.perf_counter()
+        added = engine.add_jobs(result.jobs)
+        print(f"写入任务库并加入调度: {len(added)} 个，{time.perf_counter() - t0:.2f} s")
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
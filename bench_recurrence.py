@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 17:26:32
+project: auto_send
+filename: bench_recurrence.py
+version: 1.0
+"""
+
+"""测量编译后的循环规则计算下一次发送时间的速度
+
+用法: python bench_recurrence.py [规则数]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from recurrence import compile_rule
+
+RULES = [
+    "0 9 * * 1-5",
+    "30 8 L * *",
+    "0 18 LW * *",
+    "0 10 * * 5L",
+    "0 10 * * 1#2",
+    "*/15 8-18 * * 1-5",
+    "0 0 13 * 5",
+    "0 12 1,15 */2 *",
+    "0 9 29 2 *",
+    "FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1;BYHOUR=17",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;BYHOUR=9",
+    "FREQ=DAILY;INTERVAL=3;BYHOUR=8",
+    "FREQ=MONTHLY;BYMONTHDAY=13;BYDAY=FR;BYHOUR=9",
+]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    random.seed(0)
+    start = datetime(2026, 1, 1)
+
+    t0 = time.perf_counter()
+    compiled = [compile_rule(RULES[i % len(RULES)], start) for i in range(count)]
+    compile_ms = (time.perf_counter() - t0) * 1000
+    nows = [start + timedelta(seconds=random.randint(0, 365 * 86400)) for _ in range(count)]
+
+    t0 = time.perf_counter()
+    fires = [rule.next_after(now) for rule, now in zip(compiled, nows)]
+    next_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"{count} 条规则: 编译 {compile_ms:.1f} ms，求下一次发送时间 {next_ms:.1f} ms")
+    print(f"  每条平均 {next_ms * 1000 / count:.2f} us，无发送时间 {fires.count(None)} 条")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 10:41:03
+project: auto_send
+filename: bench_send.py
+version: 1.0
+"""
+
+"""用模拟输入后端测量整个调度器的端到端发送延迟和抖动，无需 Windows 桌面
+
+用法: python bench_send.py [任务数] [任务间隔秒] [注入按键延迟毫秒]
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+from input_backend import SimulatedBackend
+from scheduler import WeChatScheduler
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+    key_latency = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+
+    app = QCoreApplication(sys.argv)
+    backend = SimulatedBackend(
+        latency={"press": key_latency, "write": key_latency}, sleep_scale=0
+    )
+    scheduler = WeChatScheduler(backend=backend)
+    scheduler.update_delays({"prepare_pre_time": 1.0})
+
+    start = datetime.now() + timedelta(seconds=2)
+    scheduled = [start + timedelta(seconds=i * interval) for i in range(count)]
+    for i, fire_time in enumerate(scheduled):
+        scheduler.start_once_schedule(f"bench-{i}", f"消息 {i}", fire_time)
+
+    QTimer.singleShot(int((2 + count * interval + 2) * 1000), app.quit)
+    app.exec_()
+
+    # monotonic 时间戳换算为墙上时间，与计划发送时间对比
+    offset_ns = time.time_ns() - time.monotonic_ns()
+    sends = backend.events_of("press", scheduler.shortcuts["send_message"])
+    errors_ms = [
+        ((ts + offset_ns) / 1e9 - fire_time.timestamp()) * 1000
+        for (ts, _, _), fire_time in zip(sends, scheduled)
+    ]
+    print(f"计划发送 {count} 条，实际发送 {len(sends)} 条")
+    if errors_ms:
+        print(f"发送误差(毫秒): 平均 {statistics.mean(errors_ms):.3f}")
+        print(f"  最小 {min(errors_ms):.3f}, 最大 {max(errors_ms):.3f}")
+        if len(errors_ms) > 1:
+            print(f"  抖动(标准差) {statistics.stdev(errors_ms):.3f}")
+    print("各阶段耗时(毫秒):")
+    for phase, summary in scheduler.latency_stats()["phases"].items():
+        print(
+            f"  {phase:<10} p50 {summary['p50_ms']:.3f}  p95 {summary['p95_ms']:.3f}"
+            f"  p99 {summary['p99_ms']:.3f}  max {summary['max_ms']:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
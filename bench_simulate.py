@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 22:06:40
+project: auto_send
+filename: bench_simulate.py
+version: 1.0
+"""
+
+"""生成大量循环/一次性任务，用虚拟时钟模拟若干天并测量耗时
+
+用法: python bench_simulate.py [任务数] [天数]
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, time, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from engine import Job, ONCE, WEEKLY, MONTHLY, RULE
+from simulate import simulate
+
+
+def make_jobs(count, start, days):
+    jobs = []
+    for i in range(count):
+        kind = i % 4
+        send_time = time(random.randrange(7, 21), random.choice((0, 15, 30, 45)))
+        if kind == 0:
+            jobs.append(Job(f"群{i}", "早上好", WEEKLY, days=random.sample(range(7), 3), send_time=send_time))
+        elif kind == 1:
+            jobs.append(Job(f"群{i}", "月报", MONTHLY, days=[1, 15, -1], send_time=send_time))
+        elif kind == 2:
+            rule = f"{random.randrange(60)} {random.randrange(8, 18)} * * 1-5"
+            jobs.append(Job(f"群{i}", "提醒", RULE, scheduled_time=start, rule=rule))
+        else:
+            at = start + timedelta(minutes=random.randrange(int(days * 1440)))
+            jobs.append(Job(f"群{i}", "通知", ONCE, scheduled_time=at))
+    return jobs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    days = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    random.seed(0)
+    start = datetime(2026, 11, 1)
+    jobs = make_jobs(count, start, days)
+    report = simulate(jobs, days, start)
+    print(report.summary(top=5))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 15:12:40
+project: auto_send
+filename: bench_startup.py
+version: 1.0
+"""
+
+"""测量启动耗时: 按模块的导入耗时(-X importtime)、首帧绘制时间和无界面核心的导入耗时
+
+用法: python bench_startup.py [重复次数] [--top N] [--budget 毫秒]
+超过 --budget 给定的首帧绘制预算时返回非零退出码，可用于发现启动耗时回退。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "src")
+
+# 这些模块不应在首帧之前导入，出现即说明懒加载被破坏
+DEFERRED_MODULES = ("win32gui", "win32api", "win32clipboard", "win32process", "keyboard", "sqlite3")
+FIRST_PAINT_MARKER = "startup: first paint"  # 与 src/main.py 一致
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回首帧前后各自的 {模块: (自身微秒, 累计微秒)}"""
+    before, after = {}, {}
+    modules = before
+    for line in stderr.splitlines():
+        if line.strip() == FIRST_PAINT_MARKER:
+            modules = after
+            continue
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        modules[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return before, after
+
+
+def run_gui(workdir):
+    env = dict(os.environ, AUTO_SEND_STARTUP_BENCH="1")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(SRC, "main.py")],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        timeout=60,
+    )
+    metrics = {}
+    for line in proc.stdout.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            metrics[key.strip()] = float(value)
+    if "first_paint_ms" not in metrics:
+        raise RuntimeError(f"未得到首帧绘制时间:\n{proc.stdout}\n{proc.stderr[-2000:]}")
+    return metrics, parse_importtime(proc.stderr)
+
+
+def run_headless(workdir):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import core"],
+        cwd=workdir,
+        env=dict(os.environ, PYTHONPATH=SRC),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        timeout=60,
+    )
+    return parse_importtime(proc.stderr)[0]
+
+
+def print_breakdown(title, modules, top):
+    print(title)
+    ranked = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    print(f"  {'累计(毫秒)':>10} {'自身(毫秒)':>10}  模块")
+    for name, (self_us, cumulative_us) in ranked[:top]:
+        print(f"  {cumulative_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("repeat", nargs="?", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="列出累计导入耗时最高的 N 个模块")
+    parser.add_argument("--budget", type=float, default=None, help="首帧绘制预算(毫秒)，按中位数比较")
+    args = parser.parse_args()
+
+    paints, restores = [], []
+    modules, deferred = {}, {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(max(1, args.repeat)):
+            metrics, (modules, deferred) = run_gui(workdir)
+            paints.append(metrics["first_paint_ms"])
+            restores.append(metrics.get("restore_jobs_ms", 0.0))
+        headless = run_headless(workdir)
+
+    print_breakdown("界面启动路径的导入耗时(最后一次运行):", modules, args.top)
+    print_breakdown("首帧之后的导入耗时:", deferred, min(args.top, 10))
+    print_breakdown("无界面核心(import core)的导入耗时:", headless, min(args.top, 10))
+
+    leaked = [name for name in DEFERRED_MODULES if name in modules]
+    if leaked:
+        print(f"警告: 以下模块本应延迟导入，却在首帧前导入: {', '.join(leaked)}")
+    if any(name.startswith("PyQt5") for name in headless):
+        print("警告: 无界面核心导入了 PyQt5")
+
+    paint = statistics.median(paints)
+    print(f"运行 {len(paints)} 次")
+    print(f"首帧绘制(毫秒): 中位数 {paint:.1f}, 最小 {min(paints):.1f}, 最大 {max(paints):.1f}")
+    print(f"首帧后恢复任务(毫秒): 中位数 {statistics.median(restores):.1f}")
+    if args.budget is not None and paint > args.budget:
+        print(f"超出首帧绘制预算 {args.budget:.1f} 毫秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
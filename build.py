@@ -32,8 +32,9 @@ auto_send_build = [
     "--hidden-import=PyQt5.QtGui",
     "--hidden-import=PyQt5.QtWidgets",
     "--hidden-import=keyboard",
-    "--hidden-import=pyautogui",
-    # "--exclude-module=tkinter",
+    # 未使用的大模块不打包，减少 --onefile 启动时的解压量
+    "--exclude-module=pyautogui",
+    "--exclude-module=tkinter",
     # "--exclude-module=unittest",
     # "--exclude-module=numpy",
     "--distpath=./dist",  # 输出目录
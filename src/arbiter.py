@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 16:48:10
+project: auto_send
+filename: arbiter.py
+version: 1.0
+"""
+
+"""键盘/焦点独占资源的最早截止时间优先(EDF)规划
+
+同一时刻只有一个任务能操作键盘，且从开始准备一直占用到发送完成(输入框里的内容必须先发出)，
+因此各任务按发送时刻排序后，占用区间只能依次排列。输入通道按发送截止时刻的优先级出队，
+调度引擎在某任务到准备时刻时连带分发所有发送时刻更早的任务，执行顺序与这里的规划一致。
+"""
+from datetime import datetime, timedelta
+
+
+class Slot:
+    """一个任务的键盘占用区间: start 开始准备, ready 准备完成, release 发送完成并释放键盘"""
+
+    def __init__(self, job_id, fire_time, start, ready, release, blocked_by=None):
+        self.job_id = job_id
+        self.fire_time = fire_time
+        self.start = start
+        self.ready = ready
+        self.release = release
+        self.blocked_by = blocked_by  # 需等待其释放键盘的任务ID，None 表示不受影响
+
+    @property
+    def late_seconds(self):
+        return max(0.0, (self.ready - self.fire_time).total_seconds())
+
+    @property
+    def feasible(self):
+        return self.ready <= self.fire_time
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "fire_time": self.fire_time.isoformat(),
+            "start": self.start.isoformat(),
+            "ready": self.ready.isoformat(),
+            "release": self.release.isoformat(),
+            "blocked_by": self.blocked_by,
+            "late_seconds": self.late_seconds,
+        }
+
+
+def plan_slots(entries, now=None):
+    """按 EDF 排列键盘占用区间
+
+    entries: [(job_id, fire_time, lead, prepare_seconds, hold_seconds)]
+        lead 为配置的提前准备秒数，提前量不足以完成准备时按 prepare_seconds 提前开始；
+        hold_seconds 为到发送时刻后仍占用键盘的时间(发送本身、群发的其余目标)。
+    返回按发送时刻排序的 Slot 列表。
+    """
+    now = now or datetime.now()
+    slots = []
+    free_at = now
+    previous = None
+    for job_id, fire_time, lead, prepare, hold in sorted(entries, key=lambda e: e[1]):
+        natural = fire_time - timedelta(seconds=max(lead, prepare))
+        start = max(natural, free_at)
+        blocked_by = previous if free_at > natural and previous is not None else None
+        ready = start + timedelta(seconds=prepare)
+        free_at = max(ready, fire_time) + timedelta(seconds=hold)
+        slots.append(Slot(job_id, fire_time, start, ready, free_at, blocked_by))
+        previous = job_id
+    return slots
+
+
+def conflicts(slots):
+    """无法按时完成准备的区间"""
+    return [slot for slot in slots if not slot.feasible]
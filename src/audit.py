@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 19:14:52
+project: auto_send
+filename: audit.py
+version: 1.0
+"""
+
+"""只追加的发送记录，附带按时间和目标的索引文件
+
+数据文件每行一条紧凑 JSON；索引文件为定长记录:
+    (时间毫秒, 目标哈希, 同一目标上一条记录的序号, 数据偏移, 数据长度)
+时间按写入顺序不减，按时间查询用二分查找；同一目标的记录通过"上一条"序号串成链，
+按目标查询只访问该目标的记录，与总记录数无关。查询通过 mmap 读取两个文件。
+"""
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+from tracing import SEND
+
+_INDEX = struct.Struct("<qQqQI")
+
+
+def target_key(target):
+    digest = hashlib.blake2b(target.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def content_hash(content):
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+class _TimeView:
+    """让 bisect 按序号读取 mmap 索引中的时间"""
+
+    def __init__(self, index, count):
+        self.index = index
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return _INDEX.unpack_from(self.index, i * _INDEX.size)[0]
+
+
+class AuditLog:
+    """发送记录文件 path 及其索引 path + ".idx"，可在多个线程中写入和查询"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        self._heads = None  # 目标哈希 -> 最后一条记录的序号，首次使用时由索引重建
+        self._recover()
+        self._data = open(self.path, "ab")
+        self._index = open(self.index_path, "ab")
+
+    def _recover(self):
+        """截掉写了一半的索引记录；数据文件中已完整写入但未进索引的记录补进索引"""
+        for path in (self.path, self.index_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        size = os.path.getsize(self.index_path)
+        self._count = size // _INDEX.size
+        if size % _INDEX.size:
+            with open(self.index_path, "r+b") as f:
+                f.truncate(self._count * _INDEX.size)
+        end, self._last_ms = 0, 0
+        if self._count:
+            with open(self.index_path, "rb") as f:
+                f.seek((self._count - 1) * _INDEX.size)
+                ts, _, _, offset, length = _INDEX.unpack(f.read(_INDEX.size))
+            end, self._last_ms = offset + length, ts
+        with open(self.path, "r+b") as f:
+            f.seek(end)
+            tail = f.read()
+            complete = tail[: tail.rfind(b"\n") + 1]
+            f.truncate(end + len(complete))
+        if complete:
+            self._heads = self._build_heads()
+            with open(self.index_path, "ab") as index:
+                offset = end
+                for line in complete.splitlines(keepends=True):
+                    record = json.loads(line)
+                    index.write(self._index_entry(record, offset, len(line)))
+                    offset += len(line)
+
+    def _build_heads(self):
+        heads = {}
+        if self._count:
+            with open(self.index_path, "rb") as f:
+                data = f.read(self._count * _INDEX.size)
+            for i, (_, key, _, _, _) in enumerate(_INDEX.iter_unpack(data)):
+                heads[key] = i
+        return heads
+
+    def _index_entry(self, record, offset, length):
+        # 调用方持有锁(或在初始化中)，更新链头、序号和时间
+        if self._heads is None:
+            self._heads = self._build_heads()
+        ts = max(_ms(datetime.fromisoformat(record["at"])), self._last_ms)
+        key = target_key(record["target"])
+        entry = _INDEX.pack(ts, key, self._heads.get(key, -1), offset, length)
+        self._heads[key] = self._count
+        self._count += 1
+        self._last_ms = ts
+        return entry
+
+    def append(self, record):
+        """追加一条记录，record 至少包含 at(ISO 时间) 和 target"""
+        text = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        line = (text + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(line)
+            self._data.flush()
+            self._index.write(self._index_entry(record, offset, len(line)))
+            self._index.flush()
+
+    def __len__(self):
+        return self._count
+
+    def query(self, target=None, since=None, until=None, limit=1000):
+        """按时间倒序返回记录，可限定目标及 [since, until] 时间范围"""
+        with self._lock:
+            if self._heads is None:
+                self._heads = self._build_heads()
+            count = self._count
+            head = self._heads.get(target_key(target), -1) if target is not None else None
+        if not count:
+            return []
+        low = _ms(since) if since else None
+        high = _ms(until) if until else None
+        results = []
+        with open(self.index_path, "rb") as fi, open(self.path, "rb") as fd:
+            index = mmap.mmap(fi.fileno(), count * _INDEX.size, access=mmap.ACCESS_READ)
+            data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if target is not None:
+                    i = head
+                else:
+                    i = count - 1
+                    if high is not None:
+                        i = bisect.bisect_right(_TimeView(index, count), high) - 1
+                while i >= 0 and len(results) < limit:
+                    ts, _, prev, offset, length = _INDEX.unpack_from(index, i * _INDEX.size)
+                    if low is not None and ts < low:
+                        break
+                    i = prev if target is not None else i - 1
+                    if high is not None and ts > high:
+                        continue
+                    record = json.loads(data[offset : offset + length])
+                    if target is None or record["target"] == target:
+                        results.append(record)
+            finally:
+                index.close()
+                data.close()
+        return results
+
+    def close(self):
+        with self._lock:
+            self._data.close()
+            self._index.close()
+
+
+def cycle_record(cycle):
+    """把结束的 SendCycle 转为发送记录，实际发送时间取 send 阶段的开始时刻"""
+    offset_ns = time.time_ns() - time.monotonic_ns()
+    scheduled_time = cycle.scheduled_time
+    send = next((s for s in cycle.spans if s.phase == SEND), None)
+    fired = datetime.fromtimestamp((send.start_ns + offset_ns) / 1e9) if send else None
+    record = {
+        "at": (fired or datetime.now()).isoformat(timespec="milliseconds"),
+        "job_id": cycle.job_id,
+        "key": cycle.key,
+        "target": cycle.target,
+        "content_hash": content_hash(cycle.content) if cycle.content is not None else None,
+        "scheduled": scheduled_time.isoformat(timespec="milliseconds") if scheduled_time else None,
+        "fired": fired.isoformat(timespec="milliseconds") if fired else None,
+        "phases_ms": {
+            phase: round(seconds * 1000, 3) for phase, seconds in cycle.durations().items()
+        },
+        "outcome": cycle.outcome,
+    }
+    if fired and scheduled_time:
+        record["fire_error_ms"] = round((fired - scheduled_time).total_seconds() * 1000, 3)
+    return record
+
+
+def format_record(record):
+    """一行文字描述，用于命令行和界面"""
+    error = record.get("fire_error_ms")
+    error = f"  误差 {error:+.3f}ms" if error is not None else ""
+    job = record.get("job_id") or "-"
+    return f"{record['at']}  {record['outcome']:<14} {record['target']}  [{job}]{error}"
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 14:36:08
+project: auto_send
+filename: auto_send.py
+version: 1.0
+"""
+
+"""无界面命令行 / 守护进程入口，全程不导入 PyQt
+
+在 src 目录下运行:
+    python -m auto_send run jobs.json [--db jobs.db] [--simulate]   载入任务文件并运行到全部完成
+    python -m auto_send daemon [--db jobs.db] [--simulate]          持续运行任务库中的任务
+        run/daemon 加 --metrics-port 端口 时在 http://127.0.0.1:端口/metrics 输出指标
+        run/daemon/send 加 --profile-cycles [目录] 时为每个发送周期写出折叠栈和 speedscope 文件
+    python -m auto_send send 目标 内容 [--simulate]                  立即发送，多个目标用分号分隔
+    python -m auto_send list [--db jobs.db]                         列出任务库中的任务
+    python -m auto_send preview "0 9 * * 1-5" [-n 10]               预览规则接下来的发送时间
+    python -m auto_send history [--target 群A] [--since 2026-07-01] [--until ...] [-n 100]
+                                                                    查询发送记录
+    python -m auto_send import jobs.csv [--db jobs.db] [--dry-run]  从 CSV/XLSX 批量导入到任务库
+    python -m auto_send simulate [jobs.json] [--db jobs.db] [--days 30] [--start 2026-11-01] [--report r.csv]
+                                                                    用虚拟时钟模拟计划，报告每次发送和冲突
+    python -m auto_send calibrate 目标 [--rounds 10] [--confidence 0.95] [--profile 名称]
+                                                                    校准延时并保存为命名配置
+
+任务文件为 JSON 列表，每项如:
+    {"target": "项目群", "content": "早上好", "kind": "weekly", "days": [0, 4], "send_time": "08:00:00"}
+    {"target": ["群A", "群B"], "content": "通知", "kind": "once", "scheduled_time": "2026-10-20T09:30:00"}
+    {"target": "项目群", "content": "周报", "kind": "rule", "rule": "FREQ=MONTHLY;BYDAY=FR;BYSETPOS=-1;BYHOUR=17"}
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import sys
+import threading
+import time
+from datetime import datetime
+
+from config import (
+    AUDIT_LOG_PATH,
+    JOB_DB_PATH,
+    CALIBRATION_ROUNDS,
+    CALIBRATION_CONFIDENCE,
+    METRICS_PORT,
+    PROFILE_DIR,
+)
+from core import SchedulerCore, IDLE
+from engine import Job
+
+
+def load_job_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [Job.from_dict(item) for item in json.load(f)]
+
+
+def _make_core(args, on_status=None):
+    backend = None
+    if args.simulate:
+        from input_backend import SimulatedBackend
+
+        backend = SimulatedBackend(sleep_scale=0)
+    store = None
+    if getattr(args, "db", None):
+        from job_store import JobStore
+
+        store = JobStore(args.db)
+    core = SchedulerCore(backend, store, on_status=on_status)
+    # 模拟发送不写入真实的发送记录，否则其幂等键会让之后的真实发送被当作重复跳过
+    if AUDIT_LOG_PATH and not args.simulate:
+        from audit import AuditLog
+
+        core.attach_audit(AuditLog(AUDIT_LOG_PATH))
+    if getattr(args, "metrics_port", None) is not None:
+        core.start_metrics(args.metrics_port)
+    if getattr(args, "profile_cycles", None):
+        core.enable_profiling(args.profile_cycles)
+    return core
+
+
+def _wait(event, done=None):
+    """等待 event；给出 done 时以 done() 为准，event 只用于及时唤醒"""
+    try:
+        if done is None:
+            while not event.wait(1.0):
+                pass
+            return
+        while True:
+            event.clear()
+            if done():
+                return
+            event.wait(1.0)
+    except KeyboardInterrupt:
+        print("已中断", flush=True)
+
+
+def cmd_run(args):
+    idle = threading.Event()
+    core = _make_core(args, on_status=lambda s: idle.set() if s == IDLE else None)
+    core.load_jobs()
+    added = [core.add_job(job) for job in load_job_file(args.jobs)]
+    if not any(added) and not core.engine.has_jobs():
+        core.shutdown()
+        return 1
+    # 任务库中载入的任务可能在文件中的任务加入前就已完成并发出空闲状态，以核心的实际状态为准
+    _wait(idle, core.is_idle)
+    core.shutdown()
+    return 0
+
+
+def cmd_daemon(args):
+    core = _make_core(args)
+    core.load_jobs()
+    _wait(threading.Event())
+    core.shutdown()
+    return 0
+
+
+def cmd_send(args):
+    core = _make_core(args)
+    targets = [t.strip() for t in args.target.replace("；", ";").split(";") if t.strip()]
+    if len(targets) > 1:
+        broadcast_id = core.message_broadcast(targets, args.content)
+        while broadcast_id and not core.get_broadcast(broadcast_id).done:
+            time.sleep(0.2)
+    else:
+        core.message_send_immed(targets[0] if targets else "", args.content).join()
+    core.shutdown()
+    return 0
+
+
+def cmd_list(args):
+    from job_store import JobStore
+
+    store = JobStore(args.db)
+    for job in store.load():
+        next_fire = job.next_fire.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] if job.next_fire else "-"
+        print(f"{next_fire}  {job.describe()}")
+    store.close()
+    return 0
+
+
+def cmd_preview(args):
+    import recurrence
+
+    try:
+        rule = recurrence.compile_rule(args.rule)
+    except ValueError as e:
+        print(f"规则无效: {e}", file=sys.stderr)
+        return 2
+    fires = rule.preview(args.n)
+    for fire in fires:
+        print(fire.strftime("%Y-%m-%d %a %H:%M:%S.%f")[:-3])
+    if not fires:
+        print("该规则没有可发送的时间")
+    return 0
+
+
+def cmd_calibrate(args):
+    core = _make_core(args)
+    task = core.calibrate_delays(args.target, args.rounds, args.confidence, profile=args.profile)
+    if task is None:
+        core.shutdown()
+        return 1
+    task.join()
+    core.shutdown()
+    if task.error is not None:
+        return 1
+    _, proposed = task.result
+    print(json.dumps(proposed, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_history(args):
+    from audit import AuditLog, format_record
+
+    log = AuditLog(args.log)
+    since = datetime.fromisoformat(args.since) if args.since else None
+    until = datetime.fromisoformat(args.until) if args.until else None
+    for record in log.query(args.target, since, until, args.n):
+        print(format_record(record))
+    log.close()
+    return 0
+
+
+def cmd_import(args):
+    import importer
+    from job_store import JobStore
+
+    try:
+        result = importer.load_file(args.file)
+    except (OSError, ValueError) as e:
+        print(f"无法导入: {e}", file=sys.stderr)
+        return 2
+    for number, message in result.errors:
+        print(f"第 {number} 行: {message}", file=sys.stderr)
+    print(result.summary())
+    if args.dry_run or not result.jobs:
+        return 1 if result.errors else 0
+    store = JobStore(args.db)
+    start = time.perf_counter()
+    store.save_many(result.jobs)
+    store.close()
+    print(f"已写入任务库 {args.db}: {len(result.jobs)} 个任务，耗时 {time.perf_counter() - start:.2f}秒")
+    return 1 if result.errors else 0
+
+
+def cmd_simulate(args):
+    from simulate import simulate
+
+    if args.jobs:
+        jobs = load_job_file(args.jobs)
+    else:
+        from job_store import JobStore
+
+        store = JobStore(args.db)
+        jobs = store.load()
+        store.close()
+    start = datetime.fromisoformat(args.start) if args.start else None
+    report = simulate(jobs, args.days, start)
+    print(report.summary(args.top))
+    if args.report:
+        report.write(args.report)
+        print(f"明细已写入 {args.report}")
+    return 1 if report.conflicts else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="auto_send", description="定时消息发送(无界面模式)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="载入任务文件并运行到全部完成")
+    run.add_argument("jobs", help="JSON 任务文件")
+    run.add_argument("--db", default=None, help="同时保存到任务库")
+    run.add_argument("--simulate", action="store_true", help="使用模拟输入后端")
+    run.add_argument(
+        "--profile-cycles", nargs="?", const=PROFILE_DIR, default=None, metavar="DIR",
+        help="采样分析每个发送周期",
+    )
+    run.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="开启本机指标端点")
+    run.set_defaults(func=cmd_run)
+
+    daemon = sub.add_parser("daemon", help="持续运行任务库中的任务")
+    daemon.add_argument("--db", default=JOB_DB_PATH)
+    daemon.add_argument("--simulate", action="store_true", help="使用模拟输入后端")
+    daemon.add_argument(
+        "--profile-cycles", nargs="?", const=PROFILE_DIR, default=None, metavar="DIR",
+        help="采样分析每个发送周期",
+    )
+    daemon.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="开启本机指标端点")
+    daemon.set_defaults(func=cmd_daemon)
+
+    send = sub.add_parser("send", help="立即发送")
+    send.add_argument("target", help="目标对话，多个用分号分隔")
+    send.add_argument("content")
+    send.add_argument("--simulate", action="store_true", help="使用模拟输入后端")
+    send.add_argument(
+        "--profile-cycles", nargs="?", const=PROFILE_DIR, default=None, metavar="DIR",
+        help="采样分析每个发送周期",
+    )
+    send.set_defaults(func=cmd_send)
+
+    lst = sub.add_parser("list", help="列出任务库中的任务")
+    lst.add_argument("--db", default=JOB_DB_PATH)
+    lst.set_defaults(func=cmd_list)
+
+    preview = sub.add_parser("preview", help="预览 cron 表达式或 RRULE 接下来的发送时间")
+    preview.add_argument("rule")
+    preview.add_argument("-n", type=int, default=5, help="显示次数")
+    preview.set_defaults(func=cmd_preview)
+
+    history = sub.add_parser("history", help="查询发送记录")
+    history.add_argument("--target", default=None)
+    history.add_argument("--since", default=None, help="起始时间(ISO 格式)")
+    history.add_argument("--until", default=None, help="截止时间(ISO 格式)")
+    history.add_argument("-n", type=int, default=100, help="最多显示条数")
+    history.add_argument("--log", default=AUDIT_LOG_PATH)
+    history.set_defaults(func=cmd_history)
+
+    imp = sub.add_parser("import", help="从 CSV/XLSX 批量导入任务到任务库，报告所有有错误的行")
+    imp.add_argument("file", help="CSV 或 XLSX 文件，首行为表头")
+    imp.add_argument("--db", default=JOB_DB_PATH)
+    imp.add_argument("--dry-run", action="store_true", help="只校验，不写入")
+    imp.set_defaults(func=cmd_import)
+
+    sim = sub.add_parser("simulate", help="用虚拟时钟模拟任务计划，报告每次发送、准备窗口和冲突")
+    sim.add_argument("jobs", nargs="?", default=None, help="JSON 任务文件，省略时使用任务库")
+    sim.add_argument("--db", default=JOB_DB_PATH)
+    sim.add_argument("--days", type=float, default=30, help="模拟天数")
+    sim.add_argument("--start", default=None, help="起始时间(ISO 格式)，默认当前时间")
+    sim.add_argument("--report", default=None, help="写出每次发送的明细(.csv 或 .json)")
+    sim.add_argument("--top", type=int, default=10, help="摘要中列出的冲突数")
+    sim.set_defaults(func=cmd_simulate)
+
+    cal = sub.add_parser("calibrate", help="测量本机各步骤耗时并给出最小可用延时")
+    cal.add_argument("target", help="用于测试的目标对话")
+    cal.add_argument("--rounds", type=int, default=CALIBRATION_ROUNDS)
+    cal.add_argument("--confidence", type=float, default=CALIBRATION_CONFIDENCE)
+    cal.add_argument("--profile", default=None, help="保存为此名称的延时配置")
+    cal.add_argument("--simulate", action="store_true", help="使用模拟输入后端")
+    cal.set_defaults(func=cmd_calibrate)
+    return parser
+
+
+def main(argv=None):
+    handler = logging.handlers.RotatingFileHandler(
+        "error.log", maxBytes=5 * 1024 * 1024, backupCount=3
+    )
+    logging.basicConfig(
+        level=logging.ERROR,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[handler],
+    )
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 13:02:11
+project: auto_send
+filename: broadcast.py
+version: 1.0
+"""
+
+"""群发：一次激活窗口，对多个目标流水线执行 搜索 → 选中 → 输入 → 发送"""
+import threading
+import uuid
+
+from clock import SYSTEM_CLOCK
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class TargetResult:
+    def __init__(self, target):
+        self.target = target
+        self.status = PENDING
+        self.seconds = 0.0
+        self.error = ""
+
+    def to_dict(self):
+        return {
+            "target": self.target,
+            "status": self.status,
+            "seconds": self.seconds,
+            "error": self.error,
+        }
+
+
+class BroadcastRun:
+    """一次群发的进度与逐个目标的结果，cancel() 可在任意线程调用"""
+
+    def __init__(self, targets, content, job_id=None, scheduled_time=None, clock=None):
+        self.broadcast_id = uuid.uuid4().hex[:12]
+        self.job_id = job_id
+        self.scheduled_time = scheduled_time  # 定时群发的发送时间，与 job_id 一起组成各目标的幂等键
+        self.targets = list(targets)
+        self.content = content
+        self.results = [TargetResult(t) for t in self.targets]
+        self.activate_seconds = 0.0
+        self._clock = clock or SYSTEM_CLOCK  # 计时用其单调时钟，与 SchedulerCore 的时钟一致
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def begin(self):
+        self.started = self._clock.monotonic()
+
+    def record(self, index, status, seconds, error=""):
+        with self._lock:
+            result = self.results[index]
+            result.status = status
+            result.seconds = seconds
+            result.error = error
+
+    def finish(self):
+        """结束群发，未执行的目标标记为已取消"""
+        with self._lock:
+            for result in self.results:
+                if result.status == PENDING:
+                    result.status = CANCELLED
+            self.finished = self._clock.monotonic()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def wall_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or self._clock.monotonic()) - self.started
+
+    def sequential_estimate(self, per_send_overhead=0.1):
+        """逐条单独发送的估算耗时(未实测，不能为对比而把消息再逐条发一遍)
+
+        每个已执行目标按: 本次实测的该目标耗时 + 本次首次激活窗口的实测耗时 +
+        per_send_overhead(立即发送在准备完成后的固定等待，见 SchedulerCore.message_send_immed)。
+        """
+        with self._lock:
+            executed = [r for r in self.results if r.status in (SENT, FAILED)]
+            return sum(
+                r.seconds + self.activate_seconds + per_send_overhead for r in executed
+            )
+
+    def counts(self):
+        with self._lock:
+            counts = {PENDING: 0, SENT: 0, FAILED: 0, CANCELLED: 0}
+            for result in self.results:
+                counts[result.status] += 1
+            return counts
+
+    def summary(self):
+        counts = self.counts()
+        wall = self.wall_seconds()
+        baseline = self.sequential_estimate()
+        text = (
+            f"群发 {self.broadcast_id} 完成: 成功 {counts[SENT]}, 失败 {counts[FAILED]}, "
+            f"取消 {counts[CANCELLED]}，总耗时 {wall:.3f}秒"
+        )
+        if baseline > 0:
+            text += f"，逐条发送估算(未实测) {baseline:.3f}秒，估计节省 {baseline - wall:.3f}秒"
+        return text
+
+    def to_dict(self):
+        return {
+            "broadcast_id": self.broadcast_id,
+            "job_id": self.job_id,
+            "wall_seconds": self.wall_seconds(),
+            "sequential_estimate_seconds": self.sequential_estimate(),
+            "cancelled": self.cancelled,
+            "results": [r.to_dict() for r in self.results],
+        }
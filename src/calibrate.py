@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 18:20:44
+project: auto_send
+filename: calibrate.py
+version: 1.0
+"""
+
+"""延时校准：在本机反复测量窗口激活、搜索框出现、搜索结果稳定、会话切换的实际耗时，
+按置信水平给出仍能成功的最小 DELAYS，并可保存为命名配置"""
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+ACTIVATE_KEY = "window_active_delay"
+SEARCH_KEY = "search_delay"
+RESULT_KEY = "search_result_delay"
+CHAT_KEY = "chat_delay"
+CALIBRATED_KEYS = (ACTIVATE_KEY, SEARCH_KEY, RESULT_KEY, CHAT_KEY)
+
+MIN_SAMPLES = 3  # 少于此样本数的步骤保持原值
+STEP = 0.05  # 建议值向上取整到 50 毫秒
+FLOOR = 0.1
+
+
+def _timed(condition, timeout, interval):
+    """轮询 condition，返回 (耗时秒数, 是否满足)；condition 返回 None 表示无法观测，返回 (0, None)"""
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        ready = condition()
+        if ready is None:
+            return 0.0, None
+        if ready:
+            return time.monotonic() - start, True
+        if time.monotonic() >= deadline:
+            return time.monotonic() - start, False
+        time.sleep(interval)
+
+
+def _quantile(values, q):
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Calibration:
+    """各步骤的测量样本及据此给出的建议延时"""
+
+    def __init__(self, target, confidence=0.95, margin=0.25):
+        self.target = target
+        self.confidence = confidence
+        self.margin = margin  # 分位数之上再留的比例余量
+        self.samples = {key: [] for key in CALIBRATED_KEYS}
+        self.timeouts = {key: 0 for key in CALIBRATED_KEYS}
+        self.unobservable = set()
+        self.rounds = 0
+        self.errors = []
+
+    def add(self, key, seconds, met):
+        if met is None:
+            self.unobservable.add(key)
+        elif met:
+            self.samples[key].append(seconds)
+        else:
+            self.timeouts[key] += 1
+
+    def propose(self, current):
+        """建议的 DELAYS(只含校准过的项)
+
+        某步骤超时的比例超过 1 - confidence 时说明当前机器上经常比探测上限还慢，保持原值与探测上限中较大者；
+        无法观测或样本不足的步骤保持原值。
+        """
+        proposed = {}
+        for key in CALIBRATED_KEYS:
+            samples = self.samples[key]
+            total = len(samples) + self.timeouts[key]
+            if key in self.unobservable or len(samples) < MIN_SAMPLES:
+                proposed[key] = current[key]
+            elif self.timeouts[key] > (1 - self.confidence) * total:
+                proposed[key] = max(current[key], max(samples))
+            else:
+                value = _quantile(samples, self.confidence) * (1 + self.margin)
+                proposed[key] = max(FLOOR, math.ceil(value / STEP) * STEP)
+            proposed[key] = round(proposed[key], 3)
+        return proposed
+
+    def summary(self, key):
+        samples = self.samples[key]
+        if not samples:
+            return {"count": 0, "timeouts": self.timeouts[key]}
+        return {
+            "count": len(samples),
+            "timeouts": self.timeouts[key],
+            "p50": _quantile(samples, 0.5),
+            "quantile": _quantile(samples, self.confidence),
+            "max": max(samples),
+        }
+
+    def to_dict(self):
+        return {
+            "target": self.target,
+            "rounds": self.rounds,
+            "confidence": self.confidence,
+            "margin": self.margin,
+            "steps": {key: self.summary(key) for key in CALIBRATED_KEYS},
+            "unobservable": sorted(self.unobservable),
+            "errors": self.errors,
+        }
+
+
+def measure_round(calibration, hwnd, shortcuts, delays, backend, probe_timeout=5.0):
+    """执行一轮 激活 → 打开搜索 → 输入目标 → 进入会话，记录各步骤满足就绪条件的耗时
+
+    探测上限取 probe_timeout 与当前延时 3 倍中的较大者，以便测出比当前设置更慢的情况。
+    窗口已在前台时本轮不测激活。
+    """
+    interval = delays.get("poll_interval", 0.02)
+
+    def limit(key):
+        return max(probe_timeout, 3 * delays[key])
+
+    if hwnd and backend.get_foreground() != hwnd:
+        backend.set_foreground(hwnd)
+        seconds, met = _timed(lambda: backend.get_foreground() == hwnd, limit(ACTIVATE_KEY), interval)
+        calibration.add(ACTIVATE_KEY, seconds, met)
+
+    def focus_changed(before):
+        def changed():
+            focus = backend.get_focus()
+            return None if focus is None or before is None else focus != before
+
+        return changed
+
+    before = backend.get_focus()
+    backend.press(shortcuts["open_search"])
+    seconds, met = _timed(focus_changed(before), limit(SEARCH_KEY), interval)
+    calibration.add(SEARCH_KEY, seconds, met)
+
+    # 搜索结果只能观察界面是否平静: 焦点保持 settle 秒不变视为结果已稳定
+    settle = delays.get("settle_time", 0.3)
+    state = {"focus": backend.get_focus(), "since": time.monotonic()}
+
+    def settled():
+        focus = backend.get_focus()
+        if focus is None:
+            return None
+        now = time.monotonic()
+        if focus != state["focus"]:
+            state["focus"], state["since"] = focus, now
+        return now - state["since"] >= settle
+
+    backend.write(calibration.target)
+    state["since"] = time.monotonic()
+    seconds, met = _timed(settled, limit(RESULT_KEY) + settle, interval)
+    calibration.add(RESULT_KEY, seconds, met)
+
+    before = backend.get_focus()
+    backend.press("enter")
+    seconds, met = _timed(focus_changed(before), limit(CHAT_KEY), interval)
+    calibration.add(CHAT_KEY, seconds, met)
+    calibration.rounds += 1
+
+
+def load_profiles(path):
+    """读取全部命名配置 {名称: {"delays": {...}, "created": ..., "calibration": {...}}}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_profile(path, name, delays, calibration=None):
+    """保存(覆盖)命名配置，先写临时文件再替换，避免写到一半损坏已有配置"""
+    profiles = load_profiles(path)
+    profiles[name] = {
+        "delays": delays,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "calibration": calibration,
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def get_profile(path, name):
+    """命名配置中的 DELAYS，不存在时返回 None"""
+    profile = load_profiles(path).get(name)
+    return dict(profile["delays"]) if profile else None
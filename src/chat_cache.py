@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 15:40:22
+project: auto_send
+filename: chat_cache.py
+version: 1.0
+"""
+
+"""会话定位缓存：目标会话已经打开时跳过 搜索 → 选中 两步"""
+import threading
+
+
+class ChatCache:
+    """记录当前打开的会话，以及按目标名记录的独立会话窗口
+
+    当前会话: 发送成功后记下 (目标, 窗口句柄, 焦点状态)。下一次准备前若前台窗口或焦点
+    与记录不一致(用户切换过窗口或会话)即失效；焦点无法观测的后端从不命中。
+    输入内容后、发送前的会话视为未就绪(输入框里还有内容)，同样不命中。
+    同一窗口中切换到另一个会话时前台窗口和焦点都不变，这一校验无法区分，因此复用当前会话
+    需要显式开启(reuse_current)。
+    独立会话窗口: 标题即目标名，且与主窗口同属一个进程，每次使用前按标题重新校验句柄。
+    所有方法可在任意线程调用。
+    """
+
+    def __init__(self, enabled=True, reuse_current=False):
+        self.enabled = enabled
+        self.reuse_current = reuse_current  # 当前会话是否可复用，见类说明
+        self._lock = threading.Lock()
+        self._current = None  # (target, hwnd, focus)
+        self._pending = None  # 已打开、内容未发送的 (target, hwnd)
+        self._detached = {}  # target -> hwnd
+        self._counts = {"hits": 0, "detached_hits": 0, "misses": 0, "invalidations": 0}
+
+    def observe(self, backend):
+        """激活窗口之前调用: 前台窗口或焦点与上次发送后不同则当前会话失效"""
+        with self._lock:
+            current = self._current
+        if current is None:
+            return
+        _, hwnd, focus = current
+        if backend.get_foreground() != hwnd or backend.get_focus() != focus:
+            self.invalidate()
+
+    def detached_window(self, target, backend, main_hwnd):
+        """目标的独立会话窗口句柄，没有或已关闭时返回 0"""
+        if not self.enabled or not main_hwnd:
+            return 0
+        hwnd = backend.find_window(target)
+        with self._lock:
+            known = self._detached.get(target)
+        if hwnd and hwnd == known:
+            return hwnd
+        if hwnd and hwnd != main_hwnd:
+            pid = backend.get_window_process(hwnd)
+            if pid is not None and pid == backend.get_window_process(main_hwnd):
+                with self._lock:
+                    self._detached[target] = hwnd
+                return hwnd
+        with self._lock:
+            self._detached.pop(target, None)
+        return 0
+
+    def is_open(self, target, hwnd):
+        """目标会话是否已在窗口 hwnd 中打开，并计入命中/未命中次数"""
+        with self._lock:
+            if self.enabled and hwnd:
+                if self._detached.get(target) == hwnd:
+                    self._counts["detached_hits"] += 1
+                    return True
+                if (
+                    self.reuse_current
+                    and self._current is not None
+                    and self._current[:2] == (target, hwnd)
+                ):
+                    self._counts["hits"] += 1
+                    return True
+            self._counts["misses"] += 1
+            return False
+
+    def remember(self, target, hwnd):
+        """已打开目标会话并开始输入，发送成功前不可复用"""
+        with self._lock:
+            self._current = None
+            self._pending = (target, hwnd) if hwnd else None
+
+    def mark_sent(self, backend):
+        """发送成功后记录焦点状态，作为下次复用时的校验依据"""
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        focus = backend.get_focus()
+        with self._lock:
+            self._current = None if focus is None else pending + (focus,)
+
+    def invalidate(self):
+        with self._lock:
+            if self._current is not None or self._pending is not None:
+                self._counts["invalidations"] += 1
+            self._current = None
+            self._pending = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats["detached_windows"] = len(self._detached)
+        lookups = stats["hits"] + stats["detached_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["detached_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 20:48:26
+project: auto_send
+filename: clock.py
+version: 1.0
+"""
+
+"""可替换的时钟，以及时钟监视：定期比较墙上时间与单调时钟的走时，发现跳变(校时、夏令时、挂起恢复)
+
+调度逻辑通过 Clock 取当前时间，默认为系统时钟；模拟时换成 VirtualClock，
+时间只在调用方推进时前进，可在几秒内走完数十天的计划。
+
+任务的发送时间按墙上时间给出，等待和精确触发却按单调时钟计时；两者走时不一致时，
+已换算好的等待时长和截止时刻都会失效。监视线程每 interval 秒采样一次，两次采样间
+墙上时间比单调时钟多走或少走超过 threshold 秒即视为跳变；单调时钟本身比预期多走
+很多(进程被整体挂起，两个时钟一起前进)时也报告，交由调用方重新规划。
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """系统时钟: 墙上时间 datetime.now()，单调时钟 time.perf_counter()"""
+
+    def now(self):
+        return datetime.now()
+
+    def monotonic(self):
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """虚拟时钟，从 start 开始，只在 advance/advance_to/sleep 时前进"""
+
+    def __init__(self, start=None):
+        self._now = start or datetime.now().replace(microsecond=0)
+        self._elapsed = 0.0
+
+    def now(self):
+        return self._now
+
+    def monotonic(self):
+        return self._elapsed
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self._now += timedelta(seconds=seconds)
+            self._elapsed += seconds
+
+    def advance_to(self, moment):
+        self.advance((moment - self._now).total_seconds())
+
+
+SYSTEM_CLOCK = SystemClock()
+
+JUMP = "jump"  # 墙上时间相对单调时钟跳变
+STALL = "stall"  # 两个时钟一致，但进程长时间没有运行
+
+
+class ClockMonitor:
+    """on_jump(kind, offset, elapsed) 在监视线程中调用
+
+    offset 为墙上时间相对单调时钟多走的秒数(负数为回拨)，elapsed 为两次采样间单调时钟走过的秒数。
+    now/monotonic 可替换，便于测试。
+    """
+
+    def __init__(
+        self,
+        on_jump,
+        interval=1.0,
+        threshold=0.5,
+        now=datetime.now,
+        monotonic=time.perf_counter,
+    ):
+        self.on_jump = on_jump
+        self.interval = interval
+        self.threshold = threshold
+        self._now = now
+        self._monotonic = monotonic
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = None
+        self.jumps = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._last = (self._now(), self._monotonic())
+        self._thread = threading.Thread(target=self._run, name="clock-monitor")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def check(self):
+        """采样一次并与上次比较，发现跳变时调用 on_jump；返回 (类型, 偏差) 或 None"""
+        wall, mono = self._now(), self._monotonic()
+        last_wall, last_mono = self._last
+        self._last = (wall, mono)
+        elapsed = mono - last_mono
+        offset = (wall - last_wall).total_seconds() - elapsed
+        if abs(offset) > self.threshold:
+            kind = JUMP
+        elif elapsed > self.interval + max(self.threshold, 2 * self.interval):
+            kind = STALL
+        else:
+            return None
+        self.jumps += 1
+        try:
+            self.on_jump(kind, offset, elapsed)
+        except Exception as e:
+            logging.error(f"时钟跳变处理出错: {e}", exc_info=True)
+        return kind, offset
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
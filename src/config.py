@@ -14,6 +14,8 @@ SHORTCUTS = {
     "send_message": "ctrl+enter",
 }
 
+# 窗口激活、搜索、会话切换等延时均为就绪条件轮询的等待上限，条件满足即继续；
+# 搜索结果没有可观测的就绪条件，search_result_delay 按设定值等满
 DELAYS = {
     "prepare_pre_time": 10.0,  # 消息准备提前时间
     "window_active_delay": 1.0,  # 窗口激活等待延时
@@ -21,6 +23,74 @@ DELAYS = {
     "search_result_delay": 1.5,
     "chat_delay": 1,
     "line_delay": 0.1,
+    "paste_delay": 0.3,  # 粘贴后等待目标窗口读取剪贴板，再恢复原剪贴板内容
+    "poll_interval": 0.02,  # 就绪条件轮询间隔
+    "settle_time": 0.3,  # 延时校准测量搜索结果时: 界面保持不变多久视为已就绪
 }
 
+# 消息内容输入方式
+INPUT_MODES = {
+    "paste": "剪贴板粘贴",
+    "type": "逐行输入",
+}
+INPUT_MODE = "paste"
+
+# 精确发送: 粗睡眠到截止前 FIRE_SPIN_MARGIN 秒，再自旋最多 FIRE_MAX_SPIN 秒
+FIRE_SPIN_MARGIN = 0.02
+FIRE_MAX_SPIN = 0.05
+
+# 日志队列容量及溢出策略: drop_oldest / drop_newest / block
+LOG_QUEUE_SIZE = 10000
+LOG_OVERFLOW_POLICY = "drop_oldest"
+
+# 界面日志面板: 最多保留行数、合并刷新间隔(毫秒)
+LOG_VIEW_MAX_LINES = 1000
+LOG_VIEW_REFRESH_MS = 100
+# 界面任务列表: 任务变化后合并刷新的间隔(毫秒)，批量导入或连续分发时只刷新一次
+JOBS_VIEW_REFRESH_MS = 200
+
+# 任务持久化文件，及停机期间错过发送的处理: fire_now 立即补发 / skip 跳过 / grace 宽限期内补发
+JOB_DB_PATH = "jobs.db"
+MISFIRE_POLICY = "grace"
+MISFIRE_GRACE = 300.0  # 秒
+
+# 执行器: 键盘操作在单线程输入通道中串行执行，其余工作交给此大小的线程池
+EXECUTOR_POOL_SIZE = 2
+
+# 目标会话已打开(上次发送后未切换过窗口，或有独立会话窗口)时跳过搜索
+CHAT_CACHE_ENABLED = True
+# 复用上次发送的会话: 只能校验前台窗口和焦点，无法发现用户在同一窗口里切换了会话，默认关闭；
+# 独立会话窗口按标题确认是目标本身，不受此项影响
+CHAT_CACHE_REUSE_CURRENT = False
+
+# 自动提前量: 取最近 LEAD_WINDOW 次准备耗时的 LEAD_PERCENTILE 分位数，加上比例和固定余量；
+# 样本不足 LEAD_MIN_SAMPLES 次时使用 DELAYS["prepare_pre_time"]
+LEAD_AUTO_TUNE = True
+LEAD_WINDOW = 50
+LEAD_MIN_SAMPLES = 5
+LEAD_PERCENTILE = 95
+LEAD_MARGIN_RATIO = 0.2
+LEAD_MARGIN_SECONDS = 0.5
+
+# 延时校准: 默认轮数、置信水平，及命名配置的保存文件
+CALIBRATION_ROUNDS = 10
+CALIBRATION_CONFIDENCE = 0.95
+DELAY_PROFILE_PATH = "delay_profiles.json"
+
+# 本机指标端点(Prometheus 文本格式，http://127.0.0.1:端口/metrics)，None 表示不开启
+METRICS_PORT = None
+
+# 发送记录(只追加)，索引文件为同名加 .idx；None 表示不记录
+AUDIT_LOG_PATH = "audit.log"
+
+# 时钟监视: 每隔 CLOCK_CHECK_INTERVAL 秒比较墙上时间与单调时钟，偏差超过 CLOCK_JUMP_THRESHOLD 秒
+# 视为跳变(校时、夏令时、挂起恢复)并重新计算所有待发送时刻；None 表示不监视
+CLOCK_CHECK_INTERVAL = 1.0
+CLOCK_JUMP_THRESHOLD = 0.5
+
+# 发送周期采样分析(默认关闭，可在界面或命令行开启): 输出目录、采样间隔(秒)和每个周期最长采样时间(秒)
+PROFILE_DIR = "profiles"
+PROFILE_INTERVAL = 0.001
+PROFILE_MAX_SECONDS = 120.0
+
 WECHAT_WINDOW_TITLE = "企业微信"
@@ -0,0 +1,1249 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project : officeauto
+@File    : core.py
+@IDE     : PyCharm
+@Author  : xie.fangyu
+@Date    : 2025/3/31 下午1:58
+"""
+
+"""调度核心，不依赖 PyQt：通过回调输出日志、状态和任务变化，可用于界面或无界面守护进程"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+from config import (
+    SHORTCUTS,
+    DELAYS,
+    WECHAT_WINDOW_TITLE,
+    INPUT_MODE,
+    INPUT_MODES,
+    FIRE_SPIN_MARGIN,
+    FIRE_MAX_SPIN,
+    LOG_QUEUE_SIZE,
+    LOG_OVERFLOW_POLICY,
+    MISFIRE_POLICY,
+    MISFIRE_GRACE,
+    CHAT_CACHE_ENABLED,
+    CHAT_CACHE_REUSE_CURRENT,
+    EXECUTOR_POOL_SIZE,
+    LEAD_AUTO_TUNE,
+    LEAD_WINDOW,
+    LEAD_MIN_SAMPLES,
+    LEAD_PERCENTILE,
+    LEAD_MARGIN_RATIO,
+    LEAD_MARGIN_SECONDS,
+    CALIBRATION_ROUNDS,
+    CALIBRATION_CONFIDENCE,
+    DELAY_PROFILE_PATH,
+    CLOCK_CHECK_INTERVAL,
+    CLOCK_JUMP_THRESHOLD,
+    PROFILE_DIR,
+    PROFILE_INTERVAL,
+    PROFILE_MAX_SECONDS,
+)
+from utils import LogDispatcher, format_time
+from engine import Job, JobEngine, ONCE, WEEKLY, MONTHLY, RULE
+from fire import FireEngine
+from clock import ClockMonitor, JUMP, SYSTEM_CLOCK
+from broadcast import BroadcastRun, SENT, FAILED
+from chat_cache import ChatCache
+from executor import Executor, INPUT_LANE, POOL_LANE
+from arbiter import plan_slots, conflicts
+from lead import LeadTuner
+from metrics import SendMetrics
+from tracing import (
+    LatencyRecorder,
+    ACTIVATE,
+    SEARCH,
+    SELECT,
+    INPUT,
+    WAIT_FIRE,
+    SEND,
+    ACTIVATED,
+    SELECTED,
+    TYPING,
+    TYPED,
+    DELIVERED,
+)
+import wechat_ops
+
+IDLE = 0
+RUNNING = 1
+STATUS = {IDLE: "空闲中", RUNNING: "运行中"}
+SENT_KEYS_KEPT = 10000
+
+
+def _print_lines(lines):
+    for line in lines:
+        print(f"[{format_time()}] {line}", flush=True)
+
+
+class SchedulerCore:
+    """调度核心
+
+    on_log(lines): 日志批次回调，默认打印到标准输出
+    on_status(status): 运行状态(IDLE/RUNNING)变化回调
+    on_jobs_changed(): 任务列表变化回调
+    回调可能在任意后台线程中调用。
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        store=None,
+        on_log=None,
+        on_status=None,
+        on_jobs_changed=None,
+        clock=None,
+    ):
+        self._on_status = on_status
+        self._on_jobs_changed_cb = on_jobs_changed
+        # 所有日志经由单个分发线程按批发送，避免每行日志创建一个线程
+        self.log_dispatcher = LogDispatcher(
+            on_log or _print_lines, LOG_QUEUE_SIZE, policy=LOG_OVERFLOW_POLICY
+        )
+        # 输入后端，None 表示使用 wechat_ops 的默认后端(Win32)
+        self.backend = backend
+        # 调度判断所用的时钟，None 为系统时钟；模拟时传入 VirtualClock
+        self.clock = clock or SYSTEM_CLOCK
+        self.scheduled_time = None
+        self.is_running = False
+        self.current_window = None
+        self.window_title = "企业微信"
+        self.shortcuts = SHORTCUTS.copy()
+        self.delays = DELAYS.copy()
+        self.input_mode = INPUT_MODE
+
+        # 添加线程锁
+        self.mutex = threading.Lock()
+        self.running_mutex = threading.Lock()  # 专门用于控制运行状态的锁
+
+        # 常驻工作线程: 键盘操作走单线程输入通道，避免多个任务同时抢占键盘
+        self.executor = Executor(EXECUTOR_POOL_SIZE)
+        self._scheduling = 0  # 已到准备时刻、仍在输入通道中排队或准备的任务数
+        # 精确发送线程，替代经由 Qt 事件循环的 QTimer
+        self.fire = FireEngine(FIRE_SPIN_MARGIN, FIRE_MAX_SPIN, clock=self.clock)
+        # 各发送周期的分阶段耗时统计
+        self.latency = LatencyRecorder(on_cycle=self._on_cycle_closed)
+        self.audit = None  # 可选的 AuditLog，每个发送周期结束后在线程池中追加一条记录
+        # 最近已发送的幂等键(有序，只保留最近 SENT_KEYS_KEPT 个)，由 self.mutex 保护
+        self._sent_keys = OrderedDict()
+        self._audit_pending = deque()  # 尚未写完的记录，退出前等待写完
+        self.broadcasts = {}  # broadcast_id -> BroadcastRun，由 self.broadcasts_mutex 保护
+        self.broadcasts_mutex = threading.Lock()
+        # 目标会话已打开时跳过搜索
+        self.chat_cache = ChatCache(CHAT_CACHE_ENABLED, CHAT_CACHE_REUSE_CURRENT)
+        # 发送计数及耗时分布，可经由本机指标端点抓取
+        self.metrics = SendMetrics()
+        self._metrics_server = None
+        # 根据最近的准备耗时自动计算提前量
+        self.auto_lead = LEAD_AUTO_TUNE
+        self.lead_tuner = LeadTuner(
+            LEAD_WINDOW, LEAD_MIN_SAMPLES, LEAD_PERCENTILE, LEAD_MARGIN_RATIO, LEAD_MARGIN_SECONDS
+        )
+
+        # 多任务调度引擎，任务自带目标和内容；store 为 JobStore 时任务持久化
+        self.store = store
+        self.engine = JobEngine(
+            self._on_job_fire,
+            self._lead_time,
+            on_change=self._on_jobs_changed,
+            store=store,
+            clock=self.clock,
+        )
+        # 墙上时间跳变或挂起恢复后立即重新计算所有待发送时刻
+        self.clock_monitor = None
+        if CLOCK_CHECK_INTERVAL and self.clock is SYSTEM_CLOCK:
+            self.clock_monitor = ClockMonitor(
+                self._on_clock_jump, CLOCK_CHECK_INTERVAL, CLOCK_JUMP_THRESHOLD
+            )
+            self.clock_monitor.start()
+
+    def update_shortcuts(self, shortcuts):
+        """更新快捷键设置"""
+        self.shortcuts.update(shortcuts)
+        self._log(f"快捷键已更新")
+
+    def update_delays(self, delays):
+        """更新延时设置"""
+        pre_time = self.delays.get("prepare_pre_time")
+        self.delays.update(delays)
+        if self.delays.get("prepare_pre_time") != pre_time:
+            self.engine.rearm_all()  # 提前量变化，重新计算所有准备时刻
+        self._log(f"延时设置已更新")
+
+
+    def update_auto_lead(self, enabled):
+        """开启/关闭自动提前量"""
+        if enabled == self.auto_lead:
+            return
+        self.auto_lead = enabled
+        self.engine.rearm_all()
+        self._log(f"自动提前量已{'开启' if enabled else '关闭'}")
+
+    def lead_stats(self):
+        """自动提前量模型: 各范围的准备耗时及触发误差(秒)"""
+        return self.lead_tuner.stats()
+
+    def update_input_mode(self, mode):
+        """更新消息内容输入方式"""
+        if mode not in INPUT_MODES:
+            self._log(f"错误: 未知的输入方式 {mode}")
+            return
+        self.input_mode = mode
+        self._log(f"输入方式已更新为: {INPUT_MODES[mode]}")
+
+    def input_stats(self):
+        """各输入方式的耗时统计"""
+        return wechat_ops.input_stats()
+
+    def update_window_title(self, title):
+        self.window_title = title
+        self._log(f"窗口标题已更新为: {title}")
+
+    def add_job(self, job):
+        """加入任务到调度引擎，返回任务ID；没有未来发送时间则返回 None"""
+        with self.running_mutex:
+            self.is_running = True
+        self.engine.start()
+        next_fire = self.engine.add_job(job)
+        if next_fire is None:
+            self._log(f"任务 {job.job_id} 没有可执行的发送时间，已忽略")
+            self._refresh_running_state()
+            return None
+        self._set_status(RUNNING)
+        self._log(
+            f"已添加任务 {job.describe()}，下次发送: {next_fire.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}"
+        )
+        self._report_conflicts(job.job_id)
+        return job.job_id
+
+    def attach_audit(self, audit):
+        """接入发送记录文件，并从最近的记录恢复已发送的幂等键，重启后也不会重复发送"""
+        self.audit = audit
+        for record in reversed(audit.query(limit=SENT_KEYS_KEPT)):
+            if record.get("key") and record.get("outcome") in ("sent", "send_unknown"):
+                self._remember_sent(record["key"])
+
+    def _remember_sent(self, key):
+        with self.mutex:
+            self._sent_keys[key] = True
+            self._sent_keys.move_to_end(key)
+            while len(self._sent_keys) > SENT_KEYS_KEPT:
+                self._sent_keys.popitem(last=False)
+
+    def _already_sent(self, key):
+        with self.mutex:
+            return key in self._sent_keys
+
+    def _on_cycle_closed(self, cycle):
+        # 在结束周期的线程(可能是精确发送线程)中调用，只提交，不做文件 IO
+        if self.audit is not None:
+            pending = self._audit_pending
+            while pending and pending[0].done:
+                pending.popleft()
+            pending.append(
+                self.executor.submit(POOL_LANE, self._write_audit, (cycle,), label="audit")
+            )
+
+    def _write_audit(self, cycle):
+        from audit import cycle_record
+
+        self.audit.append(cycle_record(cycle))
+
+    def query_history(self, target=None, since=None, until=None, limit=1000):
+        """按时间倒序查询发送记录，可限定目标和时间范围；未接入发送记录时返回空列表"""
+        if self.audit is None:
+            return []
+        return self.audit.query(target, since, until, limit)
+
+    def attach_store(self, store):
+        """接入任务库，之后的任务增删随之持久化；通常紧接着调用 load_jobs"""
+        self.store = store
+        self.engine.set_store(store)
+
+    def load_jobs(self, misfire_policy=MISFIRE_POLICY, grace=MISFIRE_GRACE):
+        """从任务库载入任务，按策略处理停机期间错过的发送，返回载入数量"""
+        if self.store is None:
+            return 0
+        start = self.clock.monotonic()
+        jobs = self.store.load()
+        missed = self.engine.load_jobs(jobs, misfire_policy, grace)
+        loaded = len(self.engine)
+        self._log(f"已从任务库载入 {loaded} 个任务，耗时 {self.clock.monotonic() - start:.3f}秒")
+        for job, fire_time, catch_up in missed:
+            action = "立即补发" if catch_up else "已跳过"
+            self._log(
+                f"任务 {job.job_id} 错过了 {fire_time.strftime('%Y-%m-%d %H:%M:%S')} 的发送，{action}"
+            )
+        if loaded:
+            with self.running_mutex:
+                self.is_running = True
+            self.engine.start()
+            self._set_status(RUNNING)
+        return loaded
+
+    def cancel_job(self, job_id):
+        """取消任务"""
+        if not self.engine.cancel_job(job_id):
+            self._log(f"任务 {job_id} 不存在")
+            return False
+        self._log(f"任务 {job_id} 已取消")
+        self._refresh_running_state()
+        return True
+
+    def update_job(self, job_id, **changes):
+        """修改任务，调度引擎立即按新时间重新布防"""
+        next_fire = self.engine.update_job(job_id, **changes)
+        if next_fire is None:
+            self._log(f"任务 {job_id} 不存在或已无可执行的发送时间")
+            self._refresh_running_state()
+            return None
+        self._log(
+            f"任务 {job_id} 已更新，下次发送: {next_fire.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}"
+        )
+        return next_fire
+
+    def list_jobs(self):
+        """按下一次发送时间排序的任务列表"""
+        return self.engine.jobs()
+
+    def import_jobs(self, path, dry_run=False, max_logged_errors=20):
+        """从 CSV/XLSX 批量导入任务，返回 Task，Task.result 为 importer.ImportResult
+
+        整个文件校验完后才加入调度，所有有效任务在一个事务中写入任务库；有错误的行一并报告，
+        日志中只列出前 max_logged_errors 条。dry_run 时只校验不加入。
+        """
+        def import_job():
+            import importer
+
+            self._log(f"开始导入任务文件: {path}")
+            try:
+                result = importer.load_file(path, now=self.clock.now())
+            except (OSError, ValueError) as e:
+                self._log(f"错误: 无法导入 {path}: {e}")
+                raise
+            self._log(f"校验完成: {result.summary()}")
+            for number, message in result.errors[:max_logged_errors]:
+                self._log(f"第 {number} 行: {message}")
+            if len(result.errors) > max_logged_errors:
+                self._log(f"……其余 {len(result.errors) - max_logged_errors} 行错误未列出")
+            if dry_run or not result.jobs:
+                return result
+            with self.running_mutex:
+                self.is_running = True
+            self.engine.start()
+            try:
+                added = self.engine.add_jobs(result.jobs)
+            except Exception as e:
+                self._log(f"错误: 写入任务库失败，未导入任何任务: {e}")
+                self._refresh_running_state()
+                raise
+            result.jobs = added
+            self._set_status(RUNNING)
+            self._log(f"已导入 {len(added)} 个任务")
+            return result
+
+        return self.executor.submit(POOL_LANE, import_job, label="import")
+
+    def start_once_schedule(self, target, content, scheduled_time):
+        """添加一次性定时任务"""
+        if not self.validate_inputs(target, content, scheduled_time):
+            return None
+        self._log("启动一次性定时任务")
+        return self.add_job(Job(target, content, ONCE, scheduled_time=scheduled_time))
+
+    def start_repeating_schedule(self, target, content, days, send_time, repeat_type):
+        """添加循环定时任务，repeat_type: 0 每周, 1 每月"""
+        if not self.validate_repeat_inputs(target, content, days, repeat_type):
+            return None
+        self._log("启动循环定时任务")
+        kind = MONTHLY if repeat_type else WEEKLY
+        return self.add_job(Job(target, content, kind, days=days, send_time=send_time))
+
+    def start_rule_schedule(self, target, content, rule, start=None):
+        """添加按 cron 表达式或 RRULE 循环的任务，start 为 RRULE 的起点(默认当前时间)"""
+        if not target:
+            self._log("错误: 请输入目标对话名称")
+            return None
+        if not content:
+            self._log("错误: 请输入发送内容")
+            return None
+        try:
+            job = Job(target, content, RULE, scheduled_time=start or self.clock.now(), rule=rule)
+        except ValueError as e:
+            self._log(f"错误: 规则无效: {e}")
+            return None
+        self._log(f"启动自定义规则任务: {rule}")
+        return self.add_job(job)
+
+    def preview_fires(self, rule, count=5, start=None):
+        """规则接下来 count 次发送时间，规则无效时抛出 ValueError"""
+        import recurrence
+
+        now = self.clock.now()
+        return recurrence.compile_rule(rule, start or now).preview(count, now)
+
+    def _lead_time(self, job):
+        """提前准备秒数
+
+        开启自动提前量且已有足够样本时按最近的准备耗时计算；否则取配置的提前量，
+        不足以完成预计的准备耗时时按预计耗时提前。
+        """
+        if self.auto_lead:
+            lead = self.lead_tuner.lead(job.targets[0], job.content)
+            if lead is not None:
+                return lead
+        return max(self.delays.get("prepare_pre_time", 10.0), self._estimate_prepare(job))
+
+    def _estimate_prepare(self, job):
+        """预计准备耗时(秒)
+
+        依次取: 最近准备耗时的分位数(按目标和内容长度)、该目标已记录的各阶段 p95、
+        全部目标的 p95，最后按延时上限估算。
+        """
+        target = job.targets[0]
+        recent = self.lead_tuner.estimate_prepare(target, job.content)
+        if recent is not None:
+            return recent
+        phases = (ACTIVATE, SEARCH, SELECT, INPUT)
+        for scope in (target, None):
+            summaries = [self.latency.histogram(phase, scope) for phase in phases]
+            if all(summary["count"] for summary in summaries):
+                return sum(summary["p95_ms"] for summary in summaries) / 1000.0
+        d = self.delays
+        if self.input_mode == "paste":
+            input_seconds = d.get("paste_delay", 0.3)
+        else:
+            input_seconds = len(job.content.split("\n")) * (0.1 + d["line_delay"])
+        return (
+            d["window_active_delay"] + d["search_delay"] + d["search_result_delay"]
+            + d["chat_delay"] + input_seconds
+        )
+
+    def _estimate_hold(self, job):
+        """到发送时刻后仍占用键盘的秒数: 发送本身，群发还包括其余目标"""
+        send = self.latency.histogram(SEND)
+        send_seconds = send["p99_ms"] / 1000.0 if send["count"] else 0.1
+        return send_seconds + (len(job.targets) - 1) * (self._estimate_prepare(job) + send_seconds)
+
+    def input_plan(self, horizon=24 * 3600):
+        """未来 horizon 秒内各任务的键盘占用规划(按发送时刻排序的 Slot 列表)
+
+        每个任务只考虑下一次发送。
+        """
+        now = self.clock.now()
+        end = now + timedelta(seconds=horizon)
+        entries = [
+            (
+                job.job_id,
+                job.next_fire,
+                self._lead_time(job),
+                self._estimate_prepare(job),
+                self._estimate_hold(job),
+            )
+            for job in self.engine.jobs()
+            if job.next_fire is not None and job.next_fire <= end
+        ]
+        return plan_slots(entries, now)
+
+    def _report_conflicts(self, job_id):
+        """添加任务时报告因键盘被占用而无法按时准备完成的任务，返回这些 Slot"""
+        late = conflicts(self.input_plan())
+        for slot in late:
+            if job_id not in (slot.job_id, slot.blocked_by):
+                continue
+            reason = (
+                f"需等待任务 {slot.blocked_by} 发送完成后才能开始准备"
+                if slot.blocked_by
+                else "准备耗时超过距发送时刻的剩余时间"
+            )
+            self._log(
+                f"警告: 任务 {slot.job_id} {reason}，"
+                f"预计晚 {slot.late_seconds:.1f}秒 (发送时刻 {slot.fire_time.strftime('%H:%M:%S')})"
+            )
+        return late
+
+    def _on_job_fire(self, job, fire_time):
+        """分发线程到达准备时刻的回调，按发送时刻的先后在输入通道中排队"""
+        remaining = (fire_time - self.clock.now()).total_seconds()
+        lead = self._lead_time(job)
+        needed = self._estimate_prepare(job)
+        if remaining < needed:
+            self._log(
+                f"警告: 任务 {job.job_id} 距发送仅剩 {remaining:.1f}秒，"
+                f"预计准备需要 {needed:.1f}秒，可能晚于发送时刻"
+            )
+        elif remaining < lead - 1:
+            self._log(f"任务 {job.job_id} 时间紧张，立即开始准备消息")
+        elif remaining > lead + 1:
+            self._log(f"任务 {job.job_id} 发送时刻早于正在分发的任务，提前排队准备")
+        with self.running_mutex:
+            self._scheduling += 1
+        self.executor.submit(
+            INPUT_LANE,
+            self._run_scheduled,
+            (fire_time, job),
+            label=job.job_id,
+            # 与执行器默认优先级(提交时的 time.monotonic)同一时基，不随注入的时钟
+            priority=time.monotonic() + remaining,
+        )
+
+    def _run_scheduled(self, fire_time, job):
+        attempted = False
+        try:
+            attempted = self.message_schedule(fire_time, job)
+        finally:
+            with self.running_mutex:
+                self._scheduling -= 1
+            if attempted:
+                # 发送已结束(成功或失败)才更新任务库；取消或停机时保留，重启后按错过发送处理
+                self.engine.fire_done(job, fire_time)
+            self._check_all_done()
+
+    def _on_clock_jump(self, kind, offset, elapsed):
+        """时钟监视线程回调: 按当前墙上时间重建任务堆和精确发送的截止时刻"""
+        if kind == JUMP:
+            reason = "向前跳变或系统挂起后恢复" if offset > 0 else "回拨"
+            self._log(f"检测到系统时钟{reason} {offset:+.3f}秒，重新计算所有待发送时刻")
+        else:
+            self._log(f"检测到程序暂停了 {elapsed:.1f}秒(系统挂起或卡顿)，重新计算所有待发送时刻")
+        missed = self.engine.replan(MISFIRE_POLICY, MISFIRE_GRACE)
+        fires = self.fire.replan()
+        for job, fire_time, catch_up in missed:
+            action = "立即补发" if catch_up else "已跳过"
+            self._log(
+                f"任务 {job.job_id} 因时钟变化错过了 {fire_time.strftime('%Y-%m-%d %H:%M:%S')} 的发送，{action}"
+            )
+        self._log(f"已重新规划 {len(self.engine)} 个任务、{fires} 个待触发的发送")
+
+    def _on_jobs_changed(self):
+        if self._on_jobs_changed_cb:
+            self._on_jobs_changed_cb()
+
+    def _set_status(self, status):
+        if self._on_status:
+            self._on_status(status)
+
+    def _refresh_running_state(self):
+        """没有剩余任务时回到空闲状态"""
+        if self.engine.has_jobs():
+            return
+        with self.running_mutex:
+            self.is_running = False
+        self._set_status(IDLE)
+
+    def stop_scheduler(self):
+        """停止所有定时任务"""
+        with self.running_mutex:
+            self.is_running = False
+
+        self.engine.clear()
+        self.fire.cancel_all()
+        for run in self._broadcast_runs():
+            run.cancel()
+
+        self._set_status(IDLE)
+        self._log("定时任务已停止")
+
+        # # 尝试恢复窗口状态
+        # self.activate_previous_window()
+
+    def shutdown(self):
+        """退出程序时停止后台线程，保留已持久化的任务"""
+        if self.clock_monitor is not None:
+            self.clock_monitor.stop()
+        self.engine.stop()
+        self.fire.stop()
+        for run in self._broadcast_runs():
+            run.cancel()
+        for task in list(self._audit_pending):
+            task.join(timeout=2)
+        self.executor.shutdown()
+        self.stop_metrics()
+        self.log_dispatcher.close()
+        if self.store is not None:
+            self.store.close()
+        if self.audit is not None:
+            self.audit.close()
+
+    def message_send_immed(self, target, content):
+        """立即发送消息，不影响定时任务运行状态，在输入通道中排队执行，返回可 join() 的 Task"""
+        def send_job():
+            if not target or not content:
+                self._log("错误: 目标或内容为空")
+                return
+            self._set_status(RUNNING)
+            self._log("开始立即发送流程...")
+            cycle = self.latency.new_cycle(target, content=content)
+            if self.message_prepare(target, content, cycle):
+                self.clock.sleep(0.1)
+                self.message_send(cycle=cycle)
+            else:
+                cycle.close("prepare_failed")
+            with self.running_mutex:
+                running_state = self.is_running
+            if running_state:
+                self._set_status(RUNNING)
+            else:
+                self._set_status(IDLE)
+        return self.executor.submit(INPUT_LANE, send_job, label=f"immed-{target}")
+
+    def message_prepare(self, target, content, cycle=None):
+        """预先打开聊天窗口并输入消息内容，只差发送
+
+        在输入通道中执行(不在时转交输入通道并等待)。
+        cycle 为 SendCycle 时记录 activate/search/select/input 各阶段耗时。
+        """
+        cycle = cycle or self.latency.new_cycle(target)
+        result = {'success': False}
+        def prepare_job():
+            max_retries = 3
+            retry_count = 0
+            self._log(f"开始准备消息 - 目标: {target}, 内容长度: {len(content)} 字符")
+            prepare_start = self.clock.monotonic()
+            self.chat_cache.observe(self._backend())
+            while retry_count < max_retries:
+                attempt = retry_count + 1
+                try:
+                    # 窗口激活在每次尝试时都确认一次(已在前台时只是一次查询)，其后的步骤按检查点继续
+                    with cycle.span(ACTIVATE, attempt):
+                        hwnd = self._activate_chat_window(target)
+                    cycle.reach(ACTIVATED)
+                    if not hwnd:
+                        self._log(f"警告: 未找到{self.window_title}窗口")
+                    self._prepare_chat(target, content, cycle, attempt, hwnd)
+                    self._log("消息准备完成，等待发送时机")
+                    result['success'] = True
+                    self._record_prepare(target, content, self.clock.monotonic() - prepare_start)
+                    return
+                except Exception as e:
+                    self.chat_cache.invalidate()
+                    retry_count += 1
+                    if retry_count < max_retries:
+                        self.metrics.retries["prepare"].inc()
+                    error_msg = f"准备消息出错: {str(e)}, 错误类型: {type(e).__name__}, 重试 ({retry_count}/{max_retries})"
+                    self._log(error_msg)
+                    self.clock.sleep(1.0)
+            self._log(f"消息准备失败，已达到最大重试次数 {max_retries}")
+            result['success'] = False
+        self.executor.call(INPUT_LANE, prepare_job, label=f"prepare-{target}")
+        return result['success']
+
+    def _record_prepare(self, target, content, seconds):
+        """记录准备耗时，自动提前量明显变化时重新计算各任务的准备时刻"""
+        self.metrics.prepare.record(seconds * 1e6)
+        if self.lead_tuner.record_prepare(target, content, seconds) and self.auto_lead:
+            lead = self.lead_tuner.lead(target, content)
+            self._log(f"目标 {target} 的自动提前量调整为 {lead:.2f}秒")
+            self.engine.rearm_all()
+
+    def _backend(self):
+        return self.backend or wechat_ops.get_backend()
+
+    def _activate_chat_window(self, target):
+        """激活目标会话所在的窗口(优先独立会话窗口)，返回窗口句柄，找不到返回 0"""
+        backend = self._backend()
+        main_hwnd = backend.find_window(self.window_title)
+        hwnd = self.chat_cache.detached_window(target, backend, main_hwnd) or main_hwnd
+        if hwnd:
+            wechat_ops.activate_window(
+                hwnd,
+                self.delays["window_active_delay"],
+                backend,
+                self.delays.get("poll_interval", 0.02),
+            )
+        return hwnd
+
+    def _prepare_chat(self, target, content, cycle, attempt=1, hwnd=0):
+        """窗口 hwnd 已激活后: 搜索并选中目标会话(会话已打开时跳过)，输入消息内容
+
+        重试时从 cycle 的检查点继续: 本周期已选中会话且窗口仍在前台时不再搜索；
+        上次已开始输入时先清空输入框再输入，避免内容重复。
+        """
+        if cycle.reached(TYPED):
+            return
+        if cycle.reached(SELECTED) and hwnd and self._backend().get_foreground() == hwnd:
+            self._log(f"[第{attempt}次尝试] 会话 {target} 已选中，从输入内容继续")
+        elif self.chat_cache.is_open(target, hwnd):
+            self._log(f"会话 {target} 已打开，跳过搜索")
+        else:
+            self._log(f"[第{attempt}次尝试] 模拟按下 {self.shortcuts['open_search']} 打开搜索框")
+            with cycle.span(SEARCH, attempt):
+                wechat_ops.search_chat(target, self.shortcuts, self.delays, self.backend)
+            with cycle.span(SELECT, attempt):
+                wechat_ops.select_chat(self.delays, self.backend)
+        cycle.reach(SELECTED)
+        self.chat_cache.remember(target, hwnd)
+        self._log(f"输入目标对话: {target}")
+        line_count = len(content.split("\n"))
+        self._log(f"开始输入消息内容，共 {line_count} 行")
+        input_start = self.clock.monotonic()
+        with cycle.span(INPUT, attempt):
+            if cycle.reached(TYPING):
+                self._log("清空输入框中上次未输入完的内容")
+                wechat_ops.clear_input(self.backend)
+            cycle.reach(TYPING)
+            used_mode = wechat_ops.input_message_content(
+                content, self.delays, self.backend, self.input_mode
+            )
+        cycle.reach(TYPED)
+        if used_mode != self.input_mode:
+            self._log(f"{INPUT_MODES[self.input_mode]}失败，已回退为{INPUT_MODES[used_mode]}")
+        self._log(f"内容输入耗时: {self.clock.monotonic() - input_start:.3f}秒 ({INPUT_MODES[used_mode]})")
+
+    def _log(self, message):
+        """写入日志队列，由分发线程按批交给 on_log"""
+        self.log_dispatcher.put(message)
+
+    def log_stats(self):
+        """日志队列的入队/丢弃/最大深度等计数"""
+        return self.log_dispatcher.stats()
+
+    def message_schedule(self, target_time, job):
+        """准备发送并启动精准定时；已尝试发送(无论成败)返回 True，被取消或已停止返回 False"""
+        start_time = self.clock.now()
+        self._log(
+            f"[{start_time.strftime('%H:%M:%S.%f')[:-3]}] 任务 {job.job_id} 消息调度开始，目标时间: {target_time.strftime('%H:%M:%S.%f')[:-3]}"
+        )
+
+        with self.running_mutex:
+            if not self.is_running:
+                self._log("任务已停止，取消消息调度")
+                return False
+
+        if job.is_broadcast:
+            return self._schedule_broadcast(target_time, job)
+
+        self._log("开始准备消息流程...")
+        cycle = self.latency.new_cycle(job.target, job.job_id, job.content, target_time)
+        try:
+            # 消息准备
+            prepare_start = self.clock.now()
+            self._log(
+                f"[{prepare_start.strftime('%H:%M:%S.%f')[:-3]}] 开始执行消息准备"
+            )
+            if self.message_prepare(job.target, job.content, cycle):
+                prepare_end = self.clock.now()
+                prepare_duration = (prepare_end - prepare_start).total_seconds()
+                self._log(f"消息准备耗时: {prepare_duration:.3f}秒")
+
+                now = self.clock.now()
+                cycle.start(WAIT_FIRE)
+                if target_time > now:
+                    # 交给精确发送线程，按单调时钟截止时刻触发；发送前继续占用输入通道
+                    fired = threading.Event()
+
+                    def fire_send(error_ns):
+                        try:
+                            self.message_send(error_ns, cycle)
+                        finally:
+                            fired.set()
+
+                    handle = self.fire.schedule(target_time, fire_send, label=job.job_id)
+                    if not self._wait_fired(handle, fired):
+                        cycle.close("cancelled")
+                        return False
+                else:
+                    self._log(
+                        f"[{now.strftime('%H:%M:%S.%f')[:-3]}] 已超过目标时间，立即发送消息"
+                    )
+                    self.message_send(cycle=cycle)
+            else:
+                cycle.close("prepare_failed")
+        except Exception as e:
+            cycle.close("error")
+            error_time = self.clock.now().strftime("%H:%M:%S.%f")[:-3]
+            self._log(f"[{error_time}] 消息准备失败: {str(e)}")
+            import traceback
+
+            self._log(f"详细错误: {traceback.format_exc()}")
+        return True
+
+    def message_send(self, fire_error_ns=None, cycle=None):
+        """在精确时间执行发送操作，由精确发送线程直接调用
+
+        fire_error_ns 为实际触发时刻相对目标时刻的误差，日志记录用于跟踪精度。
+        至多发送一次: cycle 的幂等键已发送过时直接跳过；发送按键出错后先检查输入框，
+        确认内容仍在(未发出)才重试，已清空视为已发送，无法判断时不再重试。
+        """
+        max_retries = 3
+        retry_count = 0
+        sent = False
+        outcome = "send_failed"
+        if cycle is not None:
+            cycle.finish(WAIT_FIRE)
+            if cycle.reached(DELIVERED) or self._already_sent(cycle.key):
+                self._log(f"{cycle.key} 已发送过，不再重复发送")
+                cycle.close("duplicate")
+                self._check_all_done()
+                return True
+        self.metrics.attempted.inc()
+        while retry_count < max_retries:
+            try:
+                # 先按键再记日志，避免日志开销计入发送误差
+                if cycle is not None:
+                    with cycle.span(SEND, retry_count + 1):
+                        wechat_ops.send_message(self.shortcuts, self.backend)
+                else:
+                    wechat_ops.send_message(self.shortcuts, self.backend)
+                sent = True
+                send_time = format_time()
+                status_msg = f"消息已于 ({send_time}) 发送完成"
+                if fire_error_ns is not None:
+                    status_msg += f"，触发误差 {fire_error_ns / 1e6:+.3f} 毫秒"
+                    self.lead_tuner.record_fire_error(fire_error_ns / 1e9)
+                    self.metrics.fire_error.record(abs(fire_error_ns) // 1000)
+                self._log(f"[第{retry_count+1}次尝试] 模拟按下 {self.shortcuts['send_message']} 发送消息")
+                self._log(status_msg)
+                break
+            except Exception as e:
+                retry_count += 1
+                error_msg = f"发送出错: {str(e)}, 错误类型: {type(e).__name__}, 重试 ({retry_count}/{max_retries})"
+                self._log(error_msg)
+                # 按键可能在出错前已经送达，重试前确认消息确实还没发出
+                empty = wechat_ops.input_box_empty(self.delays, self.backend)
+                if empty:
+                    sent = True
+                    self._log("输入框已清空，消息已发出，不再重试")
+                    break
+                if empty is None:
+                    outcome = "send_unknown"
+                    self._log("无法确认消息是否已发出，为避免重复发送不再重试")
+                    self.chat_cache.invalidate()
+                    break
+                if retry_count < max_retries:
+                    self.metrics.retries["send"].inc()
+                    self._log(f"等待1秒后重试...")
+                    self.clock.sleep(1.0)
+                else:
+                    self._log("发送失败，已达到最大重试次数")
+                    self.chat_cache.invalidate()
+        if sent:
+            outcome = "sent"
+            self.chat_cache.mark_sent(self._backend())
+        (self.metrics.succeeded if sent else self.metrics.failed).inc()
+        if cycle is not None:
+            if outcome != "send_failed":  # 已发送或可能已发送，同一个键不再发送
+                cycle.reach(DELIVERED)
+                self._remember_sent(cycle.key)
+            cycle.close(outcome)
+            self._log(cycle.describe())
+        self._check_all_done()
+        return sent
+
+    def _check_all_done(self):
+        with self.running_mutex:
+            running_state = self.is_running
+        if running_state and self.is_idle():
+            self._log("所有定时任务已完成")
+            self._refresh_running_state()
+
+    def is_idle(self):
+        """没有待分发的任务，也没有正在准备、等待触发的发送或未结束的群发"""
+        with self.running_mutex:
+            if self._scheduling:
+                return False
+        return (
+            not self.engine.has_jobs()
+            and not self.fire.pending()
+            and not any(not run.done for run in self._broadcast_runs())
+        )
+
+    def message_broadcast(self, targets, content):
+        """立即群发: 只激活一次窗口，逐个目标执行 搜索→选中→输入→发送，返回群发ID"""
+        targets = [t for t in targets if t]
+        if not targets or not content:
+            self._log("错误: 目标或内容为空")
+            return None
+        run = BroadcastRun(targets, content, clock=self.clock)
+        self._register_broadcast(run)
+        self._log(f"开始群发 {run.broadcast_id}，共 {len(targets)} 个目标")
+
+        def broadcast_job():
+            self._set_status(RUNNING)
+            self._run_broadcast(run)
+            with self.running_mutex:
+                running_state = self.is_running
+            self._set_status(RUNNING if running_state else IDLE)
+
+        self.executor.submit(INPUT_LANE, broadcast_job, label=run.broadcast_id)
+        return run.broadcast_id
+
+    def _register_broadcast(self, run, keep=100):
+        """登记群发，只保留最近 keep 个已结束的群发结果"""
+        with self.broadcasts_mutex:
+            finished = [bid for bid, r in self.broadcasts.items() if r.done]
+            for bid in finished[: max(0, len(finished) - keep + 1)]:
+                del self.broadcasts[bid]
+            self.broadcasts[run.broadcast_id] = run
+
+    def _broadcast_runs(self):
+        """已登记群发的快照，遍历时不持有锁"""
+        with self.broadcasts_mutex:
+            return list(self.broadcasts.values())
+
+    def get_broadcast(self, broadcast_id):
+        """按群发ID取 BroadcastRun，没有时返回 None"""
+        with self.broadcasts_mutex:
+            return self.broadcasts.get(broadcast_id)
+
+    def cancel_broadcast(self, broadcast_id):
+        """取消群发，正在处理的目标完成后停止，可在任意线程调用"""
+        run = self.get_broadcast(broadcast_id)
+        if run is None or run.done:
+            return False
+        run.cancel()
+        self._log(f"群发 {broadcast_id} 已请求取消")
+        return True
+
+    def broadcast_results(self, broadcast_id):
+        """群发的逐个目标结果"""
+        run = self.get_broadcast(broadcast_id)
+        return run.to_dict() if run else None
+
+    def _run_broadcast(self, run, start=0, activated=False):
+        """在同一次激活中依次处理 run.targets[start:]"""
+        if run.started is None:
+            run.begin()
+        if not activated:
+            self.chat_cache.observe(self._backend())
+        try:
+            for index in range(start, len(run.targets)):
+                if run.cancelled:
+                    self._log(f"群发 {run.broadcast_id} 已取消")
+                    break
+                target = run.targets[index]
+                cycle = self.latency.new_cycle(target, run.job_id, run.content, run.scheduled_time)
+                if cycle.key is not None and self._already_sent(cycle.key):
+                    self._log(f"{cycle.key} 已发送过，不再重复发送")
+                    cycle.close("duplicate")
+                    run.record(index, SENT, 0.0, "已发送过")
+                    continue
+                # 窗口已在前台时激活只是一次前台窗口查询；独立会话窗口与主窗口之间会来回切换
+                activate_start = self.clock.monotonic()
+                with cycle.span(ACTIVATE):
+                    hwnd = self._activate_chat_window(target)
+                if not activated:
+                    run.activate_seconds = self.clock.monotonic() - activate_start
+                    activated = True
+                    if not hwnd:
+                        self._log(f"警告: 未找到{self.window_title}窗口")
+                target_start = self.clock.monotonic()
+                self.metrics.attempted.inc()
+                try:
+                    self._prepare_chat(target, run.content, cycle, hwnd=hwnd)
+                    with cycle.span(SEND):
+                        wechat_ops.send_message(self.shortcuts, self.backend)
+                    cycle.reach(DELIVERED)
+                    if cycle.key is not None:
+                        self._remember_sent(cycle.key)
+                    self.chat_cache.mark_sent(self._backend())
+                    cycle.close("sent")
+                    self.metrics.succeeded.inc()
+                    run.record(index, SENT, self.clock.monotonic() - target_start)
+                    self._log(f"群发 [{index + 1}/{len(run.targets)}] {target} 已发送")
+                except Exception as e:
+                    cycle.close("error")
+                    self.chat_cache.invalidate()
+                    self.metrics.failed.inc()
+                    run.record(index, FAILED, self.clock.monotonic() - target_start, str(e))
+                    self._log(f"群发 [{index + 1}/{len(run.targets)}] {target} 失败: {e}")
+        finally:
+            run.finish()
+            self._log(run.summary())
+            self._check_all_done()
+
+    def _schedule_broadcast(self, target_time, job):
+        """定时群发: 提前准备第一个目标并精确发送，其余目标紧随其后依次发送
+
+        返回值同 message_schedule。
+        """
+        run = BroadcastRun(job.targets, job.content, job.job_id, target_time, self.clock)
+        self._register_broadcast(run)
+        self._log(f"群发任务 {job.job_id} 开始准备，共 {len(run.targets)} 个目标")
+        first = run.targets[0]
+        cycle = self.latency.new_cycle(first, job.job_id, job.content, target_time)
+        first_start = self.clock.monotonic()
+        prepared = self.message_prepare(first, job.content, cycle)
+        prepare_seconds = self.clock.monotonic() - first_start
+        run.activate_seconds = cycle.durations().get(ACTIVATE, 0.0)
+        if not prepared:
+            cycle.close("prepare_failed")
+            run.begin()
+            run.record(0, FAILED, prepare_seconds, "准备失败")
+            self._run_broadcast(run, start=1)
+            return True
+
+        fired = threading.Event()
+
+        def fire_first(error_ns=None):
+            try:
+                # 总耗时不计等待发送时刻的空闲时间
+                run.started = self.clock.monotonic() - prepare_seconds
+                sent = self.message_send(error_ns, cycle)
+                run.record(0, SENT if sent else FAILED, self.clock.monotonic() - run.started)
+            finally:
+                fired.set()
+
+        cycle.start(WAIT_FIRE)
+        if target_time > self.clock.now():
+            handle = self.fire.schedule(target_time, fire_first, label=job.job_id)
+            if not self._wait_fired(handle, fired):
+                cycle.close("cancelled")
+                run.finish()
+                self._log(f"群发 {run.broadcast_id} 已取消")
+                return False
+        else:
+            fire_first()
+        # 剩余目标在精确发送线程之外、仍占用输入通道的情况下依次发送
+        self._run_broadcast(run, 1, True)
+        return True
+
+    def _wait_fired(self, handle, fired):
+        """在输入通道中等待精确发送完成，其间继续占用键盘，其他任务按截止时刻排队
+
+        发送被取消或精确发送线程停止时返回 False。
+        """
+        while not fired.wait(0.5):
+            if handle.cancelled or not self.fire.running:
+                return False
+        return True
+
+    def latency_stats(self, target=None, recent=False):
+        """各阶段耗时的 p50/p95/p99/max，指定 target 时只返回该目标"""
+        snapshot = self.latency.snapshot(recent)
+        if target is None:
+            return snapshot
+        return snapshot["targets"].get(target, {})
+
+    def export_latency_json(self, path):
+        """在线程池中导出耗时统计及最近的发送周期明细为 JSON，返回 Task"""
+        def export_job():
+            try:
+                self.latency.export_json(path)
+                self._log(f"耗时统计已导出到 {path}")
+            except Exception as e:
+                self._log(f"导出耗时统计失败: {str(e)}")
+        return self.executor.submit(POOL_LANE, export_job, label="export-latency")
+
+    def enable_profiling(self, out_dir=PROFILE_DIR, interval=PROFILE_INTERVAL):
+        """开启发送周期采样分析，之后每个发送周期写出折叠栈和 speedscope 文件"""
+        from profiler import CycleProfiler
+
+        self.latency.profiler = CycleProfiler(
+            out_dir, interval, on_written=self._on_profile_written, max_seconds=PROFILE_MAX_SECONDS
+        )
+        self._log(f"发送周期采样分析已开启，输出到 {out_dir}")
+
+    def disable_profiling(self):
+        """关闭采样分析；进行中的周期仍会写出"""
+        if self.latency.profiler is not None:
+            self.latency.profiler = None
+            self._log("发送周期采样分析已关闭")
+
+    @property
+    def profiling(self):
+        return self.latency.profiler is not None
+
+    def _on_profile_written(self, paths):
+        self._log(f"已写入发送周期分析: {paths[0]}")
+
+    def start_metrics(self, port):
+        """开启本机指标端点，返回实际监听的端口(port 为 0 时随机分配)"""
+        if self._metrics_server is None:
+            from metrics import MetricsServer
+
+            self._metrics_server = MetricsServer(self, port).start()
+            self._log(f"指标端点: http://127.0.0.1:{self._metrics_server.port}/metrics")
+        return self._metrics_server.port
+
+    def stop_metrics(self):
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+            self._metrics_server = None
+
+    def executor_stats(self):
+        """各执行通道的队列深度、排队等待及执行耗时"""
+        return self.executor.stats()
+
+    def chat_cache_stats(self):
+        """会话定位缓存的命中/未命中/失效次数"""
+        return self.chat_cache.stats()
+
+    def fire_stats(self):
+        """最近发送的触发误差统计(毫秒)"""
+        return self.fire.stats()
+
+    def activate_previous_window(self):
+        """恢复之前的活动窗口"""
+        if hasattr(self, "current_window") and self.current_window:
+            try:
+                self._log("恢复之前的窗口状态")
+                self.current_window.activate()
+            except Exception as e:
+                self._log(f"恢复窗口失败: {str(e)}")
+
+    def validate_inputs(self, target, content, scheduled_time):
+        """验证一次性任务的输入"""
+        if not target:
+            self._log("错误: 请输入目标对话名称")
+            self.restore_inputs()  # 恢复输入框和按钮的可用性
+            return False
+
+        if not content:
+            self._log("错误: 请输入发送内容")
+            self.restore_inputs()  # 恢复输入框和按钮的可用性
+            return False
+
+        if scheduled_time <= self.clock.now():
+            self._log("错误: 请选择未来的时间")
+            self.restore_inputs()  # 恢复输入框和按钮的可用性
+            return False
+
+        return True
+
+    def restore_inputs(self):
+        """恢复输入框和按钮的可用性"""
+        # 其他任务仍在运行时保持“运行中”
+        self._set_status(RUNNING if self.engine.has_jobs() else IDLE)
+        self._log("恢复输入框和按钮的可用性")
+
+    def validate_repeat_inputs(self, target, content, days, repeat_type):
+        """验证循环任务的输入"""
+        if not target:
+            self._log("错误: 请输入目标对话名称")
+            return False
+
+        if not content:
+            self._log("错误: 请输入发送内容")
+            return False
+
+        if not days:
+            msg = (
+                "错误: 请输入每月发送的日期"
+                if repeat_type
+                else "错误: 请至少选择一个工作日"
+            )
+            self._log(msg)
+            return False
+
+        return True
+
+    def test_keyboard_operations(self, target, on_done=None):
+        """测试键盘操作，与定时任务一样在输入通道中排队执行，返回 Task(result 为是否成功)
+
+        on_done(是否成功) 在输入通道线程中调用；没有目标时返回 None。
+        """
+        if not target:
+            self._log("错误: 请输入目标对话名称")
+            return None
+
+        def test_job():
+            ok = self._test_keyboard(target)
+            if on_done is not None:
+                on_done(ok)
+            return ok
+
+        return self.executor.submit(INPUT_LANE, test_job, label="test-keyboard")
+
+    def calibrate_delays(
+        self,
+        target,
+        rounds=CALIBRATION_ROUNDS,
+        confidence=CALIBRATION_CONFIDENCE,
+        apply=False,
+        profile=None,
+    ):
+        """延时校准: 反复执行测试键盘操作的流程并测量各步骤的实际耗时，返回 Task
+
+        每轮单独在输入通道中排队，其间到点的定时任务可以插队。Task.result 为
+        (Calibration, 建议的 DELAYS)；apply 为真时直接应用，profile 给出名称时保存为命名配置。
+        """
+        import calibrate
+
+        def calibrate_job():
+            calibration = calibrate.Calibration(target, confidence)
+            self._log(f"开始延时校准: 目标 {target}，共 {rounds} 轮，置信水平 {confidence:.0%}")
+            self.chat_cache.invalidate()
+            for i in range(rounds):
+                try:
+                    self.executor.call(
+                        INPUT_LANE, self._calibrate_round, (calibration,), label=f"calibrate-{i}"
+                    )
+                except Exception as e:
+                    calibration.errors.append(str(e))
+                    self._log(f"第 {i + 1} 轮校准出错: {e}")
+            self.chat_cache.invalidate()
+            proposed = calibration.propose(self.delays)
+            self._report_calibration(calibration, proposed)
+            if profile:
+                calibrate.save_profile(DELAY_PROFILE_PATH, profile, proposed, calibration.to_dict())
+                self._log(f"校准结果已保存为配置 {profile}")
+            if apply:
+                self.update_delays(proposed)
+            return calibration, proposed
+
+        if not target:
+            self._log("错误: 请输入目标对话名称")
+            return None
+        return self.executor.submit(POOL_LANE, calibrate_job, label="calibrate")
+
+    def _report_calibration(self, calibration, proposed):
+        from calibrate import CALIBRATED_KEYS
+
+        for key in CALIBRATED_KEYS:
+            summary = calibration.summary(key)
+            if key in calibration.unobservable:
+                measured = "无法观测"
+            elif not summary["count"]:
+                measured = f"无样本(超时 {summary['timeouts']} 次)"
+            else:
+                measured = (
+                    f"{summary['count']} 次，中位数 {summary['p50']:.3f}秒，"
+                    f"分位数 {summary['quantile']:.3f}秒，最大 {summary['max']:.3f}秒，"
+                    f"超时 {summary['timeouts']} 次"
+                )
+            self._log(f"{key}: {measured}；当前 {self.delays[key]}秒 → 建议 {proposed[key]}秒")
+
+    def _calibrate_round(self, calibration):
+        import calibrate
+
+        backend = self._backend()
+        hwnd = backend.find_window(self.window_title)
+        if not hwnd:
+            raise RuntimeError(f"未找到{self.window_title}窗口")
+        calibrate.measure_round(calibration, hwnd, self.shortcuts, self.delays, backend)
+
+    def delay_profiles(self):
+        """已保存的延时配置名称"""
+        import calibrate
+
+        return sorted(calibrate.load_profiles(DELAY_PROFILE_PATH))
+
+    def apply_delay_profile(self, name):
+        """应用命名延时配置，返回应用后的 DELAYS；配置不存在时返回 None"""
+        import calibrate
+
+        delays = calibrate.get_profile(DELAY_PROFILE_PATH, name)
+        if delays is None:
+            self._log(f"错误: 没有名为 {name} 的延时配置")
+            return None
+        self.update_delays(delays)
+        self._log(f"已应用延时配置 {name}")
+        return dict(self.delays)
+
+    def _test_keyboard(self, target):
+        try:
+            self._log("开始测试键盘操作...")
+            self._log("测试打开搜索框...")
+            self.chat_cache.invalidate()
+            wechat_ops.search_and_select_chat(target, self.shortcuts, self.delays, self.backend)
+            self._log("键盘操作测试完成")
+            return True
+        except Exception as e:
+            self._log(f"键盘操作测试失败: {str(e)}")
+            return False
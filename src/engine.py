@@ -0,0 +1,565 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 09:12:40
+project: auto_send
+filename: engine.py
+version: 1.0
+"""
+
+"""多任务调度引擎：任务按准备时刻存放在最小堆中，由单个分发线程精确等待最早的一个"""
+import heapq
+import itertools
+import logging
+import threading
+import uuid
+from datetime import datetime, time, timedelta
+
+import recurrence
+from clock import SYSTEM_CLOCK
+
+ONCE = "once"
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+RULE = "rule"  # cron 表达式或 RRULE
+JOB_KINDS = (ONCE, WEEKLY, MONTHLY, RULE)
+
+# 停机期间错过发送时间的处理策略
+MISFIRE_FIRE_NOW = "fire_now"  # 立即补发
+MISFIRE_SKIP = "skip"  # 跳过，直接等下一次
+MISFIRE_GRACE = "grace"  # 错过不超过宽限时间则补发，否则跳过
+MISFIRE_POLICIES = (MISFIRE_FIRE_NOW, MISFIRE_SKIP, MISFIRE_GRACE)
+
+
+class Job:
+    """一个定时发送任务，目标和内容跟随任务本身保存
+
+    target 为列表且多于一个目标时是群发任务，到点后在同一次激活中依次发送。
+    """
+
+    def __init__(
+        self,
+        target,
+        content,
+        kind=ONCE,
+        scheduled_time=None,
+        days=None,
+        send_time=None,
+        job_id=None,
+        rule=None,
+    ):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"未知的任务类型: {kind}")
+        if kind == RULE and not rule:
+            raise ValueError("自定义规则任务缺少规则")
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.set_targets(target)
+        self.content = content
+        self.kind = kind
+        self.scheduled_time = scheduled_time  # 一次性任务的发送时间
+        self.days = sorted(set(days or []))  # 每周: 0-6(周一为0)；每月: 1-31，-1 表示月末
+        self.send_time = send_time  # 循环任务每天的发送时间
+        self.rule = rule  # 自定义规则，scheduled_time 作为 RRULE 的起点(DTSTART)
+        self._recurrence = None
+        self._recurrence_key = None
+        self.next_fire = None
+        self.version = 0
+        if kind == RULE:
+            self.recurrence()  # 规则有误时在创建任务时就报错
+
+    def set_targets(self, target):
+        """target 可以是单个名称或名称列表"""
+        self.targets = [target] if isinstance(target, str) else list(target)
+        self.target = self.targets[0] if len(self.targets) == 1 else "、".join(self.targets)
+
+    @property
+    def is_once(self):
+        return self.kind == ONCE
+
+    @property
+    def is_broadcast(self):
+        return len(self.targets) > 1
+
+    def recurrence(self):
+        """编译后的循环规则，按设置缓存，设置变化后重新编译；一次性任务返回 None"""
+        key = (self.kind, tuple(self.days), self.send_time, self.rule, self.scheduled_time)
+        if key != self._recurrence_key:
+            if self.kind == RULE:
+                self._recurrence = recurrence.compile_rule(self.rule, self.scheduled_time)
+            elif self.kind == ONCE or not self.days or self.send_time is None:
+                self._recurrence = None
+            elif self.kind == WEEKLY:
+                self._recurrence = recurrence.weekly(self.days, self.send_time)
+            else:
+                self._recurrence = recurrence.monthly(self.days, self.send_time)
+            self._recurrence_key = key
+        return self._recurrence
+
+    def next_fire_after(self, now):
+        """计算严格晚于 now 的下一次发送时间，没有则返回 None"""
+        if self.kind == ONCE:
+            if self.scheduled_time and self.scheduled_time > now:
+                return self.scheduled_time
+            return None
+        rule = self.recurrence()
+        return rule.next_after(now) if rule else None
+
+    def preview(self, count=5, after=None, clock=None):
+        """after(默认为 clock 的当前时间)之后 count 次发送时间"""
+        after = after or (clock or SYSTEM_CLOCK).now()
+        if self.kind == ONCE:
+            fire = self.next_fire_after(after)
+            return [fire] if fire else []
+        rule = self.recurrence()
+        return rule.preview(count, after) if rule else []
+
+    def describe(self):
+        if self.kind == ONCE:
+            when = self.scheduled_time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        elif self.kind == RULE:
+            when = f"规则 {self.rule}"
+        else:
+            label = "每周" if self.kind == WEEKLY else "每月"
+            when = f"{label}{self.days} {self.send_time.strftime('%H:%M:%S.%f')[:-3]}"
+        label = f"群发({len(self.targets)}) " if self.is_broadcast else ""
+        return f"[{self.job_id}] {label}{self.target} @ {when}"
+
+    def __repr__(self):
+        return f"Job({self.describe()})"
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "targets": self.targets,
+            "content": self.content,
+            "scheduled_time": self.scheduled_time.isoformat() if self.scheduled_time else None,
+            "days": self.days,
+            "send_time": self.send_time.isoformat() if self.send_time else None,
+            "rule": self.rule,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        targets = data.get("targets") or data.get("target")
+        scheduled_time = data.get("scheduled_time")
+        send_time = data.get("send_time")
+        return cls(
+            targets,
+            data["content"],
+            data.get("kind", ONCE),
+            scheduled_time=datetime.fromisoformat(scheduled_time) if scheduled_time else None,
+            days=data.get("days"),
+            send_time=time.fromisoformat(send_time) if send_time else None,
+            job_id=data.get("job_id"),
+            rule=data.get("rule"),
+        )
+
+
+class JobEngine:
+    """以下一次准备时刻为键的最小堆 + 单个分发线程
+
+    分发线程只在最早的准备时刻醒来；增删改任务时通过条件变量立刻重新布防，
+    空闲时不做任何轮询。
+    """
+
+    def __init__(self, on_fire, lead_time, on_change=None, store=None, clock=None):
+        self._on_fire = on_fire  # on_fire(job, fire_time)，在分发线程中调用
+        self._clock = clock or SYSTEM_CLOCK  # 取当前时间的时钟，模拟时为 VirtualClock
+        self._lead_time = lead_time  # lead_time(job) -> 提前准备秒数
+        self._on_change = on_change
+        self._store = store  # 可选的 JobStore，任务增删和下一次发送时间随之持久化
+        self._jobs = {}
+        # 已分发、尚未发送完的发送: job_id -> [发送时间]。任务库中保留其中最早的发送时间，
+        # 发送结束(fire_done)后才删除一次性任务或写入下一次发送时间，
+        # 在此之前停机时重启后按错过发送的策略处理
+        self._inflight = {}
+        self._heap = []  # (prepare_at, seq, job_id, version)
+        self._stale = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def set_store(self, store):
+        """启动后再接入任务库(界面先显示，再打开数据库)"""
+        with self._cond:
+            self._store = store
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="job-dispatcher")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def add_job(self, job, now=None):
+        """加入任务，返回其下一次发送时间；没有可发送时间时返回 None"""
+        with self._cond:
+            if job.job_id in self._jobs:
+                self._stale += 1
+            self._jobs[job.job_id] = job
+            self._arm(job, now or self._clock.now())
+            if job.next_fire is None:
+                del self._jobs[job.job_id]
+                self._persist_delete(job.job_id)
+            else:
+                self._persist_save(job)
+            self._cond.notify()
+        self._changed()
+        return job.next_fire
+
+    def add_jobs(self, jobs, now=None):
+        """批量加入任务，返回实际加入的任务列表(没有可发送时间的跳过)
+
+        先在一个事务中写入任务库，写入失败时一个都不加入；堆一次性重建，只唤醒一次。
+        """
+        now = now or self._clock.now()
+        accepted = []
+        for job in jobs:
+            if job.next_fire is None or job.next_fire <= now:
+                job.next_fire = job.next_fire_after(now)
+            if job.next_fire is not None:
+                accepted.append(job)
+        with self._cond:
+            if self._store is not None and accepted:
+                self._store.save_many(accepted)
+            for job in accepted:
+                if job.job_id in self._jobs:
+                    self._stale += 1
+                self._jobs[job.job_id] = job
+                job.version += 1
+                prepare_at = job.next_fire - timedelta(seconds=self._lead(job))
+                self._heap.append((prepare_at, next(self._seq), job.job_id, job.version))
+            heapq.heapify(self._heap)
+            self._cond.notify()
+        self._changed()
+        return accepted
+
+    def load_jobs(self, jobs, misfire_policy=MISFIRE_GRACE, grace=300.0, now=None):
+        """批量载入持久化的任务(已带 next_fire)，返回 [(任务, 错过的发送时间, 是否补发)]
+
+        未错过的任务直接使用保存的 next_fire，不重新计算；堆一次性建好。
+        """
+        with self._cond:
+            missed = self._load(jobs, misfire_policy, grace, now or self._clock.now())
+        self._changed()
+        return missed
+
+    def replan(self, misfire_policy=MISFIRE_GRACE, grace=300.0, now=None):
+        """时钟跳变后按当前墙上时间重建堆，返回 [(任务, 错过的发送时间, 是否补发)]
+
+        因时钟前跳而错过的发送按与启动时相同的策略补发或跳过；等待中的分发线程立即被唤醒。
+        """
+        with self._cond:
+            jobs = list(self._jobs.values())
+            self._heap = []
+            self._stale = 0
+            missed = self._load(jobs, misfire_policy, grace, now or self._clock.now())
+        self._changed()
+        return missed
+
+    def _load(self, jobs, misfire_policy, grace, now):
+        # 调用方持有锁
+        missed = []
+        changed = []
+        for job in jobs:
+            self._jobs[job.job_id] = job
+            job.version += 1
+            if job.next_fire is None:
+                job.next_fire = job.next_fire_after(now)
+                changed.append(job)
+            if job.next_fire is None:
+                del self._jobs[job.job_id]
+                if job.job_id not in self._inflight:
+                    self._persist_delete(job.job_id)
+                continue
+            prepare_at = job.next_fire - timedelta(seconds=self._lead(job))
+            if job.next_fire <= now:
+                late = (now - job.next_fire).total_seconds()
+                catch_up = misfire_policy == MISFIRE_FIRE_NOW or (
+                    misfire_policy == MISFIRE_GRACE and late <= grace
+                )
+                missed.append((job, job.next_fire, catch_up))
+                if catch_up:
+                    prepare_at = now  # 保留错过的发送时间，立即分发
+                else:
+                    job.next_fire = job.next_fire_after(now)
+                    changed.append(job)
+                    if job.next_fire is None:
+                        del self._jobs[job.job_id]
+                        if job.job_id not in self._inflight:
+                            self._persist_delete(job.job_id)
+                        continue
+                    prepare_at = job.next_fire - timedelta(seconds=self._lead(job))
+            self._heap.append((prepare_at, next(self._seq), job.job_id, job.version))
+        heapq.heapify(self._heap)
+        if changed:
+            self._persist_next_fires([j for j in changed if j.job_id in self._jobs])
+        self._cond.notify()
+        return missed
+
+    def cancel_job(self, job_id):
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return False
+            job.version += 1
+            self._stale += 1
+            self._inflight.pop(job_id, None)
+            self._persist_delete(job_id)
+            self._cond.notify()
+        self._changed()
+        return True
+
+    def update_job(self, job_id, **changes):
+        """修改任务属性并立即按新的发送时间重新布防"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            for key, value in changes.items():
+                if not hasattr(job, key) or key in (
+                    "job_id", "version", "next_fire", "targets"
+                ):
+                    raise AttributeError(f"任务没有可修改的属性: {key}")
+                if key == "target":
+                    job.set_targets(value)
+                else:
+                    setattr(job, key, sorted(set(value)) if key == "days" else value)
+            self._stale += 1
+            self._arm(job, self._clock.now())
+            if job.next_fire is None:
+                del self._jobs[job_id]
+                self._persist_delete(job_id)
+            else:
+                self._persist_save(job)
+            self._cond.notify()
+        self._changed()
+        return job.next_fire
+
+    def rearm_all(self):
+        """提前量变化后按新的提前量重排各任务的准备时刻
+
+        发送时间(next_fire)保持不变，已到期、排队等待补发的发送不会被跳过。
+        """
+        with self._cond:
+            self._heap = []
+            self._stale = 0
+            for job in self._jobs.values():
+                job.version += 1
+                prepare_at = job.next_fire - timedelta(seconds=self._lead(job))
+                self._heap.append((prepare_at, next(self._seq), job.job_id, job.version))
+            heapq.heapify(self._heap)
+            self._cond.notify()
+        self._changed()
+
+    def clear(self):
+        with self._cond:
+            for job in self._jobs.values():
+                job.version += 1
+            self._jobs.clear()
+            self._inflight.clear()
+            self._heap = []
+            self._stale = 0
+            if self._store is not None:
+                self._store.clear()
+            self._cond.notify()
+        self._changed()
+
+    def get_job(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """按下一次发送时间排序的任务列表"""
+        with self._cond:
+            return sorted(self._jobs.values(), key=lambda j: j.next_fire)
+
+    def has_jobs(self):
+        with self._cond:
+            return bool(self._jobs)
+
+    def __len__(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def _lead(self, job):
+        """提前准备秒数；估算出错时记录并按 0 处理，到发送时刻才准备，不让分发线程退出"""
+        try:
+            return self._lead_time(job)
+        except Exception as e:
+            logging.error(f"任务 {job.job_id} 计算提前量失败: {e}", exc_info=True)
+            return 0.0
+
+    def _arm(self, job, after):
+        job.version += 1
+        job.next_fire = job.next_fire_after(after)
+        if job.next_fire is None:
+            return
+        prepare_at = job.next_fire - timedelta(seconds=self._lead(job))
+        heapq.heappush(
+            self._heap, (prepare_at, next(self._seq), job.job_id, job.version)
+        )
+        # 失效条目过多时压缩，避免频繁取消后堆无限增长
+        if self._stale > 64 and self._stale > len(self._jobs):
+            self._compact()
+
+    def _compact(self):
+        self._heap = [
+            entry
+            for entry in self._heap
+            if entry[2] in self._jobs and self._jobs[entry[2]].version == entry[3]
+        ]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def _pop_due(self):
+        """取出所有已到准备时刻的任务；返回 (到期列表, 距下一个的秒数)
+
+        发送时刻早于到期任务的其他任务即使未到准备时刻也一并取出，交给按截止时刻排序的
+        输入通道先执行，避免提前量较大的任务先占住键盘(见 arbiter.py)。
+        """
+        due = []
+        now = self._clock.now()
+        wait = None
+        while self._heap:
+            prepare_at, _, job_id, version = self._heap[0]
+            job = self._jobs.get(job_id)
+            if job is None or job.version != version:
+                heapq.heappop(self._heap)
+                self._stale = max(0, self._stale - 1)
+                continue
+            if prepare_at > now:
+                wait = (prepare_at - now).total_seconds()
+                break
+            heapq.heappop(self._heap)
+            self._take(job, now, due)
+        if due:
+            latest = max(fire_time for _, fire_time in due)
+            taken = {job.job_id for job, _ in due}
+            earlier = [
+                job
+                for job in self._jobs.values()
+                if job.job_id not in taken and job.next_fire is not None and job.next_fire < latest
+            ]
+            for job in earlier:
+                self._stale += 1  # 其堆条目随之失效
+                self._take(job, now, due)
+        return due, wait
+
+    def _take(self, job, now, due):
+        # 只推进内存中的状态，任务库在 fire_done 时更新
+        fire_time = job.next_fire
+        due.append((job, fire_time))
+        self._inflight.setdefault(job.job_id, []).append(fire_time)
+        if job.is_once:
+            del self._jobs[job.job_id]
+        else:
+            # 补发错过的任务时从当前时刻往后排，避免连续补发多次
+            try:
+                self._arm(job, max(fire_time, now))
+            except Exception as e:
+                # 本次发送照常分发；规则出错的任务不再排下一次，以免每次分发都出错
+                logging.error(f"任务 {job.job_id} 计算下一次发送时间失败，已停止调度: {e}", exc_info=True)
+                job.next_fire = None
+            if job.next_fire is None:
+                del self._jobs[job.job_id]
+
+    def fire_done(self, job, fire_time):
+        """一次分发的发送已结束(无论成功与否)，把任务的推进写入任务库
+
+        同一任务还有更早分发、未结束的发送时只写入其中最早的发送时间；任务已被取消时不再写入。
+        """
+        with self._cond:
+            pending = self._inflight.get(job.job_id)
+            if not pending or fire_time not in pending:
+                return
+            pending.remove(fire_time)
+            if self._store is None:
+                if not pending:
+                    del self._inflight[job.job_id]
+                return
+            if pending:
+                try:
+                    self._store.set_next_fire(job.job_id, min(pending))
+                except Exception as e:
+                    logging.error(f"任务 {job.job_id} 写入任务库失败: {e}", exc_info=True)
+                return
+            del self._inflight[job.job_id]
+            current = self._jobs.get(job.job_id)
+            try:
+                if current is None:
+                    self._store.delete(job.job_id)
+                elif current is job:
+                    self._store.update_next_fire(job)
+                # 分发后被同 ID 的新任务替换时，新任务加入时已保存
+            except Exception as e:
+                # 记录保持分发前的状态，重启后按错过发送处理
+                logging.error(f"任务 {job.job_id} 写入任务库失败: {e}", exc_info=True)
+
+    def _persist_next_fires(self, jobs):
+        """批量写入下一次发送时间，发送中的任务跳过(其记录由 fire_done 更新)"""
+        if self._store is not None:
+            self._store.update_next_fire_many(
+                [job for job in jobs if job.job_id not in self._inflight]
+            )
+
+    def dispatch_due(self):
+        """不启动分发线程、由调用方推进时钟时使用(模拟): 分发按当前时钟已到准备时刻的任务
+
+        返回 (分发数, 距下一个准备时刻的秒数)，没有任务时秒数为 None。
+        """
+        with self._cond:
+            due, wait = self._pop_due()
+        for job, fire_time in due:
+            self._on_fire(job, fire_time)
+        return len(due), wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                try:
+                    due, wait = self._pop_due()
+                except Exception as e:
+                    # 单个任务的规则或数据出错不能让分发线程退出，稍后重试
+                    logging.error(f"分发任务出错: {e}", exc_info=True)
+                    self._cond.wait(1.0)
+                    continue
+                if not due:
+                    self._cond.wait(
+                        None if wait is None else min(wait, threading.TIMEOUT_MAX)
+                    )
+                    continue
+            for job, fire_time in due:
+                try:
+                    self._on_fire(job, fire_time)
+                except Exception as e:
+                    logging.error(f"任务 {job.job_id} 分发失败: {e}", exc_info=True)
+            self._changed()
+
+    def _persist_save(self, job):
+        if self._store is not None:
+            self._store.save(job)
+
+    def _persist_delete(self, job_id):
+        if self._store is not None:
+            self._store.delete(job_id)
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 16:05:47
+project: auto_send
+filename: executor.py
+version: 1.0
+"""
+
+"""有界执行器：独占键盘的输入通道 + 处理其他工作的线程池，工作线程常驻，不按调用创建线程"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from tracing import Histogram
+
+INPUT_LANE = "input"  # 单线程，所有驱动键盘/窗口焦点的操作在此串行执行
+POOL_LANE = "pool"  # 导出、渲染等不碰键盘的工作
+
+
+class Task:
+    """提交到执行器的一项工作，join() 与线程的 join 一样等待其结束"""
+
+    def __init__(self, fn, args, label, priority):
+        self.fn = fn
+        self.args = args
+        self.label = label
+        self.priority = priority  # 越小越先执行，默认为提交时的 monotonic 秒数(先进先出)
+        self.submitted_ns = time.monotonic_ns()
+        self.started_ns = None
+        self.finished_ns = None
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def join(self, timeout=None):
+        """等待结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """尽力取消尚未开始执行的任务，已开始时返回 False"""
+        if self.started_ns is not None:
+            return False
+        self.cancelled = True
+        return True
+
+    def wait_ms(self):
+        """排队等待时间(毫秒)，尚未开始时为到目前为止的等待时间"""
+        end = self.started_ns if self.started_ns is not None else time.monotonic_ns()
+        return (end - self.submitted_ns) / 1e6
+
+
+class Lane:
+    """固定数量工作线程的优先队列，记录队列深度、排队等待和执行耗时"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self._heap = []  # (priority, seq, task)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.max_depth = 0
+        self.busy = 0
+        self._wait = Histogram()  # 微秒
+        self._run_time = Histogram()
+
+    def submit(self, task):
+        with self._cond:
+            if self._closed:
+                task.cancelled = True
+                task._done.set()
+                return task
+            if not self._running:
+                self._start()
+            heapq.heappush(self._heap, (task.priority, next(self._seq), task))
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self._heap))
+            self._cond.notify()
+        return task
+
+    def _start(self):
+        # 首次提交时才创建工作线程，调用方已持有 self._cond
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def owns_current_thread(self):
+        return threading.current_thread() in self._threads
+
+    def depth(self):
+        with self._cond:
+            return len(self._heap)
+
+    def shutdown(self):
+        """取消排队中的任务并让工作线程退出，正在执行的任务不受影响"""
+        with self._cond:
+            self._running = False
+            self._closed = True
+            pending = [task for _, _, task in self._heap]
+            self._heap = []
+            self._cond.notify_all()
+        for task in pending:
+            task.cancelled = True
+            task._done.set()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                _, _, task = heapq.heappop(self._heap)
+                if task.cancelled:
+                    self.cancelled += 1
+                    task._done.set()
+                    continue
+                task.started_ns = time.monotonic_ns()
+                self.busy += 1
+            try:
+                task.result = task.fn(*task.args)
+            except Exception as e:
+                task.error = e
+                logging.error(f"{self.name} 任务 {task.label} 出错: {e}", exc_info=True)
+            finally:
+                task.finished_ns = time.monotonic_ns()
+                with self._cond:
+                    self.busy -= 1
+                    if task.error is None:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    self._wait.record((task.started_ns - task.submitted_ns) // 1000)
+                    self._run_time.record((task.finished_ns - task.started_ns) // 1000)
+                task._done.set()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "depth": len(self._heap),
+                "max_depth": self.max_depth,
+                "busy": self.busy,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "wait": self._wait.summary(),
+                "run": self._run_time.summary(),
+            }
+
+
+class Executor:
+    """输入通道(1 个线程) + 线程池(pool_workers 个线程)"""
+
+    def __init__(self, pool_workers=2):
+        self.lanes = {
+            INPUT_LANE: Lane(INPUT_LANE, 1),
+            POOL_LANE: Lane(POOL_LANE, max(1, pool_workers)),
+        }
+
+    def submit(self, lane, fn, args=(), label="", priority=None):
+        """提交 fn(*args) 到指定通道，返回 Task"""
+        if priority is None:
+            priority = time.monotonic()
+        return self.lanes[lane].submit(Task(fn, args, label, priority))
+
+    def call(self, lane, fn, args=(), label=""):
+        """在指定通道中同步执行 fn(*args) 并返回结果；已在该通道的线程中时直接执行"""
+        if self.lanes[lane].owns_current_thread():
+            return fn(*args)
+        task = self.submit(lane, fn, args, label)
+        task.join()
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def in_lane(self, lane):
+        return self.lanes[lane].owns_current_thread()
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def shutdown(self):
+        for lane in self.lanes.values():
+            lane.shutdown()
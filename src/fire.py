@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 11:05:52
+project: auto_send
+filename: fire.py
+version: 1.0
+"""
+
+"""精确发送线程：基于 perf_counter_ns 的截止时刻，先粗睡眠再短暂自旋"""
+import heapq
+import itertools
+import logging
+import sys
+import threading
+import time
+from collections import deque
+
+from clock import SYSTEM_CLOCK
+
+
+class FireHandle:
+    """一次待触发的发送，可用于取消"""
+
+    def __init__(self, target_time, deadline_ns, callback, label):
+        self.target_time = target_time  # 墙上时间，仅用于日志和重新规划
+        self.deadline_ns = deadline_ns  # perf_counter_ns 截止时刻
+        self.callback = callback  # callback(error_ns)
+        self.label = label
+        self.cancelled = False
+
+
+class FireEngine:
+    """专用的发送触发线程
+
+    截止时刻统一换算到 time.perf_counter_ns()，不受墙上时间调整影响；
+    粗睡眠到截止前 spin_margin 秒，再自旋不超过 max_spin 秒以消除计时器误差。
+    回调在本线程内执行，参数为实际触发时刻相对截止时刻的误差(纳秒，正数为晚)。
+    """
+
+    SPIN_SWITCH_INTERVAL = 0.0002
+
+    def __init__(self, spin_margin=0.02, max_spin=0.05, history=1000, clock=None):
+        self._clock = clock or SYSTEM_CLOCK  # 换算截止时刻时读取墙上时间
+        self.spin_margin_ns = int(spin_margin * 1e9)
+        self.max_spin_ns = int(max_spin * 1e9)
+        self._heap = []  # (deadline_ns, seq, handle)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._errors = deque(maxlen=history)
+
+    def deadline_for(self, target_time):
+        """把墙上时间换算为 perf_counter_ns 截止时刻"""
+        return time.perf_counter_ns() + int(
+            (target_time - self._clock.now()).total_seconds() * 1e9
+        )
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="fire-engine")
+            self._thread.daemon = True
+            self._thread.start()
+
+    @property
+    def running(self):
+        return self._running
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def schedule(self, target_time, callback, label=""):
+        """在墙上时间 target_time 触发 callback，返回 FireHandle"""
+        handle = FireHandle(
+            target_time, self.deadline_for(target_time), callback, label
+        )
+        self.start()
+        with self._cond:
+            heapq.heappush(self._heap, (handle.deadline_ns, next(self._seq), handle))
+            self._cond.notify()
+        return handle
+
+    def cancel(self, handle):
+        with self._cond:
+            handle.cancelled = True
+            self._cond.notify()
+
+    def cancel_all(self):
+        with self._cond:
+            for _, _, handle in self._heap:
+                handle.cancelled = True
+            self._heap = []
+            self._cond.notify()
+
+    def replan(self):
+        """墙上时间跳变后按各自的目标时间重新换算截止时刻，返回重新换算的数量"""
+        with self._cond:
+            entries, self._heap = self._heap, []
+            for _, seq, handle in entries:
+                if handle.cancelled:
+                    continue
+                handle.deadline_ns = self.deadline_for(handle.target_time)
+                self._heap.append((handle.deadline_ns, seq, handle))
+            heapq.heapify(self._heap)
+            self._cond.notify()
+            return len(self._heap)
+
+    def pending(self):
+        with self._cond:
+            return [h for _, _, h in sorted(self._heap) if not h.cancelled]
+
+    def stats(self):
+        """最近若干次触发的误差统计(毫秒)"""
+        errors = list(self._errors)
+        if not errors:
+            return {"count": 0}
+        abs_ms = [abs(e) / 1e6 for e in errors]
+        return {
+            "count": len(errors),
+            "mean_ms": sum(e / 1e6 for e in errors) / len(errors),
+            "mean_abs_ms": sum(abs_ms) / len(abs_ms),
+            "max_abs_ms": max(abs_ms),
+        }
+
+    def _next_due(self):
+        """等待直到最早的截止时刻进入自旋窗口，返回该条目；引擎停止时返回 None"""
+        with self._cond:
+            while self._running:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                deadline_ns = self._heap[0][0]
+                wait_ns = deadline_ns - self.spin_margin_ns - time.perf_counter_ns()
+                if wait_ns > 0:
+                    self._cond.wait(min(wait_ns / 1e9, threading.TIMEOUT_MAX))
+                    continue
+                return heapq.heappop(self._heap)[2]
+            return None
+
+    def _run(self):
+        while True:
+            handle = self._next_due()
+            if handle is None:
+                return
+            # 自旋阶段，最多 max_spin，避免计时异常时空转；
+            # 自旋期间缩短 GIL 切换间隔，防止到点时被其他线程占住解释器，到点即恢复，
+            # 回调(按键、日志)按原来的切换间隔运行，不影响其他线程
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(self.SPIN_SWITCH_INTERVAL)
+            try:
+                spin_until = time.perf_counter_ns() + self.max_spin_ns
+                now = time.perf_counter_ns()
+                while now < handle.deadline_ns and now < spin_until:
+                    now = time.perf_counter_ns()
+            finally:
+                sys.setswitchinterval(switch_interval)
+            if handle.cancelled:
+                continue
+            error_ns = time.perf_counter_ns() - handle.deadline_ns
+            self._errors.append(error_ns)
+            try:
+                handle.callback(error_ns)
+            except Exception as e:
+                logging.error(f"发送触发回调出错 {handle.label}: {e}", exc_info=True)
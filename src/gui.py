@@ -8,8 +8,9 @@
 @Date    : 2025/3/31 下午2:00
 """
 
-from PyQt5.QtCore import Qt, QDateTime, QTime
-from PyQt5.QtGui import QIntValidator, QKeySequence
+from collections import deque
+from PyQt5.QtCore import Qt, QDateTime, QRegExp, QTime, QTimer
+from PyQt5.QtGui import QKeySequence, QRegExpValidator
 from PyQt5.QtWidgets import (
     QMainWindow,
     QVBoxLayout,
@@ -28,10 +29,88 @@ from PyQt5.QtWidgets import (
     QKeySequenceEdit,
     QSpinBox,  # 添加 QSpinBox 用于时间偏移输入
     QDoubleSpinBox,  # 添加 QDoubleSpinBox 用于延时设置
+    QListWidget,
+    QListWidgetItem,
+    QFileDialog,
+    QDialog,
 )
+from config import INPUT_MODES, JOBS_VIEW_REFRESH_MS, LOG_VIEW_MAX_LINES, LOG_VIEW_REFRESH_MS
 from scheduler import STATUS, IDLE, RUNNING
 
 
+class HistoryDialog(QDialog):
+    """按目标和时间范围查询发送记录"""
+
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.setWindowTitle("发送记录")
+        self.resize(760, 480)
+        layout = QVBoxLayout()
+        filter_layout = QHBoxLayout()
+        self.target_input = QLineEdit()
+        self.target_input.setPlaceholderText("目标对话(留空为全部)")
+        self.since_input = QDateTimeEdit(QDateTime.currentDateTime().addDays(-90))
+        self.since_input.setDisplayFormat("yyyy-MM-dd HH:mm")
+        self.until_input = QDateTimeEdit(QDateTime.currentDateTime().addSecs(60))
+        self.until_input.setDisplayFormat("yyyy-MM-dd HH:mm")
+        self.limit_input = QSpinBox()
+        self.limit_input.setRange(1, 100000)
+        self.limit_input.setValue(1000)
+        self.query_btn = QPushButton("查询")
+        self.query_btn.clicked.connect(self.run_query)
+        for widget in (
+            self.target_input,
+            QLabel("从"),
+            self.since_input,
+            QLabel("到"),
+            self.until_input,
+            QLabel("最多"),
+            self.limit_input,
+            self.query_btn,
+        ):
+            filter_layout.addWidget(widget)
+        self.result_label = QLabel()
+        self.result_display = QPlainTextEdit()
+        self.result_display.setReadOnly(True)
+        self.result_display.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.result_display.setStyleSheet("font-family:Consolas,'Courier New',monospace;")
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.result_label)
+        layout.addWidget(self.result_display)
+        self.setLayout(layout)
+
+    def run_query(self):
+        records = self.scheduler.query_history(
+            self.target_input.text().strip() or None,
+            self.since_input.dateTime().toPyDateTime(),
+            self.until_input.dateTime().toPyDateTime(),
+            self.limit_input.value(),
+        )
+        self.result_label.setText(f"共 {len(records)} 条")
+        from audit import format_record
+
+        self.result_display.setPlainText("\n".join(format_record(r) for r in records))
+
+
+class ImportErrorsDialog(QDialog):
+    """批量导入后列出所有有错误的行"""
+
+    def __init__(self, result, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("导入错误")
+        self.resize(640, 420)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(result.summary()))
+        display = QPlainTextEdit()
+        display.setReadOnly(True)
+        display.setPlainText(
+            "\n".join(f"第 {number} 行: {message}" for number, message in result.errors)
+        )
+        layout.addWidget(display)
+        self.setLayout(layout)
+
+
 class WeChatSchedulerUI(QMainWindow):
     def __init__(self, scheduler):
         super().__init__()
@@ -40,8 +119,10 @@ class WeChatSchedulerUI(QMainWindow):
         self.setGeometry(100, 100, 900, 600)
 
         # 连接业务逻辑的信号
-        self.scheduler.log_signal.connect(self.append_log)
+        self.scheduler.log_signal.connect(self.append_logs)
         self.scheduler.status_signal.connect(self.update_status)
+        self.scheduler.jobs_signal.connect(self.schedule_refresh_jobs)
+        self.scheduler.keyboard_test_signal.connect(self._on_keyboard_tested)
 
         self.init_ui()
 
@@ -63,10 +144,17 @@ class WeChatSchedulerUI(QMainWindow):
 
         self.target_label = QLabel("目标对话名称(必须准确,如不唯一则为检索到的第一个):")
         self.target_input = QLineEdit()
-        self.target_input.setPlaceholderText("请输入完整的企业微信对话名称")
+        self.target_input.setPlaceholderText("请输入完整的企业微信对话名称，多个目标用分号分隔即为群发")
         self.content_label = QLabel("发送内容:")
         self.content_input = QTextEdit()
         self.content_input.setPlaceholderText("输入要发送的消息内容，支持多行")
+        self.input_mode_label = QLabel("内容输入方式:")
+        self.input_mode_input = QComboBox()
+        for mode, label in INPUT_MODES.items():
+            self.input_mode_input.addItem(label, mode)
+        self.input_mode_input.setCurrentIndex(
+            self.input_mode_input.findData(self.scheduler.input_mode)
+        )
 
         msg_layout.addWidget(self.window_title_label)
         msg_layout.addWidget(self.window_title_input)
@@ -74,6 +162,8 @@ class WeChatSchedulerUI(QMainWindow):
         msg_layout.addWidget(self.target_input)
         msg_layout.addWidget(self.content_label)
         msg_layout.addWidget(self.content_input)
+        msg_layout.addWidget(self.input_mode_label)
+        msg_layout.addWidget(self.input_mode_input)
         msg_group.setLayout(msg_layout)
 
         # 定时设置
@@ -87,8 +177,12 @@ class WeChatSchedulerUI(QMainWindow):
         self.prepare_input.setValue(10.0)
         self.prepare_input.setSuffix(" 秒")
         self.prepare_input.setSingleStep(1)
+        self.auto_lead_checkbox = QCheckBox("根据最近的准备耗时自动调整(样本不足时使用上面的值)")
+        self.auto_lead_checkbox.setChecked(self.scheduler.auto_lead)
+        self.auto_lead_checkbox.toggled.connect(self.scheduler.update_auto_lead)
         time_layout.addWidget(self.prepare_label)
         time_layout.addWidget(self.prepare_input)
+        time_layout.addWidget(self.auto_lead_checkbox)
 
         # 一次性定时
         self.once_checkbox = QCheckBox("一次性定时")
@@ -104,7 +198,7 @@ class WeChatSchedulerUI(QMainWindow):
         # 循环定时
         self.repeat_checkbox = QCheckBox("循环定时")
         self.repeat_type = QComboBox()
-        self.repeat_type.addItems(["每周", "每月"])
+        self.repeat_type.addItems(["每周", "每月", "自定义规则"])
         self.repeat_type.setEnabled(False)
 
         self.weekly_options = QWidget()
@@ -121,14 +215,30 @@ class WeChatSchedulerUI(QMainWindow):
         monthly_layout = QHBoxLayout()
         self.day_label = QLabel("每月第几天:")
         self.day_input = QLineEdit()
-        self.day_input.setValidator(QIntValidator(1, 31))
-        self.day_input.setPlaceholderText("1-31")
+        # 多个日期用逗号分隔，-1 表示月末
+        self.day_input.setValidator(QRegExpValidator(QRegExp(r"(-1|\d{1,2})([,，](-1|\d{1,2}))*[,，]?")))
+        self.day_input.setPlaceholderText("1-31，多个用逗号分隔，-1 表示月末")
         monthly_layout.addWidget(self.day_label)
         monthly_layout.addWidget(self.day_input)
         self.monthly_options.setLayout(monthly_layout)
         self.monthly_options.setEnabled(False)
         self.monthly_options.setVisible(False)
 
+        self.rule_options = QWidget()
+        rule_layout = QVBoxLayout()
+        rule_input_layout = QHBoxLayout()
+        self.rule_input = QLineEdit()
+        self.rule_input.setPlaceholderText("cron: 0 9 * * 1-5  或  RRULE: FREQ=MONTHLY;BYDAY=FR;BYSETPOS=-1;BYHOUR=17")
+        self.rule_preview_btn = QPushButton("预览")
+        self.rule_preview_btn.clicked.connect(self.preview_rule)
+        rule_input_layout.addWidget(self.rule_input)
+        rule_input_layout.addWidget(self.rule_preview_btn)
+        self.rule_preview_label = QLabel()
+        rule_layout.addLayout(rule_input_layout)
+        rule_layout.addWidget(self.rule_preview_label)
+        self.rule_options.setLayout(rule_layout)
+        self.rule_options.setVisible(False)
+
         self.repeat_time_label = QLabel("每天发送时间:")
         self.repeat_time_input = QDateTimeEdit()
         self.repeat_time_input.setDisplayFormat("HH:mm:ss.zzz")
@@ -148,6 +258,7 @@ class WeChatSchedulerUI(QMainWindow):
         time_layout.addWidget(self.repeat_type)
         time_layout.addWidget(self.weekly_options)
         time_layout.addWidget(self.monthly_options)
+        time_layout.addWidget(self.rule_options)
         time_layout.addWidget(self.repeat_time_label)
         time_layout.addWidget(self.repeat_time_input)
         time_layout.addWidget(self.offset_label)
@@ -172,6 +283,29 @@ class WeChatSchedulerUI(QMainWindow):
         control_layout.addWidget(self.stop_btn)
         control_layout.addWidget(self.send_now_btn)
 
+        # 任务列表
+        jobs_group = QGroupBox("任务列表")
+        jobs_layout = QVBoxLayout()
+        self.jobs_list = QListWidget()
+        self.cancel_job_btn = QPushButton("取消选中任务")
+        self.cancel_job_btn.clicked.connect(self.cancel_selected_job)
+        self.import_btn = QPushButton("批量导入")
+        self.import_btn.clicked.connect(self.import_jobs)
+        jobs_buttons = QHBoxLayout()
+        jobs_buttons.addWidget(self.cancel_job_btn)
+        jobs_buttons.addWidget(self.import_btn)
+        jobs_layout.addWidget(self.jobs_list)
+        jobs_layout.addLayout(jobs_buttons)
+        jobs_group.setLayout(jobs_layout)
+        self._jobs_refresh_timer = QTimer(self)
+        self._jobs_refresh_timer.setSingleShot(True)
+        self._jobs_refresh_timer.setInterval(JOBS_VIEW_REFRESH_MS)
+        self._jobs_refresh_timer.timeout.connect(self.refresh_jobs)
+        self._import_task = None
+        self._import_timer = QTimer(self)
+        self._import_timer.setInterval(200)
+        self._import_timer.timeout.connect(self._poll_import)
+
         # 状态显示
         self.status_label = QLabel("状态: 未运行")
         self.status_label.setAlignment(Qt.AlignCenter)  # type: ignore
@@ -180,6 +314,7 @@ class WeChatSchedulerUI(QMainWindow):
         left_layout.addWidget(msg_group)
         left_layout.addWidget(time_group)
         left_layout.addLayout(control_layout)
+        left_layout.addWidget(jobs_group)
         left_layout.addWidget(self.status_label)
         left_panel.setLayout(left_layout)
 
@@ -207,14 +342,15 @@ class WeChatSchedulerUI(QMainWindow):
         shortcut_group.setLayout(shortcut_layout)
 
         # 延时设置
-        delay_group = QGroupBox("延时设置(秒)")
+        delay_group = QGroupBox("延时设置(秒，为等待上限，界面就绪即继续)")
         delay_layout = QVBoxLayout()
 
         # 窗口激活等待延时
         window_active_delay_layout = QHBoxLayout()
         self.window_active_delay_label = QLabel("窗口激活等待延时:")
         self.window_active_delay_input = QDoubleSpinBox()
-        self.window_active_delay_input.setRange(0.1, 10.0)
+        self.window_active_delay_input.setRange(0.01, 60.0)
+        self.window_active_delay_input.setDecimals(3)
         self.window_active_delay_input.setValue(1.0)
         self.window_active_delay_input.setSingleStep(0.1)
         window_active_delay_layout.addWidget(self.window_active_delay_label)
@@ -224,7 +360,8 @@ class WeChatSchedulerUI(QMainWindow):
         search_delay_layout = QHBoxLayout()
         self.search_delay_label = QLabel("搜索框打开等待延时:")
         self.search_delay_input = QDoubleSpinBox()
-        self.search_delay_input.setRange(0.1, 10.0)
+        self.search_delay_input.setRange(0.01, 60.0)
+        self.search_delay_input.setDecimals(3)
         self.search_delay_input.setValue(1.5)
         self.search_delay_input.setSingleStep(0.1)
         search_delay_layout.addWidget(self.search_delay_label)
@@ -234,7 +371,8 @@ class WeChatSchedulerUI(QMainWindow):
         search_result_delay_layout = QHBoxLayout()
         self.search_result_delay_label = QLabel("搜索结果等待延时:")
         self.search_result_delay_input = QDoubleSpinBox()
-        self.search_result_delay_input.setRange(0.1, 10.0)
+        self.search_result_delay_input.setRange(0.01, 60.0)
+        self.search_result_delay_input.setDecimals(3)
         self.search_result_delay_input.setValue(1.5)
         self.search_result_delay_input.setSingleStep(0.1)
         search_result_delay_layout.addWidget(self.search_result_delay_label)
@@ -244,7 +382,8 @@ class WeChatSchedulerUI(QMainWindow):
         chat_delay_layout = QHBoxLayout()
         self.chat_delay_label = QLabel("对话打开等待延时:")
         self.chat_delay_input = QDoubleSpinBox()
-        self.chat_delay_input.setRange(0.1, 10.0)
+        self.chat_delay_input.setRange(0.01, 60.0)
+        self.chat_delay_input.setDecimals(3)
         self.chat_delay_input.setValue(1.0)
         self.chat_delay_input.setSingleStep(0.1)
         chat_delay_layout.addWidget(self.chat_delay_label)
@@ -254,7 +393,8 @@ class WeChatSchedulerUI(QMainWindow):
         line_delay_layout = QHBoxLayout()
         self.line_delay_label = QLabel("每行输入等待延时:")
         self.line_delay_input = QDoubleSpinBox()
-        self.line_delay_input.setRange(0.05, 5.0)
+        self.line_delay_input.setRange(0.01, 5.0)
+        self.line_delay_input.setDecimals(3)
         self.line_delay_input.setValue(0.1)
         self.line_delay_input.setSingleStep(0.05)
         line_delay_layout.addWidget(self.line_delay_label)
@@ -265,7 +405,28 @@ class WeChatSchedulerUI(QMainWindow):
         delay_layout.addLayout(search_result_delay_layout)
         delay_layout.addLayout(chat_delay_layout)
         delay_layout.addLayout(line_delay_layout)
+
+        # 延时校准及命名配置
+        calibrate_layout = QHBoxLayout()
+        self.profile_name_input = QLineEdit()
+        self.profile_name_input.setPlaceholderText("配置名称(可选)")
+        self.calibrate_btn = QPushButton("校准延时")
+        self.calibrate_btn.clicked.connect(self.calibrate_delays)
+        calibrate_layout.addWidget(self.profile_name_input)
+        calibrate_layout.addWidget(self.calibrate_btn)
+        profile_layout = QHBoxLayout()
+        self.profile_input = QComboBox()  # 首帧之后由 reload_delay_profiles 读取配置文件填充
+        self.load_profile_btn = QPushButton("载入配置")
+        self.load_profile_btn.clicked.connect(self.load_delay_profile)
+        profile_layout.addWidget(self.profile_input)
+        profile_layout.addWidget(self.load_profile_btn)
+        delay_layout.addLayout(calibrate_layout)
+        delay_layout.addLayout(profile_layout)
         delay_group.setLayout(delay_layout)
+        self._calibration_task = None
+        self._calibration_timer = QTimer(self)
+        self._calibration_timer.setInterval(200)
+        self._calibration_timer.timeout.connect(self._poll_calibration)
 
         # 将延时设置组添加到右侧布局
         right_layout.addWidget(shortcut_group)
@@ -276,6 +437,15 @@ class WeChatSchedulerUI(QMainWindow):
         self.log_display.setReadOnly(True)
         self.log_display.setLineWrapMode(QPlainTextEdit.NoWrap)
         self.log_display.setStyleSheet("font-family:Consolas,'Courier New',monospace;")
+        # 由控件自身按块数裁剪旧日志
+        self.log_display.setMaximumBlockCount(LOG_VIEW_MAX_LINES)
+
+        # 待显示日志的环形缓冲，定时合并刷新，每行追加为 O(1)
+        self._pending_logs = deque(maxlen=LOG_VIEW_MAX_LINES)
+        self._log_flush_timer = QTimer(self)
+        self._log_flush_timer.setSingleShot(True)
+        self._log_flush_timer.setInterval(LOG_VIEW_REFRESH_MS)
+        self._log_flush_timer.timeout.connect(self.flush_logs)
 
         # 添加清除日志按钮
         self.clear_log_btn = QPushButton("清空日志")
@@ -284,6 +454,16 @@ class WeChatSchedulerUI(QMainWindow):
         right_layout.addWidget(self.log_label)
         right_layout.addWidget(self.log_display)
         right_layout.addWidget(self.clear_log_btn)
+        self.export_latency_btn = QPushButton("导出耗时统计")
+        self.export_latency_btn.clicked.connect(self.export_latency)
+        right_layout.addWidget(self.export_latency_btn)
+        self.profile_checkbox = QCheckBox("采样分析发送周期(输出火焰图文件)")
+        self.profile_checkbox.setChecked(self.scheduler.profiling)
+        self.profile_checkbox.toggled.connect(self.update_profiling)
+        right_layout.addWidget(self.profile_checkbox)
+        self.history_btn = QPushButton("查询发送记录")
+        self.history_btn.clicked.connect(self.show_history)
+        right_layout.addWidget(self.history_btn)
         right_panel.setLayout(right_layout)
 
         # 使用QSpliter实现可调整大小的左右面板
@@ -302,36 +482,34 @@ class WeChatSchedulerUI(QMainWindow):
         self.repeat_type.currentIndexChanged.connect(self.update_repeat_options)
 
     def update_ui_state(self):
-        """根据当前运行状态及一次性/循环定时状态更新输入框和按钮的可用性"""
+        """根据当前运行状态及一次性/循环定时状态更新输入框和按钮的可用性
+
+        调度引擎支持多任务，运行中仍可继续添加任务。
+        """
         is_running = self.scheduler.is_running
 
         # 一次性定时相关
-        self.once_checkbox.setEnabled(not is_running)
-        self.oncetime_input.setEnabled(
-            not is_running and self.once_checkbox.isChecked()
-        )
+        self.oncetime_input.setEnabled(self.once_checkbox.isChecked())
 
         # 循环定时相关
-        self.repeat_checkbox.setEnabled(not is_running)
-        self.repeat_type.setEnabled(not is_running and self.repeat_checkbox.isChecked())
+        self.repeat_type.setEnabled(self.repeat_checkbox.isChecked())
         self.weekly_options.setEnabled(
-            not is_running
-            and self.repeat_checkbox.isChecked()
-            and self.repeat_type.currentIndex() == 0
+            self.repeat_checkbox.isChecked() and self.repeat_type.currentIndex() == 0
         )
         self.monthly_options.setEnabled(
-            not is_running
-            and self.repeat_checkbox.isChecked()
-            and self.repeat_type.currentIndex() == 1
+            self.repeat_checkbox.isChecked() and self.repeat_type.currentIndex() == 1
         )
+        self.rule_options.setEnabled(
+            self.repeat_checkbox.isChecked() and self.repeat_type.currentIndex() == 2
+        )
+        # 自定义规则自带发送时间
         self.repeat_time_input.setEnabled(
-            not is_running and self.repeat_checkbox.isChecked()
+            self.repeat_checkbox.isChecked() and self.repeat_type.currentIndex() != 2
         )
 
         # 控制按钮
-        self.start_btn.setEnabled(not is_running)
+        self.start_btn.setText("添加定时" if is_running else "开始定时")
         self.stop_btn.setEnabled(is_running)
-        self.offset_input.setEnabled(not is_running)
 
     def update_repeat_schedule(self):
         """更新循环定时相关选项的可见性和状态"""
@@ -348,16 +526,40 @@ class WeChatSchedulerUI(QMainWindow):
 
     def update_repeat_options(self):
         """根据循环定时类型更新选项的可见性"""
-        if self.repeat_type.currentIndex() == 0:  # 每周
-            self.weekly_options.setVisible(True)
-            self.monthly_options.setVisible(False)
-        elif self.repeat_type.currentIndex() == 1:  # 每月
-            self.weekly_options.setVisible(False)
-            self.monthly_options.setVisible(True)
+        index = self.repeat_type.currentIndex()
+        self.weekly_options.setVisible(index == 0)  # 每周
+        self.monthly_options.setVisible(index == 1)  # 每月
+        self.rule_options.setVisible(index == 2)  # 自定义规则
         self.update_ui_state()
 
+    def preview_rule(self):
+        """显示自定义规则接下来 5 次发送时间"""
+        rule = self.rule_input.text().strip()
+        if not rule:
+            self.rule_preview_label.setText("请输入规则")
+            return
+        try:
+            fires = self.scheduler.preview_fires(rule, 5)
+        except ValueError as e:
+            self.rule_preview_label.setText(f"规则无效: {e}")
+            return
+        if not fires:
+            self.rule_preview_label.setText("该规则没有可发送的时间")
+            return
+        self.rule_preview_label.setText(
+            "\n".join(fire.strftime("%Y-%m-%d %a %H:%M:%S.%f")[:-3] for fire in fires)
+        )
+
+    def parse_targets(self):
+        """解析目标输入，多个目标用中英文分号分隔；只有一个目标时返回字符串"""
+        text = self.target_input.text().replace("；", ";")
+        targets = [t.strip() for t in text.split(";") if t.strip()]
+        if len(targets) == 1:
+            return targets[0]
+        return targets
+
     def start_scheduler(self):
-        target = self.target_input.text().strip()
+        target = self.parse_targets()
         content = self.content_input.toPlainText().strip()
         if not target:
             self.append_log("目标对话不能为空！")
@@ -373,31 +575,27 @@ class WeChatSchedulerUI(QMainWindow):
             "send_message": self.send_message_input.keySequence().toString(),
         }
         self.scheduler.update_shortcuts(shortcuts)
+        self.scheduler.update_input_mode(self.input_mode_input.currentData())
         # 更新窗口标题
-        self.scheduler.window_title = self.window_title_input.text().strip()
-        # 更新延时设置
-        delays = {
-            "prepare_pre_time": self.prepare_input.value(),
-            "window_active_delay": self.window_active_delay_input.value(),
-            "search_delay": self.search_delay_input.value(),
-            "search_result_delay": self.search_result_delay_input.value(),
-            "chat_delay": self.chat_delay_input.value(),
-            "line_delay": self.line_delay_input.value(),
-        }
-        self.scheduler.update_delays(delays)
+        self.scheduler.update_window_title(self.window_title_input.text().strip())
+        # 更新延时设置: 只回写界面上改动过的项，校准或配置给出的值不被输入框的精度改写
+        delays = self._changed_delays()
+        if delays:
+            self.scheduler.update_delays(delays)
         if self.once_checkbox.isChecked():
             scheduled_time = (
                 self.oncetime_input.dateTime().addMSecs(offset).toPyDateTime()
             )
             self.scheduler.start_once_schedule(target, content, scheduled_time)
+        elif self.repeat_checkbox.isChecked() and self.repeat_type.currentIndex() == 2:
+            self.scheduler.start_rule_schedule(target, content, self.rule_input.text().strip())
         elif self.repeat_checkbox.isChecked():
             if self.repeat_type.currentIndex() == 0:  # 0 corresponds to "每周"
                 days = [i for i, cb in enumerate(self.weekdays) if cb.isChecked()]
             elif self.repeat_type.currentIndex() == 1:  # 1 corresponds to "每月"
-                try:
-                    days = [int(self.day_input.text())]
-                except:
-                    days = []
+                text = self.day_input.text().replace("，", ",")
+                days = [int(d) for d in text.split(",") if d.strip()]
+                days = [d for d in days if 1 <= d <= 31 or d == -1]
 
             send_time = self.repeat_time_input.time().addMSecs(offset).toPyTime()
             self.scheduler.start_repeating_schedule(
@@ -424,6 +622,7 @@ class WeChatSchedulerUI(QMainWindow):
         self.repeat_type.setEnabled(enabled)
         self.monthly_options.setEnabled(enabled)
         self.day_input.setEnabled(enabled)
+        self.rule_options.setEnabled(enabled)
         self.weekly_options.setEnabled(enabled)
         for cb in self.weekdays:
             cb.setEnabled(enabled)
@@ -434,8 +633,8 @@ class WeChatSchedulerUI(QMainWindow):
         self.update_repeat_schedule()
 
     def send_message_now(self):
-        """立即发送消息，不影响定时任务状态"""
-        target = self.target_input.text().strip()
+        """立即发送消息，不影响定时任务状态；多个目标时群发"""
+        target = self.parse_targets()
         content = self.content_input.toPlainText().strip()
         if not target:
             self.append_log("目标对话不能为空！")
@@ -446,33 +645,90 @@ class WeChatSchedulerUI(QMainWindow):
         # 更新窗口标题
         window_title = self.window_title_input.text().strip()
         self.scheduler.update_window_title(window_title)
+        self.scheduler.update_input_mode(self.input_mode_input.currentData())
 
         # 保存当前按钮状态
         start_btn_state = self.start_btn.isEnabled()
         stop_btn_state = self.stop_btn.isEnabled()
 
         # 执行发送，不改变定时任务状态
-        self.scheduler.message_send_immed(target, content)
+        if isinstance(target, list):
+            self.scheduler.message_broadcast(target, content)
+        else:
+            self.scheduler.message_send_immed(target, content)
 
         # 恢复按钮状态
         self.start_btn.setEnabled(start_btn_state)
         self.stop_btn.setEnabled(stop_btn_state)
 
+    def append_logs(self, lines):
+        """追加一批日志"""
+        self._pending_logs.extend(lines)
+        if not self._log_flush_timer.isActive():
+            self._log_flush_timer.start()
+
     def append_log(self, message):
-        """追加日志到显示区域"""
-        self.log_display.appendPlainText(message)
-        max_lines = 1000
-        if self.log_display.blockCount() > max_lines:
-            cursor = self.log_display.textCursor()
-            cursor.movePosition(cursor.Start)
-            for _ in range(self.log_display.blockCount() - max_lines):
-                cursor.select(cursor.LineUnderCursor)
-                cursor.removeSelectedText()
-                cursor.deleteChar()
-        # 自动滚动到底部
-        self.log_display.verticalScrollBar().setValue(  # type: ignore
-            self.log_display.verticalScrollBar().maximum()  # type: ignore
-        )
+        """追加日志到显示区域，最多每 LOG_VIEW_REFRESH_MS 毫秒合并重绘一次"""
+        self._pending_logs.append(message)
+        if not self._log_flush_timer.isActive():
+            self._log_flush_timer.start()
+
+    def flush_logs(self):
+        """把缓冲中的日志一次性写入面板"""
+        if not self._pending_logs:
+            return
+        scrollbar = self.log_display.verticalScrollBar()
+        # 只有用户原本就在底部时才自动滚动
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 1  # type: ignore
+        text = "\n".join(self._pending_logs)
+        self._pending_logs.clear()
+        self.log_display.appendPlainText(text)
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())  # type: ignore
+
+    def schedule_refresh_jobs(self):
+        """任务变化后最多每 JOBS_VIEW_REFRESH_MS 毫秒合并刷新一次任务列表"""
+        if not self._jobs_refresh_timer.isActive():
+            self._jobs_refresh_timer.start()
+
+    def refresh_jobs(self):
+        """按任务ID增量刷新任务列表: 删除已结束的任务，只改动文字或位置变化的行，保留选中状态"""
+        jobs = self.scheduler.list_jobs()
+        wanted = {job.job_id for job in jobs}
+        self.jobs_list.setUpdatesEnabled(False)
+        try:
+            items = {}
+            for row in reversed(range(self.jobs_list.count())):
+                item = self.jobs_list.item(row)
+                job_id = item.data(Qt.UserRole)  # type: ignore
+                if job_id in wanted:
+                    items[job_id] = item
+                else:
+                    self.jobs_list.takeItem(row)
+            for index, job in enumerate(jobs):
+                next_fire = job.next_fire.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+                text = f"{next_fire}  {job.describe()}"
+                item = items.get(job.job_id)
+                if item is None:
+                    item = QListWidgetItem(text)
+                    item.setData(Qt.UserRole, job.job_id)  # type: ignore
+                    self.jobs_list.insertItem(index, item)
+                    continue
+                if item.text() != text:
+                    item.setText(text)
+                if self.jobs_list.item(index) is not item:
+                    # 下一次发送时间变化后顺序改变，移到新位置
+                    selected = item.isSelected()
+                    self.jobs_list.takeItem(self.jobs_list.row(item))
+                    self.jobs_list.insertItem(index, item)
+                    item.setSelected(selected)
+        finally:
+            self.jobs_list.setUpdatesEnabled(True)
+
+    def cancel_selected_job(self):
+        """取消选中的任务"""
+        for item in self.jobs_list.selectedItems():
+            self.scheduler.cancel_job(item.data(Qt.UserRole))  # type: ignore
 
     def update_status(self, status):
         """更新状态显示并调整 UI"""
@@ -481,16 +737,143 @@ class WeChatSchedulerUI(QMainWindow):
 
     def clear_log(self):
         """清除日志"""
+        self._pending_logs.clear()
         self.log_display.clear()
 
+    def show_history(self):
+        HistoryDialog(self.scheduler, self).exec_()
+
+    def import_jobs(self):
+        """从 CSV/XLSX 批量导入任务，在后台校验和写入"""
+        if self._import_task is not None:
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self, "批量导入任务", "", "表格 (*.csv *.xlsx);;所有文件 (*)"
+        )
+        if not path:
+            return
+        self._import_task = self.scheduler.import_jobs(path)
+        self.import_btn.setEnabled(False)
+        self._import_timer.start()
+
+    def _poll_import(self):
+        task = self._import_task
+        if not task.done:
+            return
+        self._import_timer.stop()
+        self._import_task = None
+        self.import_btn.setEnabled(True)
+        if task.error is not None or task.result is None:
+            self.append_log("批量导入失败！")
+            return
+        result = task.result
+        if result.errors:
+            ImportErrorsDialog(result, self).exec_()
+
+    def export_latency(self):
+        """导出各阶段耗时统计为 JSON"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "导出耗时统计", "latency.json", "JSON (*.json)"
+        )
+        if path:
+            self.scheduler.export_latency_json(path)
+
+    def update_profiling(self, enabled):
+        if enabled:
+            self.scheduler.enable_profiling()
+        else:
+            self.scheduler.disable_profiling()
+
     def closeEvent(self, event):  # type: ignore
-        """窗口关闭事件"""
-        self.scheduler.stop_scheduler()
+        """窗口关闭事件，任务已持久化，下次启动时恢复"""
+        self.scheduler.shutdown()
         event.accept()
 
+    def calibrate_delays(self):
+        """在后台校准延时，完成后把建议值填入延时设置并应用"""
+        if self._calibration_task is not None:
+            return
+        name = self.profile_name_input.text().strip() or None
+        task = self.scheduler.calibrate_delays(
+            self.target_input.text().strip(), apply=True, profile=name
+        )
+        if task is None:
+            return
+        self._calibration_task = task
+        self.calibrate_btn.setEnabled(False)
+        self._calibration_timer.start()
+
+    def _poll_calibration(self):
+        task = self._calibration_task
+        if not task.done:
+            return
+        self._calibration_timer.stop()
+        self._calibration_task = None
+        self.calibrate_btn.setEnabled(True)
+        if task.error is not None or task.result is None:
+            self.append_log("延时校准失败！")
+            return
+        _, proposed = task.result
+        self._set_delay_inputs(proposed)
+        self.reload_delay_profiles()
+        self.append_log("延时校准完成，建议值已应用")
+
+    def reload_delay_profiles(self):
+        """重新读取已保存的延时配置名称"""
+        self.profile_input.clear()
+        self.profile_input.addItems(self.scheduler.delay_profiles())
+
+    def load_delay_profile(self):
+        name = self.profile_input.currentText()
+        if not name:
+            return
+        delays = self.scheduler.apply_delay_profile(name)
+        if delays is not None:
+            self._set_delay_inputs(delays)
+
+    def _delay_spins(self):
+        return (
+            ("prepare_pre_time", self.prepare_input),
+            ("window_active_delay", self.window_active_delay_input),
+            ("search_delay", self.search_delay_input),
+            ("search_result_delay", self.search_result_delay_input),
+            ("chat_delay", self.chat_delay_input),
+            ("line_delay", self.line_delay_input),
+        )
+
+    def _set_delay_inputs(self, delays):
+        for key, spin in self._delay_spins():
+            if key in delays:
+                spin.setValue(delays[key])
+
+    def _changed_delays(self):
+        """输入框中与当前设置不同的延时
+
+        超出输入框范围或精度的设置值显示为截断后的值，用户未改动时按原值保留。
+        """
+        changed = {}
+        for key, spin in self._delay_spins():
+            value = spin.value()
+            current = self.scheduler.delays.get(key)
+            if current is None:
+                changed[key] = value
+                continue
+            shown = round(min(max(current, spin.minimum()), spin.maximum()), spin.decimals())
+            if value != shown:
+                changed[key] = value
+        return changed
+
     def test_keyboard(self):
-        """测试键盘操作"""
-        if self.scheduler.test_keyboard_operations(self.target_input.text().strip()):
+        """测试键盘操作，在输入通道中执行，结果经 keyboard_test_signal 回到界面线程"""
+        task = self.scheduler.test_keyboard_operations(
+            self.target_input.text().strip(), on_done=self.scheduler.keyboard_test_signal.emit
+        )
+        if task is not None:
+            self.test_btn.setEnabled(False)
+
+    def _on_keyboard_tested(self, ok):
+        self.test_btn.setEnabled(True)
+        if ok:
             self.append_log("键盘操作测试成功！")
         else:
             self.append_log("键盘操作测试失败！")
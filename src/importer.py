@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 20:05:31
+project: auto_send
+filename: importer.py
+version: 1.0
+"""
+
+"""从 CSV/XLSX 批量导入任务：逐行流式读取并校验，所有行的错误一次性报告
+
+首行为表头，列名(中英文均可):
+    target/目标      必填，多个目标用分号分隔(群发)
+    content/内容     必填
+    time/发送时间    一次性任务的发送时间，如 2026-10-20 09:30:00
+    kind/类型        once/weekly/monthly/rule，或 一次性/每周/每月/规则；省略时有 rule 为规则任务，否则为一次性
+    days/日期        每周: 0-6(周一为0)；每月: 1-31，-1 表示月末；多个用逗号分隔
+    send_time/每天发送时间  循环任务每天的发送时间，如 08:00:00
+    rule/规则        cron 表达式或 RRULE
+XLSX 需要 openpyxl，只在导入 XLSX 时才导入。
+"""
+import csv
+import time as _time
+from datetime import date, datetime, time
+
+from engine import Job, ONCE, WEEKLY, MONTHLY, RULE, JOB_KINDS
+
+_COLUMNS = {
+    "target": "target",
+    "目标": "target",
+    "content": "content",
+    "内容": "content",
+    "time": "time",
+    "发送时间": "time",
+    "kind": "kind",
+    "类型": "kind",
+    "days": "days",
+    "日期": "days",
+    "send_time": "send_time",
+    "每天发送时间": "send_time",
+    "rule": "rule",
+    "规则": "rule",
+}
+_KINDS = {"一次性": ONCE, "每周": WEEKLY, "每月": MONTHLY, "规则": RULE, "自定义规则": RULE}
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportResult:
+    """导入结果: 读取行数、有效任务、[(行号, 错误)]"""
+
+    def __init__(self):
+        self.rows = 0
+        self.jobs = []
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def summary(self):
+        return (
+            f"共 {self.rows} 行，有效 {len(self.jobs)} 个任务，"
+            f"错误 {len(self.errors)} 行，耗时 {self.seconds:.2f}秒"
+        )
+
+
+def _iter_csv(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            yield row
+
+
+def _iter_xlsx(path):
+    try:
+        import openpyxl
+    except ImportError:
+        raise RowError("导入 XLSX 需要安装 openpyxl") from None
+    # 只读模式按行流式读取，不把整个工作表载入内存
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def iter_rows(path):
+    """按文件扩展名流式读取，逐行产出 (行号, {列名: 值})，空行跳过"""
+    rows = _iter_xlsx(path) if path.lower().endswith((".xlsx", ".xlsm")) else _iter_csv(path)
+    header = None
+    for number, row in enumerate(rows, 1):
+        if header is None:
+            header = [_COLUMNS.get(str(cell or "").strip().lower(), None) for cell in row]
+            if "target" not in header or "content" not in header:
+                raise RowError("表头缺少 target/目标 或 content/内容 列")
+            continue
+        if not any(cell not in (None, "") for cell in row):
+            continue
+        yield number, {key: value for key, value in zip(header, row) if key}
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time())
+    text = _text(value).replace("/", "-")
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise RowError(f"发送时间格式无效: {text}") from None
+
+
+def _parse_time(value):
+    if isinstance(value, time):
+        return value
+    if isinstance(value, datetime):
+        return value.time()
+    text = _text(value)
+    try:
+        return time.fromisoformat(text if text.count(":") > 1 else text + ":00")
+    except ValueError:
+        raise RowError(f"每天发送时间格式无效: {text}") from None
+
+
+def _parse_days(value, kind):
+    text = _text(value).replace("，", ",")
+    try:
+        days = [int(d) for d in text.split(",") if d.strip()]
+    except ValueError:
+        raise RowError(f"日期格式无效: {text}") from None
+    low, high = (0, 6) if kind == WEEKLY else (1, 31)
+    bad = [d for d in days if not (low <= d <= high or (kind == MONTHLY and d == -1))]
+    if not days or bad:
+        raise RowError(f"日期无效: {text}")
+    return days
+
+
+def build_job(fields, now):
+    """把一行转为任务并计算下一次发送时间，行有误时抛出 RowError"""
+    targets = [t.strip() for t in _text(fields.get("target")).replace("；", ";").split(";")]
+    targets = [t for t in targets if t]
+    if not targets:
+        raise RowError("目标为空")
+    content = _text(fields.get("content"))
+    if not content:
+        raise RowError("内容为空")
+    rule = _text(fields.get("rule"))
+    kind = _text(fields.get("kind")).lower()
+    kind = _KINDS.get(kind, kind) or (RULE if rule else ONCE)
+    if kind not in JOB_KINDS:
+        raise RowError(f"未知的任务类型: {kind}")
+    target = targets[0] if len(targets) == 1 else targets
+    try:
+        if kind == ONCE:
+            scheduled_time = _parse_datetime(fields.get("time"))
+            if scheduled_time <= now:
+                raise RowError(f"发送时间已过: {scheduled_time}")
+            job = Job(target, content, ONCE, scheduled_time=scheduled_time)
+        elif kind == RULE:
+            if not rule:
+                raise RowError("规则为空")
+            job = Job(target, content, RULE, scheduled_time=now, rule=rule)
+        else:
+            days = _parse_days(fields.get("days"), kind)
+            job = Job(target, content, kind, days=days, send_time=_parse_time(fields.get("send_time")))
+    except RowError:
+        raise
+    except ValueError as e:
+        raise RowError(str(e)) from None
+    job.next_fire = job.next_fire_after(now)
+    if job.next_fire is None:
+        raise RowError("没有未来的发送时间")
+    return job
+
+
+def load_file(path, now=None):
+    """读取并校验整个文件，返回 ImportResult；文件本身无法读取时抛出 RowError/OSError
+
+    每行读出后立即校验，整个文件共用同一个当前时间 now(默认调用时刻)；只保留有效任务和错误，
+    不保留原始行。写入任务库由调用方在全部校验完成后一次进行(JobEngine.add_jobs)。
+    """
+    start = _time.perf_counter()
+    now = now or datetime.now()
+    result = ImportResult()
+    for number, fields in iter_rows(path):
+        result.rows += 1
+        try:
+            result.jobs.append(build_job(fields, now))
+        except RowError as e:
+            result.errors.append((number, str(e)))
+    result.seconds = _time.perf_counter() - start
+    return result
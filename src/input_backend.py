@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 10:20:16
+project: auto_send
+filename: input_backend.py
+version: 1.0
+"""
+
+"""输入后端：wechat_ops 通过这里访问窗口和键盘，便于在无桌面环境下模拟和计时"""
+import threading
+import time
+
+
+class InputBackend:
+    """输入后端接口，wechat_ops 只依赖这些原语"""
+
+    name = "base"
+
+    def find_window(self, title):
+        """按标题查找窗口，返回句柄，找不到返回 0"""
+        raise NotImplementedError
+
+    def set_foreground(self, hwnd):
+        raise NotImplementedError
+
+    def get_foreground(self):
+        """当前前台窗口句柄"""
+        raise NotImplementedError
+
+    def get_window_process(self, hwnd):
+        """窗口所属进程ID，无法观测时返回 None"""
+        return None
+
+    def get_focus(self):
+        """前台窗口线程的输入焦点状态，焦点控件或光标变化时取值随之变化
+
+        无法观测时返回 None，等待逻辑将退回到固定延时上限。
+        """
+        return None
+
+    def press(self, keys):
+        """按下并释放组合键，如 "alt+s" """
+        raise NotImplementedError
+
+    def write(self, text):
+        raise NotImplementedError
+
+    def get_clipboard(self):
+        """读取剪贴板文本，没有文本内容时返回 None"""
+        raise NotImplementedError
+
+    def set_clipboard(self, text):
+        """写入剪贴板文本，text 为 None 时清空剪贴板"""
+        raise NotImplementedError
+
+    def clipboard_restorable(self):
+        """剪贴板能否由 get_clipboard/set_clipboard 原样恢复(为空或只有文本)，无法判断时返回 False"""
+        return False
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class Win32Backend(InputBackend):
+    """真实的 Windows 后端，基于 win32gui、win32clipboard 和 keyboard"""
+
+    name = "win32"
+
+    def __init__(self):
+        import win32api
+        import win32clipboard
+        import win32gui
+        import win32process
+        import keyboard
+
+        self._win32api = win32api
+        self._win32clipboard = win32clipboard
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._keyboard = keyboard
+
+    def find_window(self, title):
+        return self._win32gui.FindWindow(None, title)
+
+    def set_foreground(self, hwnd):
+        self._win32gui.SetForegroundWindow(hwnd)
+
+    def get_foreground(self):
+        return self._win32gui.GetForegroundWindow()
+
+    def get_window_process(self, hwnd):
+        try:
+            return self._win32process.GetWindowThreadProcessId(hwnd)[1]
+        except Exception:
+            return None
+
+    def get_focus(self):
+        # GetFocus/GetCaretPos 只对本线程有效，需临时挂接到前台窗口的输入线程
+        hwnd = self._win32gui.GetForegroundWindow()
+        if not hwnd:
+            return None
+        thread_id, _ = self._win32process.GetWindowThreadProcessId(hwnd)
+        current_id = self._win32api.GetCurrentThreadId()
+        attached = thread_id != current_id and self._win32process.AttachThreadInput(
+            current_id, thread_id, True
+        )
+        try:
+            return self._win32gui.GetFocus(), self._win32gui.GetCaretPos()
+        except Exception:
+            return None
+        finally:
+            if attached:
+                self._win32process.AttachThreadInput(current_id, thread_id, False)
+
+    def press(self, keys):
+        self._keyboard.press_and_release(keys)
+
+    def write(self, text):
+        self._keyboard.write(text)
+
+    def get_clipboard(self):
+        win32clipboard = self._win32clipboard
+        win32clipboard.OpenClipboard()
+        try:
+            if win32clipboard.IsClipboardFormatAvailable(win32clipboard.CF_UNICODETEXT):
+                return win32clipboard.GetClipboardData(win32clipboard.CF_UNICODETEXT)
+            return None
+        finally:
+            win32clipboard.CloseClipboard()
+
+    def set_clipboard(self, text):
+        win32clipboard = self._win32clipboard
+        win32clipboard.OpenClipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+            if text is not None:
+                win32clipboard.SetClipboardData(win32clipboard.CF_UNICODETEXT, text)
+        finally:
+            win32clipboard.CloseClipboard()
+
+    def clipboard_restorable(self):
+        win32clipboard = self._win32clipboard
+        # 文本格式之间由系统自动转换，写回 CF_UNICODETEXT 即可全部恢复
+        text_formats = {
+            win32clipboard.CF_TEXT,
+            win32clipboard.CF_OEMTEXT,
+            win32clipboard.CF_UNICODETEXT,
+            win32clipboard.CF_LOCALE,
+        }
+        win32clipboard.OpenClipboard()
+        try:
+            fmt = win32clipboard.EnumClipboardFormats(0)
+            while fmt:
+                if fmt not in text_formats:
+                    return False
+                fmt = win32clipboard.EnumClipboardFormats(fmt)
+            return True
+        finally:
+            win32clipboard.CloseClipboard()
+
+
+class SimulatedBackend(InputBackend):
+    """无桌面的模拟后端
+
+    每次操作都以 time.monotonic_ns() 时间戳记录到 events，可按操作类型注入响应延迟，
+    用于在 Linux 构建机上测量整个调度器的端到端发送延迟和抖动。
+
+    latency: {操作名: 秒数或 callable()} ，操作名为 find_window/set_foreground/press/write/
+        get_clipboard/set_clipboard
+    sleep_scale: 固定等待(DELAYS)的缩放比例，0 表示完全跳过
+    ui_latency: 窗口激活、焦点切换在多少秒后才能被观测到，模拟界面响应时间
+    """
+
+    name = "simulated"
+
+    def __init__(self, latency=None, sleep_scale=1.0, windows=None, ui_latency=0.0):
+        self.latency = dict(latency or {})
+        self.sleep_scale = sleep_scale
+        self.windows = dict(windows) if windows is not None else None
+        self.ui_latency = ui_latency
+        self.foreground = 0
+        self.focus = 0
+        self._ui_ready_at = 0  # 界面状态可被观测的 monotonic_ns 时刻
+        self.clipboard = None
+        self.events = []  # (monotonic_ns, 操作名, 参数)
+        self._lock = threading.Lock()
+
+    def _record(self, op, payload):
+        delay = self.latency.get(op, 0.0)
+        if callable(delay):
+            delay = delay()
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.events.append((time.monotonic_ns(), op, payload))
+
+    def find_window(self, title):
+        self._record("find_window", title)
+        if self.windows is None:
+            return 1  # 未配置窗口表时任何标题都能找到
+        return self.windows.get(title, 0)
+
+    def set_foreground(self, hwnd):
+        self._record("set_foreground", hwnd)
+        self.foreground = hwnd
+        self._ui_changed()
+
+    def get_foreground(self):
+        return self.foreground if self._ui_ready() else 0
+
+    def get_window_process(self, hwnd):
+        return 1 if hwnd else None  # 所有模拟窗口同属一个进程
+
+    def get_focus(self):
+        return self.focus if self._ui_ready() else -1
+
+    def press(self, keys):
+        self._record("press", keys)
+        if keys not in ("ctrl+v", "shift+enter", "ctrl+a", "ctrl+c", "backspace"):
+            self.focus += 1  # 打开搜索框、回车进入会话都会切换焦点
+            self._ui_changed()
+
+    def _ui_changed(self):
+        self._ui_ready_at = time.monotonic_ns() + int(self.ui_latency * 1e9)
+
+    def _ui_ready(self):
+        return time.monotonic_ns() >= self._ui_ready_at
+
+    def write(self, text):
+        self._record("write", text)
+
+    def get_clipboard(self):
+        self._record("get_clipboard", None)
+        return self.clipboard
+
+    def set_clipboard(self, text):
+        self._record("set_clipboard", text)
+        self.clipboard = text
+
+    def clipboard_restorable(self):
+        return True  # 模拟剪贴板只保存文本
+
+    def sleep(self, seconds):
+        if self.sleep_scale > 0:
+            time.sleep(seconds * self.sleep_scale)
+
+    def keystrokes(self):
+        """所有键盘事件 (monotonic_ns, 操作名, 参数)"""
+        with self._lock:
+            return [e for e in self.events if e[1] in ("press", "write")]
+
+    def events_of(self, op, payload=None):
+        with self._lock:
+            return [
+                e
+                for e in self.events
+                if e[1] == op and (payload is None or e[2] == payload)
+            ]
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 13:47:35
+project: auto_send
+filename: job_store.py
+version: 1.0
+"""
+
+"""任务持久化：SQLite(WAL 模式)，按下一次发送时间建索引，启动时快速载入"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from engine import Job
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    next_fire REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_next_fire ON jobs(next_fire);
+"""
+
+
+def _ts(dt):
+    return dt.timestamp() if dt else None
+
+
+class JobStore:
+    """任务表: job_id、任务定义(JSON)、下一次发送时间(时间戳，带索引)
+
+    连接可跨线程使用，所有访问由一把锁串行化。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def save(self, job):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, next_fire) VALUES (?, ?, ?)",
+                (job.job_id, json.dumps(job.to_dict(), ensure_ascii=False), _ts(job.next_fire)),
+            )
+
+    def save_many(self, jobs):
+        """单个事务内批量写入"""
+        rows = (
+            (j.job_id, json.dumps(j.to_dict(), ensure_ascii=False), _ts(j.next_fire))
+            for j in jobs
+        )
+        with self._lock:
+            with self._transaction():
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO jobs (job_id, data, next_fire) VALUES (?, ?, ?)",
+                    rows,
+                )
+
+    def update_next_fire(self, job):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET next_fire = ? WHERE job_id = ?",
+                (_ts(job.next_fire), job.job_id),
+            )
+
+    def set_next_fire(self, job_id, next_fire):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET next_fire = ? WHERE job_id = ?", (_ts(next_fire), job_id)
+            )
+
+    def update_next_fire_many(self, jobs):
+        with self._lock:
+            with self._transaction():
+                self._conn.executemany(
+                    "UPDATE jobs SET next_fire = ? WHERE job_id = ?",
+                    ((_ts(j.next_fire), j.job_id) for j in jobs),
+                )
+
+    def delete(self, job_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs")
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def load(self):
+        """按下一次发送时间顺序(走索引)载入全部任务，next_fire 直接取自保存值"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data, next_fire FROM jobs ORDER BY next_fire"
+            ).fetchall()
+        jobs = []
+        for data, next_fire in rows:
+            job = Job.from_dict(json.loads(data))
+            job.next_fire = datetime.fromtimestamp(next_fire) if next_fire is not None else None
+            jobs.append(job)
+        return jobs
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
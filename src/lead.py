@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 17:52:06
+project: auto_send
+filename: lead.py
+version: 1.0
+"""
+
+"""根据最近的准备耗时和触发误差自动计算提前准备时间"""
+import threading
+from collections import deque
+
+
+def size_bucket(content):
+    """内容长度分档: 0 为不足 16 字符，之后每档上限翻 4 倍(64、256、1024)，第 4 档不设上限"""
+    return min(4, max(0, (len(content).bit_length() - 3) // 2))
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    rank = max(1, int(round(p / 100.0 * len(ordered) + 0.5 - 1e-9)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LeadTuner:
+    """按 目标 × 内容长度 保存最近 window 次准备耗时(秒)，以及最近的触发误差
+
+    某一范围样本不足 min_samples 时依次退回到: 同长度的所有目标 → 该目标的所有长度 → 全部记录。
+    提前量 = 准备耗时分位数 × (1 + margin_ratio) + margin_seconds + 触发延迟分位数。
+    """
+
+    def __init__(
+        self, window=50, min_samples=5, percentile=95, margin_ratio=0.2, margin_seconds=0.5
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.margin_ratio = margin_ratio
+        self.margin_seconds = margin_seconds
+        self._lock = threading.Lock()
+        self._samples = {}  # (target, bucket)，target/bucket 为 None 表示不限 -> deque
+        self._fire_errors = deque(maxlen=window)  # 秒，正数表示晚于目标时刻
+        self._armed = {}  # (target, bucket) -> 上次据以布防的提前量
+
+    def record_prepare(self, target, content, seconds):
+        """记录一次成功准备的耗时，提前量变化超过 10% 时返回 True(需要重新计算准备时刻)"""
+        bucket = size_bucket(content)
+        with self._lock:
+            for key in ((target, bucket), (None, bucket), (target, None), (None, None)):
+                self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+            return self._lead_changed(target, bucket)
+
+    def record_fire_error(self, seconds):
+        with self._lock:
+            self._fire_errors.append(seconds)
+
+    def _lead_changed(self, target, bucket):
+        lead = self._lead(target, bucket)
+        previous = self._armed.get((target, bucket))
+        if lead is None or (previous is not None and abs(lead - previous) <= 0.1 * previous):
+            return False
+        self._armed[(target, bucket)] = lead
+        return True
+
+    def _scope(self, target, bucket):
+        for key in ((target, bucket), (None, bucket), (target, None), (None, None)):
+            samples = self._samples.get(key)
+            if samples and len(samples) >= self.min_samples:
+                return key, samples
+        return None, None
+
+    def _prepare(self, target, bucket):
+        _, samples = self._scope(target, bucket)
+        return _percentile(samples, self.percentile) if samples else None
+
+    def _lead(self, target, bucket):
+        prepare = self._prepare(target, bucket)
+        if prepare is None:
+            return None
+        fire_delay = _percentile(self._fire_errors, self.percentile) if self._fire_errors else 0.0
+        return prepare * (1 + self.margin_ratio) + self.margin_seconds + max(0.0, fire_delay)
+
+    def estimate_prepare(self, target, content):
+        """预计准备耗时(秒)，样本不足时返回 None"""
+        with self._lock:
+            return self._prepare(target, size_bucket(content))
+
+    def lead(self, target, content):
+        """自动计算的提前量(秒)，样本不足时返回 None"""
+        with self._lock:
+            return self._lead(target, size_bucket(content))
+
+    def stats(self):
+        with self._lock:
+            scopes = {}
+            for (target, bucket), samples in self._samples.items():
+                name = f"{target or '*'}/{'*' if bucket is None else bucket}"
+                scopes[name] = {
+                    "count": len(samples),
+                    "p50": _percentile(samples, 50),
+                    "p95": _percentile(samples, 95),
+                    "max": max(samples),
+                }
+            errors = self._fire_errors
+            return {
+                "scopes": scopes,
+                "fire_error": {
+                    "count": len(errors),
+                    "p50": _percentile(errors, 50) if errors else None,
+                    "p95": _percentile(errors, 95) if errors else None,
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._fire_errors.clear()
+            self._armed.clear()
@@ -1,19 +1,64 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
 """
-@Project : officeauto 
+@Project : officeauto
 @File    : main.py
-@IDE     : vscode 
+@IDE     : vscode
 @Author  : xie.fangyu
-@Date    : 2025/3/31 下午1:58 
+@Date    : 2025/3/31 下午1:58
 """
 
+# 启动路径: 先显示窗口，任务库(sqlite3)、发送记录和延时配置在首帧绘制后才打开，
+# 校准、批量导入等模块在第一次使用时才导入，
+# Win32 输入模块(win32gui、keyboard 等)直到第一次准备消息时才由 wechat_ops.get_backend() 导入。
+import time
+
+_START = time.perf_counter()
+
+import os
 import sys
+import logging
+import logging.handlers
+from PyQt5.QtCore import QEvent, QObject, QTimer
 from PyQt5.QtWidgets import QApplication
 from gui import WeChatSchedulerUI
 from scheduler import WeChatScheduler
-import logging
-import logging.handlers
+from config import AUDIT_LOG_PATH, JOB_DB_PATH, METRICS_PORT
+
+# 设置后首帧绘制完成即输出启动耗时并退出，供 bench_startup.py 使用
+STARTUP_BENCH_ENV = "AUTO_SEND_STARTUP_BENCH"
+FIRST_PAINT_MARKER = "startup: first paint"
+
+
+class FirstPaintProbe(QObject):
+    """窗口第一次绘制时回调 on_paint(距进程启动的秒数)"""
+
+    def __init__(self, window, on_paint):
+        super().__init__(window)
+        self.on_paint = on_paint
+        window.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            # 本次绘制结束后再回调
+            QTimer.singleShot(0, lambda: self.on_paint(time.perf_counter() - _START))
+        return False
+
+
+def restore_jobs(scheduler):
+    """首帧之后打开任务库并恢复上次保存的任务，同时接入发送记录"""
+    from job_store import JobStore
+
+    start = time.perf_counter()
+    scheduler.attach_store(JobStore(JOB_DB_PATH))
+    if AUDIT_LOG_PATH:
+        from audit import AuditLog
+
+        scheduler.attach_audit(AuditLog(AUDIT_LOG_PATH))
+    scheduler.load_jobs()
+    return time.perf_counter() - start
+
 
 if __name__ == "__main__":
     try:
@@ -25,17 +70,33 @@ if __name__ == "__main__":
             format='%(asctime)s - %(levelname)s - %(message)s',
             handlers=[handler]
         )
-        
+
         app = QApplication(sys.argv)
-        
-        # 创建业务逻辑层实例
+
+        # 创建业务逻辑层实例，任务库在窗口显示后再接入
         scheduler = WeChatScheduler()
-        
-        
+
+
         # 创建UI层实例并注入业务逻辑
         window = WeChatSchedulerUI(scheduler)
+
+        def on_first_paint(seconds):
+            bench = os.environ.get(STARTUP_BENCH_ENV)
+            if bench:
+                # 分隔 -X importtime 输出中首帧前后的导入
+                print(FIRST_PAINT_MARKER, file=sys.stderr, flush=True)
+            restore_seconds = restore_jobs(scheduler)
+            window.reload_delay_profiles()
+            if METRICS_PORT is not None and not bench:
+                scheduler.start_metrics(METRICS_PORT)
+            if bench:
+                print(f"first_paint_ms={seconds * 1000:.1f}", flush=True)
+                print(f"restore_jobs_ms={restore_seconds * 1000:.1f}", flush=True)
+                window.close()
+
+        FirstPaintProbe(window, on_first_paint)
         window.show()
-        
+
         sys.exit(app.exec_())
     except Exception as e:
         logging.error(f"{e} exception occurred", exc_info=True)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 18:47:15
+project: auto_send
+filename: metrics.py
+version: 1.0
+"""
+
+"""发送计数器，以及只监听本机地址、按 Prometheus 文本格式输出指标的 HTTP 端点
+
+发送路径上只做无锁的计数: 计数器按线程分片，每个线程只写自己的分片；
+耗时直方图各只有一个写入线程(准备在输入通道、触发误差在精确发送线程)。
+抓取时读取这些预先聚合的值，不遍历任何明细。
+"""
+import os
+import sys
+import threading
+
+from tracing import Histogram
+
+PREPARE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # 秒
+FIRE_ERROR_BUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.05, 0.1)
+
+
+class Counter:
+    """按线程分片的计数器，inc() 不加锁"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._cells = []  # list.append 本身是原子的
+
+    def inc(self, n=1):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = self._local.cell = [0]
+            self._cells.append(cell)
+        cell[0] += n
+
+    def value(self):
+        return sum(cell[0] for cell in list(self._cells))
+
+
+class SendMetrics:
+    """发送相关的计数器和直方图"""
+
+    def __init__(self):
+        self.attempted = Counter()
+        self.succeeded = Counter()
+        self.failed = Counter()
+        self.retries = {"prepare": Counter(), "send": Counter()}
+        self.prepare = Histogram()  # 微秒，只由输入通道写入
+        self.fire_error = Histogram()  # 触发误差绝对值(微秒)，只由精确发送线程写入
+
+
+def _buckets(hist, bounds):
+    """把对数-线性直方图换算为 Prometheus 的累计桶 [(上界秒数, 累计次数)]"""
+    counts = hist.counts.copy()  # dict.copy 在持有 GIL 时一次完成，不受并发写入影响
+    cumulative = []
+    seen = 0
+    pending = sorted(counts.items())
+    i = 0
+    for bound in bounds:
+        limit = bound * 1e6
+        while i < len(pending) and pending[i][0] <= limit:
+            seen += pending[i][1]
+            i += 1
+        cumulative.append((bound, seen))
+    total = seen + sum(n for _, n in pending[i:])
+    return cumulative, total
+
+
+def _rss_bytes():
+    """进程常驻内存字节数，无法获取时返回 None"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class Counters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = Counters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(
+                process, ctypes.byref(counters), counters.cb
+            ):
+                return counters.WorkingSetSize
+            return None
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def render(core):
+    """按 Prometheus 文本格式输出 SchedulerCore 的指标"""
+    m = core.metrics
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value}")
+
+    def histogram(name, help_text, hist, bounds):
+        cumulative, total = _buckets(hist, bounds)
+        samples = [(f'{{le="{bound}"}}', count) for bound, count in cumulative]
+        samples.append(('{le="+Inf"}', total))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, value in samples:
+            lines.append(f"{name}_bucket{labels} {value}")
+        lines.append(f"{name}_sum {hist.total / 1e6}")
+        lines.append(f"{name}_count {total}")
+
+    metric("auto_send_sends_attempted_total", "counter", "要发送的消息数", [("", m.attempted.value())])
+    metric("auto_send_sends_succeeded_total", "counter", "发送成功的消息数", [("", m.succeeded.value())])
+    metric("auto_send_sends_failed_total", "counter", "重试后仍发送失败的消息数", [("", m.failed.value())])
+    metric(
+        "auto_send_retries_total",
+        "counter",
+        "准备/发送的重试次数",
+        [(f'{{stage="{stage}"}}', c.value()) for stage, c in m.retries.items()],
+    )
+    histogram("auto_send_prepare_seconds", "消息准备耗时", m.prepare, PREPARE_BUCKETS)
+    histogram(
+        "auto_send_fire_error_seconds", "精确发送的触发误差(绝对值)", m.fire_error, FIRE_ERROR_BUCKETS
+    )
+    log_stats = core.log_stats()
+    metric("auto_send_log_queue_depth", "gauge", "日志队列中待投递的行数", [("", log_stats["depth"])])
+    metric("auto_send_log_dropped_total", "counter", "日志队列溢出丢弃的行数", [("", log_stats["dropped"])])
+    metric("auto_send_threads", "gauge", "进程内线程数", [("", threading.active_count())])
+    rss = _rss_bytes()
+    if rss is not None:
+        metric("process_resident_memory_bytes", "gauge", "常驻内存字节数", [("", rss)])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """只监听 127.0.0.1 的 /metrics 端点，单个后台线程处理请求"""
+
+    def __init__(self, core, port):
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        self.core = core
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render(server.core).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不把每次抓取写进日志
+
+        self._httpd = HTTPServer(("127.0.0.1", port), Handler)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="metrics-http", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
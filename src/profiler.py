@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 21:10:43
+project: auto_send
+filename: profiler.py
+version: 1.0
+"""
+
+"""发送周期采样分析：从周期开始到结束，定时采集所有线程的调用栈
+
+每个周期写出两个文件:
+    <时间>_<周期ID>.collapsed          折叠栈格式(线程;帧;…;帧 微秒数)，可直接生成火焰图
+    <时间>_<周期ID>.speedscope.json    speedscope 格式，每个线程一个时间线
+采样和写文件都在独立的采样线程中进行，只在有周期进行中时运行；周期超过 max_seconds
+仍未结束(例如被取消而没有结束)时停止采样并按已采到的样本写出，采样线程不会一直运行。
+未开启时发送路径上只有一次 `profiler is not None` 判断(见 tracing.LatencyRecorder)。
+锁等待、sleep 等阻塞在 C 代码中的时间记在发起调用的那一行上。
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+class _Capture:
+    def __init__(self, cycle):
+        self.cycle = cycle
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+        self.end = None
+        self.samples = {}  # (线程名, 栈) -> 累计秒数
+        self.truncated = False  # 超过最长采样时间被截断
+
+
+class CycleProfiler:
+    """begin(cycle)/end(cycle) 由 LatencyRecorder 在周期开始和结束时调用
+
+    on_written(paths) 在采样线程中调用，通知写出的文件。
+    """
+
+    def __init__(self, out_dir, interval=0.001, on_written=None, max_seconds=120.0):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.max_seconds = max_seconds  # 每个周期最长采样时间
+        self.on_written = on_written
+        self._lock = threading.Lock()
+        self._active = {}  # cycle_id -> _Capture
+        self._done = []
+        self._thread = None
+        self._names = {}  # 线程 ident -> 名称
+        self._frames = {}  # (code, 行号) -> 帧描述
+
+    def begin(self, cycle):
+        cycle.profiler = self
+        with self._lock:
+            self._active[cycle.cycle_id] = _Capture(cycle)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cycle-profiler")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def end(self, cycle):
+        with self._lock:
+            capture = self._active.pop(cycle.cycle_id, None)
+            if capture is not None:
+                capture.end = time.perf_counter()
+                self._done.append(capture)
+
+    def _frame(self, frame):
+        key = (frame.f_code, frame.f_lineno)
+        described = self._frames.get(key)
+        if described is None:
+            code = frame.f_code
+            described = self._frames[key] = (
+                code.co_name,
+                os.path.basename(code.co_filename),
+                frame.f_lineno,
+            )
+        return described
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(self._frame(frame))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _sample(self, active, own, elapsed):
+        frames = sys._current_frames()
+        try:
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                name = self._names.get(ident)
+                if name is None:
+                    self._names = {t.ident: t.name for t in threading.enumerate()}
+                    name = self._names.get(ident, str(ident))
+                key = (name, self._stack(frame))
+                for capture in active:
+                    capture.samples[key] = capture.samples.get(key, 0.0) + elapsed
+        finally:
+            del frames
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            with self._lock:
+                for cycle_id, capture in list(self._active.items()):
+                    if now - capture.start > self.max_seconds:
+                        del self._active[cycle_id]
+                        capture.end = now
+                        capture.truncated = True
+                        self._done.append(capture)
+                        logging.warning(
+                            f"周期 {cycle_id} 超过 {self.max_seconds:g}秒仍未结束，停止采样"
+                        )
+                active = list(self._active.values())
+                done, self._done = self._done, []
+                if not active and not done:
+                    self._thread = None
+                    return
+            if active:
+                # 每个样本按距上次采样的实际间隔计时，采样线程被推迟时不会少算
+                self._sample(active, own, min(now - last, 0.1))
+            last = now
+            for capture in done:
+                try:
+                    paths = self._write(capture)
+                except Exception as e:
+                    logging.error(f"写入周期分析文件失败: {e}", exc_info=True)
+                    continue
+                if self.on_written is not None:
+                    self.on_written(paths)
+            time.sleep(self.interval)
+
+    def _write(self, capture):
+        os.makedirs(self.out_dir, exist_ok=True)
+        cycle = capture.cycle
+        base = os.path.join(
+            self.out_dir, f"{capture.started.strftime('%Y%m%d_%H%M%S_%f')[:-3]}_{cycle.cycle_id}"
+        )
+        collapsed = base + ".collapsed"
+        with open(collapsed, "w", encoding="utf-8") as f:
+            for (thread, stack), seconds in sorted(capture.samples.items()):
+                frames = ";".join(f"{name} ({file}:{line})" for name, file, line in stack)
+                f.write(f"{thread};{frames} {max(1, round(seconds * 1e6))}\n")
+        speedscope = base + ".speedscope.json"
+        with open(speedscope, "w", encoding="utf-8") as f:
+            json.dump(self._speedscope(capture), f, ensure_ascii=False)
+        return collapsed, speedscope
+
+    def _speedscope(self, capture):
+        cycle = capture.cycle
+        frames = []
+        index = {}
+        threads = {}
+        for (thread, stack), seconds in capture.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, file, line = frame
+                    frames.append({"name": name, "file": file, "line": line})
+                ids.append(index[frame])
+            samples, weights = threads.setdefault(thread, ([], []))
+            samples.append(ids)
+            weights.append(seconds)
+        duration = (capture.end or time.perf_counter()) - capture.start
+        outcome = "truncated" if capture.truncated else cycle.outcome
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{cycle.target} [{cycle.job_id or '-'}] {outcome}",
+            "exporter": "auto_send",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": duration,
+                    "samples": samples,
+                    "weights": weights,
+                }
+                for thread, (samples, weights) in sorted(threads.items())
+            ],
+        }
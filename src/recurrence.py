@@ -0,0 +1,494 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 17:20:05
+project: auto_send
+filename: recurrence.py
+version: 1.0
+"""
+
+"""循环规则编译器：cron 表达式与 RRULE 子集编译为按字段的位集，下一次发送时间按字段逐级求出
+
+cron: "[秒] 分 时 日 月 周"，支持 * , - / ?、月份/星期英文缩写、@daily 等宏，
+    日字段 L(月末)、LW(最后一个工作日)，周字段 5L(最后一个周五)、1#2(第二个周一)；
+    周字段 0 和 7 都是周日，日与周同时限定时取并集(与 cron 一致)。
+RRULE: "FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1" 等，支持 FREQ=DAILY/WEEKLY/MONTHLY/YEARLY、
+    INTERVAL、BYDAY(可带序号如 -1FR)、BYMONTHDAY(含 -1)、BYMONTH、BYHOUR、BYMINUTE、BYSECOND、
+    BYSETPOS、DTSTART、UNTIL；未给出的时分秒及 INTERVAL 的起点取 DTSTART 或编译时传入的 start。
+
+求下一次发送时间时，月/日/时/分/秒各用一次位运算找出不小于当前值的最低位，进位后重来，
+不逐日或逐分钟试探。
+"""
+import calendar
+import functools
+from datetime import date, datetime, timedelta
+
+from clock import SYSTEM_CLOCK
+
+_MONTH_NAMES = {
+    name: i
+    for i, name in enumerate(
+        ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"], 1
+    )
+}
+# cron 星期: 0=周日；内部统一为 Python 的 weekday()，0=周一
+_CRON_DOW_NAMES = {name: i for i, name in enumerate(["SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"])}
+_RRULE_DAYS = {name: i for i, name in enumerate(["MO", "TU", "WE", "TH", "FR", "SA", "SU"])}
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MAX_STEPS = 2000  # 求下一次时间的进位次数上限，规则永远无法满足(如 2 月 30 日)时返回 None
+
+# 每隔 n 天置一位的模式，用于 INTERVAL 与 7 天一周的平铺
+_EVERY = [0] + [sum(1 << i for i in range(0, 64, n)) for n in range(1, 64)]
+
+
+def _bits(values):
+    mask = 0
+    for v in values:
+        mask |= 1 << v
+    return mask
+
+
+def _lowest_from(mask, start):
+    """mask 中不小于 start 的最低位，没有返回 -1"""
+    mask >>= start
+    if not mask:
+        return -1
+    return start + (mask & -mask).bit_length() - 1
+
+
+class Recurrence:
+    """编译后的循环规则
+
+    seconds/minutes/hours/months/days/weekdays 为位集(日 1-31，月 1-12，星期 0=周一)；
+    days_any/weekdays_any 表示该字段未限定。last_day(月末)、nth((weekday, n)，n=-1 为最后一个)、
+    setpos(当月满足条件的日期中的第几个，负数从月末数)均按月计算；
+    day/week/month/year_interval 以 anchor 为起点，not_before 之前不发送。
+    """
+
+    def __init__(self, source=""):
+        self.source = source
+        self.seconds = 1
+        self.minutes = 1
+        self.hours = 1
+        self.months = _bits(range(1, 13))
+        self.days = _bits(range(1, 32))
+        self.weekdays = _bits(range(7))
+        self.days_any = True
+        self.weekdays_any = True
+        self.day_and = False  # 日与星期同时限定时: False 取并集(cron)，True 取交集(RRULE)
+        self.last_day = False
+        self.nth = []
+        self.setpos = []
+        self.microsecond = 0
+        self.anchor = None  # date，INTERVAL 的起点
+        self.not_before = None  # datetime，RRULE 的 DTSTART
+        self.day_interval = 1
+        self.week_interval = 1
+        self.month_interval = 1
+        self.year_interval = 1
+        self.until = None
+        self._finish()
+
+    def _finish(self):
+        """字段确定后预先计算: 每月 1 日为周 w 时星期位集平铺到 1-31 日的结果"""
+        pattern = 0
+        for w in range(7):
+            if self.weekdays >> w & 1:
+                pattern |= _EVERY[7] << w
+        self._weekday_tiles = [
+            (pattern >> first) << 1 & ((1 << 32) - 2) for first in range(7)
+        ]
+        return self
+
+    # ---- 按月求可发送的日期位集 ----
+
+    def day_mask(self, year, month):
+        """year 年 month 月中满足规则的日期位集(第 d 位表示 d 日)"""
+        first, ndays = calendar.monthrange(year, month)
+        full = (1 << (ndays + 1)) - 2
+        dom_limited = not self.days_any
+        dow_limited = not self.weekdays_any or bool(self.nth)
+        dom = self.days | (1 << ndays if self.last_day else 0)
+        dow = 0 if self.weekdays_any else self._weekday_tiles[first]
+        for weekday, n in self.nth:
+            d1 = 1 + (weekday - first) % 7
+            d = d1 + 7 * (n - 1) if n > 0 else d1 + 7 * ((ndays - d1) // 7)
+            if 1 <= d <= ndays:
+                dow |= 1 << d
+        if dom_limited and dow_limited:
+            mask = (dom & dow if self.day_and else dom | dow) & full
+        elif dom_limited:
+            mask = dom & full
+        elif dow_limited:
+            mask = dow & full
+        else:
+            mask = full
+        if self.day_interval > 1 or self.week_interval > 1:
+            mask &= self._interval_mask(year, month, ndays)
+        if self.setpos and mask:
+            mask = self._apply_setpos(mask)
+        return mask
+
+    def _interval_mask(self, year, month, ndays):
+        first_ord = date(year, month, 1).toordinal()
+        anchor = self.anchor.toordinal()
+        mask = (1 << (ndays + 1)) - 2
+        if self.day_interval > 1:
+            n = self.day_interval
+            offset = 1 + (anchor - first_ord) % n
+            mask &= (_EVERY[n] if n < 64 else 1) << offset
+        if self.week_interval > 1:
+            n = self.week_interval
+            week_start = anchor - self.anchor.weekday()  # 起点所在周的周一
+            valid = 0
+            d = 1
+            while d <= ndays:
+                ordinal = first_ord + d - 1
+                week = (ordinal - week_start) // 7
+                run = 7 - (ordinal - week_start) % 7  # 本周剩余天数
+                if week % n == 0:
+                    valid |= ((1 << run) - 1) << d
+                d += run
+            mask &= valid
+        return mask
+
+    def _apply_setpos(self, mask):
+        positions = [i for i in range(32) if mask >> i & 1]
+        chosen = 0
+        for pos in self.setpos:
+            index = pos - 1 if pos > 0 else len(positions) + pos
+            if 0 <= index < len(positions):
+                chosen |= 1 << positions[index]
+        return chosen
+
+    def _month_ok(self, year, month):
+        if not self.months >> month & 1:
+            return False
+        if self.month_interval > 1:
+            delta = (year * 12 + month) - (self.anchor.year * 12 + self.anchor.month)
+            if delta % self.month_interval:
+                return False
+        if self.year_interval > 1 and (year - self.anchor.year) % self.year_interval:
+            return False
+        return True
+
+    # ---- 下一次发送时间 ----
+
+    def next_after(self, now):
+        """严格晚于 now 的下一次发送时间，没有则返回 None"""
+        if self.not_before is not None and now < self.not_before:
+            now = self.not_before - timedelta(microseconds=1)
+        start = now.replace(microsecond=self.microsecond)
+        if start <= now:
+            start += timedelta(seconds=1)
+        year, month, day = start.year, start.month, start.day
+        hour, minute, second = start.hour, start.minute, start.second
+        for _ in range(_MAX_STEPS):
+            if month > 12:
+                year, month = year + 1, 1
+            if year > 9999:
+                return None
+            if not self._month_ok(year, month):
+                if self.month_interval > 1 or self.year_interval > 1:
+                    month += 1
+                else:
+                    m = _lowest_from(self.months, month + 1)
+                    if m < 0:
+                        year, m = year + 1, _lowest_from(self.months, 1)
+                    month = m
+                day, hour, minute, second = 1, 0, 0, 0
+                continue
+            d = _lowest_from(self.day_mask(year, month), day)
+            if d < 0:
+                month, day, hour, minute, second = month + 1, 1, 0, 0, 0
+                continue
+            if d != day:
+                day, hour, minute, second = d, 0, 0, 0
+            h = _lowest_from(self.hours, hour)
+            if h < 0:
+                day, hour, minute, second = day + 1, 0, 0, 0
+                continue
+            if h != hour:
+                hour, minute, second = h, 0, 0
+            m = _lowest_from(self.minutes, minute)
+            if m < 0:
+                hour, minute, second = hour + 1, 0, 0
+                continue
+            if m != minute:
+                minute, second = m, 0
+            s = _lowest_from(self.seconds, second)
+            if s < 0:
+                minute, second = minute + 1, 0
+                continue
+            fire = datetime(year, month, day, hour, minute, s, self.microsecond)
+            if self.until is not None and fire > self.until:
+                return None
+            return fire
+        return None
+
+    def preview(self, count, after=None, clock=None):
+        """从 after(默认为 clock 的当前时间)起的接下来 count 次发送时间"""
+        fires = []
+        current = after or (clock or SYSTEM_CLOCK).now()
+        while len(fires) < count:
+            current = self.next_after(current)
+            if current is None:
+                break
+            fires.append(current)
+        return fires
+
+    def __repr__(self):
+        return f"Recurrence({self.source!r})"
+
+
+# ---- 由原有的 每周/每月 设置构造 ----
+
+
+def _with_time(rule, at):
+    rule.hours = 1 << at.hour
+    rule.minutes = 1 << at.minute
+    rule.seconds = 1 << at.second
+    rule.microsecond = at.microsecond
+    return rule
+
+
+def weekly(days, at):
+    """每周 days(0=周一) 的 at 时刻"""
+    rule = _with_time(Recurrence(f"weekly {sorted(days)} {at}"), at)
+    rule.weekdays = _bits(days)
+    rule.weekdays_any = False
+    return rule._finish()
+
+
+def monthly(days, at):
+    """每月 days(1-31，-1 表示月末) 的 at 时刻；当月没有的日期跳过"""
+    rule = _with_time(Recurrence(f"monthly {sorted(days)} {at}"), at)
+    rule.days = _bits(d for d in days if d > 0)
+    rule.last_day = -1 in days
+    rule.days_any = False
+    return rule._finish()
+
+
+# ---- cron ----
+
+
+def _parse_field(text, low, high, names=None):
+    values = set()
+    for part in text.upper().split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"步长必须为正数: {text}")
+        if part in ("*", "?"):
+            start, end = low, high
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = _value(a, names), _value(b, names)
+        else:
+            start = _value(part, names)
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise ValueError(f"取值超出范围 {low}-{high}: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _value(token, names):
+    if names and token in names:
+        return names[token]
+    return int(token)
+
+
+def compile_cron(expression):
+    """编译 cron 表达式，5 段(分 时 日 月 周)或 6 段(秒 分 时 日 月 周)"""
+    text = _MACROS.get(expression.strip().lower(), expression.strip())
+    fields = text.split()
+    if len(fields) == 5:
+        fields = ["0"] + fields
+    if len(fields) != 6:
+        raise ValueError(f"cron 表达式应为 5 或 6 段: {expression}")
+    sec, minute, hour, dom, month, dow = fields
+    rule = Recurrence(expression)
+    rule.seconds = _bits(_parse_field(sec, 0, 59))
+    rule.minutes = _bits(_parse_field(minute, 0, 59))
+    rule.hours = _bits(_parse_field(hour, 0, 23))
+    rule.months = _bits(_parse_field(month, 1, 12, _MONTH_NAMES))
+
+    dom = dom.upper()
+    rule.days_any = dom in ("*", "?")
+    if dom == "LW":
+        if dow not in ("*", "?"):
+            raise ValueError(f"LW 不能与星期字段同时使用: {expression}")
+        rule.weekdays = _bits(range(5))
+        rule.weekdays_any = False
+        rule.setpos = [-1]
+        rule.days_any = True
+        return rule._finish()
+    if not rule.days_any:
+        numbers = [p for p in dom.split(",") if p != "L"]
+        rule.last_day = len(numbers) < len(dom.split(","))
+        rule.days = _bits(_parse_field(",".join(numbers), 1, 31)) if numbers else 0
+
+    dow = dow.upper()
+    rule.weekdays_any = dow in ("*", "?")
+    if not rule.weekdays_any:
+        plain = []
+        for part in dow.split(","):
+            if "#" in part:
+                w, n = part.split("#", 1)
+                n = int(n)
+                if not 1 <= n <= 5:
+                    raise ValueError(f"第几个星期应为 1-5: {part}")
+                rule.nth.append((_cron_weekday(w), n))
+            elif part.endswith("L") and part != "L":
+                rule.nth.append((_cron_weekday(part[:-1]), -1))
+            else:
+                plain.append(part)
+        cron_days = _parse_field(",".join(plain), 0, 7, _CRON_DOW_NAMES) if plain else set()
+        rule.weekdays = _bits((d - 1) % 7 for d in cron_days)
+        rule.weekdays_any = not plain  # 只有 # / L 形式时由 nth 限定
+    return rule._finish()
+
+
+def _cron_weekday(token):
+    value = _value(token, _CRON_DOW_NAMES)
+    if not 0 <= value <= 7:
+        raise ValueError(f"星期取值超出范围 0-7: {token}")
+    return (value - 1) % 7
+
+
+# ---- RRULE ----
+
+
+def _parse_rrule_time(text):
+    text = text.rstrip("Z")
+    if "T" in text:
+        return datetime.strptime(text, "%Y%m%dT%H%M%S")
+    return datetime.strptime(text, "%Y%m%d")
+
+
+def compile_rrule(text, start=None):
+    """编译 RRULE 子集；start 为默认起点(DTSTART)，用于 INTERVAL 及未给出的日期和时分秒"""
+    parts = {}
+    for item in text.strip().removeprefix("RRULE:").split(";"):
+        if not item:
+            continue
+        key, _, value = item.partition("=")
+        parts[key.strip().upper()] = value.strip().upper()
+    freq = parts.pop("FREQ", None)
+    if freq not in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+        raise ValueError(f"不支持的 FREQ: {freq}")
+    if "COUNT" in parts:
+        raise ValueError("不支持 COUNT，请使用 UNTIL")
+    if "DTSTART" in parts:
+        start = _parse_rrule_time(parts.pop("DTSTART"))
+    start = start or datetime.now().replace(microsecond=0)
+    rule = Recurrence(text)
+    rule.anchor = start.date()
+    rule.not_before = start
+    interval = int(parts.pop("INTERVAL", "1"))
+    if interval < 1:
+        raise ValueError("INTERVAL 必须为正数")
+    if "UNTIL" in parts:
+        rule.until = _parse_rrule_time(parts.pop("UNTIL"))
+
+    def ints(key, low, high):
+        values = [int(v) for v in parts.pop(key).split(",")]
+        for v in values:
+            if not (low <= v <= high or (key == "BYMONTHDAY" and v == -1)):
+                raise ValueError(f"{key} 取值超出范围: {v}")
+        return values
+
+    # 未给出的时分秒取起点的值；给出了更高一级(如只写 BYHOUR=17)时低位取 0，表示整点
+    explicit = False
+    for key, attr, low, high, default in (
+        ("BYHOUR", "hours", 0, 23, start.hour),
+        ("BYMINUTE", "minutes", 0, 59, start.minute),
+        ("BYSECOND", "seconds", 0, 59, start.second),
+    ):
+        if key in parts:
+            explicit = True
+            setattr(rule, attr, _bits(ints(key, low, high)))
+        else:
+            setattr(rule, attr, 1 if explicit else 1 << default)
+    rule.microsecond = 0 if explicit else start.microsecond
+    if "BYMONTH" in parts:
+        rule.months = _bits(ints("BYMONTH", 1, 12))
+    elif freq == "YEARLY":
+        rule.months = 1 << start.month
+    if "BYMONTHDAY" in parts:
+        days = ints("BYMONTHDAY", 1, 31)
+        rule.days = _bits(d for d in days if d > 0)
+        rule.last_day = -1 in days
+        rule.days_any = False
+    if "BYDAY" in parts:
+        plain = []
+        for token in parts.pop("BYDAY").split(","):
+            name, number = token[-2:], token[:-2]
+            if name not in _RRULE_DAYS:
+                raise ValueError(f"BYDAY 取值无效: {token}")
+            if number:
+                n = int(number)
+                if n == 0 or not -1 <= n <= 5:
+                    raise ValueError(f"BYDAY 序号只支持 1-5 或 -1: {token}")
+                rule.nth.append((_RRULE_DAYS[name], n))
+            else:
+                plain.append(_RRULE_DAYS[name])
+        if plain:
+            rule.weekdays = _bits(plain)
+            rule.weekdays_any = False
+    elif freq == "WEEKLY":
+        rule.weekdays = 1 << start.weekday()
+        rule.weekdays_any = False
+    elif freq in ("MONTHLY", "YEARLY") and rule.days_any:
+        rule.days = 1 << start.day
+        rule.days_any = False
+    rule.day_and = True
+    if "BYSETPOS" in parts:
+        if freq != "MONTHLY":
+            raise ValueError("BYSETPOS 只支持 FREQ=MONTHLY")
+        rule.setpos = [int(v) for v in parts.pop("BYSETPOS").split(",")]
+    if parts:
+        raise ValueError(f"不支持的 RRULE 字段: {', '.join(parts)}")
+    if freq == "DAILY":
+        rule.day_interval = interval
+    elif freq == "WEEKLY":
+        rule.week_interval = interval
+    elif freq == "MONTHLY":
+        rule.month_interval = interval
+    else:
+        rule.year_interval = interval
+    return rule._finish()
+
+
+def compile_rule(text, start=None, clock=None):
+    """按内容判断是 cron 表达式还是 RRULE 并编译
+
+    编译结果只读，相同的规则和起点直接复用(批量导入时大量任务共用同一规则)。
+    RRULE 未给出 start 时以 clock(默认系统时钟)的当前时刻为起点，起点在查缓存前确定，
+    不会复用之前调用时的时刻。
+    """
+    stripped = text.strip()
+    if "FREQ=" in stripped.upper():
+        start = start or (clock or SYSTEM_CLOCK).now().replace(microsecond=0)
+        return _compile_cached(stripped, start)
+    return _compile_cached(stripped, None)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_cached(text, start):
+    if start is not None:
+        return compile_rrule(text, start)
+    return compile_cron(text)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 21:52:19
+project: auto_send
+filename: simulate.py
+version: 1.0
+"""
+
+"""虚拟时钟模拟：在几秒内走完数十天的计划，报告每一次发送、准备窗口和键盘占用冲突
+
+任务复制后交给一个使用 VirtualClock、不启动分发线程的 JobEngine，时钟直接推进到下一个
+准备时刻并分发，分发顺序与实际运行时相同。提前量、准备耗时和占用时长取自 SchedulerCore
+的估算(传入正在运行的核心时使用其已学到的耗时；否则新建一个使用模拟输入后端的核心)，
+全部发送按 arbiter.plan_slots 排列键盘占用，找出无法按时准备完成的冲突。
+"""
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+
+from arbiter import plan_slots
+from clock import VirtualClock
+from engine import Job, JobEngine
+
+
+class SimulatedFire:
+    """模拟中的一次发送"""
+
+    __slots__ = ("job", "fire_time", "dispatched", "lead", "prepare", "hold", "slot", "blocked_by")
+
+    def __init__(self, job, fire_time, dispatched, lead, prepare, hold):
+        self.job = job
+        self.fire_time = fire_time
+        self.dispatched = dispatched  # 调度引擎分发(开始排队准备)的时刻
+        self.lead = lead
+        self.prepare = prepare
+        self.hold = hold
+        self.slot = None
+        self.blocked_by = None  # 占住键盘导致本次晚准备的任务ID
+
+    def to_dict(self):
+        slot = self.slot
+        return {
+            "fire_time": self.fire_time.isoformat(timespec="milliseconds"),
+            "job_id": self.job.job_id,
+            "target": self.job.target,
+            "dispatched": self.dispatched.isoformat(timespec="milliseconds"),
+            "lead_seconds": round(self.lead, 3),
+            "prepare_seconds": round(self.prepare, 3),
+            "prepare_start": slot.start.isoformat(timespec="milliseconds"),
+            "ready": slot.ready.isoformat(timespec="milliseconds"),
+            "release": slot.release.isoformat(timespec="milliseconds"),
+            "late_seconds": round(slot.late_seconds, 3),
+            "blocked_by": self.blocked_by,
+        }
+
+
+class SimulationReport:
+    def __init__(self, start, end, jobs):
+        self.start = start
+        self.end = end
+        self.jobs = jobs
+        self.fires = []
+        self.seconds = 0.0
+
+    @property
+    def conflicts(self):
+        return [fire for fire in self.fires if not fire.slot.feasible]
+
+    def summary(self, top=10):
+        """多行文字摘要"""
+        conflicts = self.conflicts
+        days = (self.end - self.start).total_seconds() / 86400
+        lines = [
+            f"模拟 {self.start:%Y-%m-%d %H:%M} ~ {self.end:%Y-%m-%d %H:%M} ({days:g} 天)，"
+            f"{self.jobs} 个任务，共 {len(self.fires)} 次发送，耗时 {self.seconds:.2f}秒",
+        ]
+        if self.fires:
+            per_day = {}
+            for fire in self.fires:
+                day = fire.fire_time.date()
+                per_day[day] = per_day.get(day, 0) + 1
+            busiest = max(per_day, key=per_day.get)
+            lines.append(f"发送最多的一天: {busiest} 共 {per_day[busiest]} 次")
+        if not conflicts:
+            lines.append("没有冲突: 所有发送都能按时准备完成")
+            return "\n".join(lines)
+        worst = max(conflicts, key=lambda f: f.slot.late_seconds)
+        lines.append(
+            f"冲突 {len(conflicts)} 次(无法按时准备完成)，最多晚 {worst.slot.late_seconds:.1f}秒"
+        )
+        for fire in sorted(conflicts, key=lambda f: -f.slot.late_seconds)[:top]:
+            reason = f"等待任务 {fire.blocked_by}" if fire.blocked_by else "准备耗时超过提前量"
+            lines.append(
+                f"  {fire.fire_time:%Y-%m-%d %H:%M:%S} [{fire.job.job_id}] {fire.job.target}: "
+                f"晚 {fire.slot.late_seconds:.1f}秒，{reason}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        """写出每一次发送的明细，.csv 为表格，其他扩展名为 JSON"""
+        rows = (fire.to_dict() for fire in self.fires)
+        if path.lower().endswith(".csv"):
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                writer = None
+                for row in rows:
+                    if writer is None:
+                        writer = csv.DictWriter(f, fieldnames=list(row))
+                        writer.writeheader()
+                    writer.writerow(row)
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "start": self.start.isoformat(),
+                    "end": self.end.isoformat(),
+                    "jobs": self.jobs,
+                    "conflicts": len(self.conflicts),
+                    "fires": list(rows),
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+
+def simulate(jobs, days=30, start=None, core=None):
+    """从 start(默认当前时间)起模拟 days 天，返回 SimulationReport；传入的任务不会被修改"""
+    wall_start = time.perf_counter()
+    own_core = core is None
+    if own_core:
+        from core import SchedulerCore
+        from input_backend import SimulatedBackend
+
+        core = SchedulerCore(SimulatedBackend(sleep_scale=0), on_log=lambda lines: None)
+    clock = VirtualClock(start)
+    start = clock.now()
+    end = start + timedelta(days=days)
+    copies = [Job.from_dict(job.to_dict()) for job in jobs]
+    try:
+        # 模拟期间没有真实发送，各任务的估算不变，每个任务只算一次
+        estimates = {
+            job.job_id: (core._lead_time(job), core._estimate_prepare(job), core._estimate_hold(job))
+            for job in copies
+        }
+    finally:
+        if own_core:
+            core.shutdown()
+    report = SimulationReport(start, end, len(copies))
+
+    def on_fire(job, fire_time):
+        lead, prepare, hold = estimates[job.job_id]
+        report.fires.append(SimulatedFire(job, fire_time, clock.now(), lead, prepare, hold))
+        engine.fire_done(job, fire_time)
+
+    engine = JobEngine(on_fire, lambda job: estimates[job.job_id][0], clock=clock)
+    engine.add_jobs(copies)
+    while True:
+        _, wait = engine.dispatch_due()
+        if wait is None or clock.now() + timedelta(seconds=wait) > end:
+            break
+        clock.advance(wait)
+    # 提前准备的发送可能落在模拟结束之后
+    report.fires = [fire for fire in report.fires if fire.fire_time <= end]
+    report.fires.sort(key=lambda fire: fire.fire_time)
+
+    entries = [
+        (i, fire.fire_time, fire.lead, fire.prepare, fire.hold)
+        for i, fire in enumerate(report.fires)
+    ]
+    for slot in plan_slots(entries, start):
+        fire = report.fires[slot.job_id]
+        fire.slot = slot
+        if slot.blocked_by is not None:
+            fire.blocked_by = report.fires[slot.blocked_by].job.job_id
+    report.seconds = time.perf_counter() - wall_start
+    return report
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 11:48:27
+project: auto_send
+filename: tracing.py
+version: 1.0
+"""
+
+"""发送周期的分阶段耗时追踪，以及按阶段/目标聚合的 HDR 风格直方图"""
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+ACTIVATE = "activate"
+SEARCH = "search"
+SELECT = "select"
+INPUT = "input"
+WAIT_FIRE = "wait_fire"
+SEND = "send"
+PHASES = (ACTIVATE, SEARCH, SELECT, INPUT, WAIT_FIRE, SEND)
+
+# 发送周期的步骤检查点: 重试从未完成的步骤继续，不重做已完成的步骤
+ACTIVATED = "activated"
+SELECTED = "selected"
+TYPING = "typing"  # 已开始输入，重新输入前要先清空输入框
+TYPED = "typed"
+DELIVERED = "delivered"  # 发送按键已送达
+
+
+class Histogram:
+    """HDR 风格的对数-线性直方图(单位微秒)
+
+    每个 2 的幂区间再均分为 2^sub_bits 个桶，相对误差不超过 1/2^sub_bits，
+    记录为 O(1)，内存只与数值跨度的数量级有关。
+    """
+
+    def __init__(self, sub_bits=7):
+        self.sub_bits = sub_bits
+        self.counts = {}  # 桶下界 -> 次数
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - self.sub_bits - 1)
+        return (value >> shift) << shift, shift
+
+    def record(self, value):
+        value = max(0, int(value))
+        low, _ = self._bucket(value)
+        self.counts[low] = self.counts.get(low, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """第 p 百分位数，返回所在桶的上界(不超过实际最大值)"""
+        if not self.count:
+            return 0
+        rank = max(1, int(round(p / 100.0 * self.count + 0.5 - 1e-9)))
+        seen = 0
+        for low in sorted(self.counts):
+            seen += self.counts[low]
+            if seen >= rank:
+                _, shift = self._bucket(low)
+                return min(low + (1 << shift) - 1, self.max)
+        return self.max
+
+    def summary(self):
+        """毫秒为单位的 p50/p95/p99/max 摘要"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count / 1000.0,
+            "p50_ms": self.percentile(50) / 1000.0,
+            "p95_ms": self.percentile(95) / 1000.0,
+            "p99_ms": self.percentile(99) / 1000.0,
+            "max_ms": self.max / 1000.0,
+        }
+
+
+class Span:
+    def __init__(self, phase, start_ns, end_ns=None, attempt=1):
+        self.phase = phase
+        self.start_ns = start_ns  # time.monotonic_ns()
+        self.end_ns = end_ns
+        self.attempt = attempt
+
+    @property
+    def duration_ns(self):
+        return None if self.end_ns is None else self.end_ns - self.start_ns
+
+    def to_dict(self):
+        return {
+            "phase": self.phase,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "attempt": self.attempt,
+        }
+
+
+class SendCycle:
+    """一次发送周期(准备 → 等待触发 → 发送)，可跨线程记录各阶段的起止时刻"""
+
+    def __init__(self, target, job_id=None, recorder=None):
+        self.cycle_id = uuid.uuid4().hex[:12]
+        self.target = target
+        self.job_id = job_id
+        self.content = None  # 发送内容及计划发送时间，由调用方填写，用于发送记录
+        self.scheduled_time = None
+        self.profiler = None  # 正在采样本周期的 CycleProfiler
+        self.key = self.cycle_id  # 幂等键，同一个键至多发送一次
+        self.checkpoints = set()
+        self.spans = []
+        self.outcome = None
+        self._recorder = recorder
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def start(self, phase, attempt=1):
+        with self._lock:
+            self._open[phase] = Span(phase, time.monotonic_ns(), attempt=attempt)
+
+    def finish(self, phase):
+        with self._lock:
+            span = self._open.pop(phase, None)
+            if span is not None:
+                span.end_ns = time.monotonic_ns()
+                self.spans.append(span)
+
+    def reach(self, step):
+        self.checkpoints.add(step)
+
+    def reached(self, step):
+        return step in self.checkpoints
+
+    def span(self, phase, attempt=1):
+        """with cycle.span(phase): ... 形式的阶段记录"""
+        return _SpanContext(self, phase, attempt)
+
+    def close(self, outcome):
+        """结束周期并提交到聚合器；未结束的阶段丢弃"""
+        with self._lock:
+            if self.outcome is not None:
+                return
+            self.outcome = outcome
+            self._open.clear()
+        if self._recorder is not None:
+            self._recorder.record_cycle(self)
+
+    def durations(self):
+        """各阶段总耗时(秒)，重试时同一阶段累加"""
+        result = {}
+        for span in self.spans:
+            result[span.phase] = result.get(span.phase, 0.0) + span.duration_ns / 1e9
+        return result
+
+    def describe(self):
+        parts = [f"{phase} {seconds:.3f}s" for phase, seconds in self.durations().items()]
+        return f"周期 {self.cycle_id} 各阶段耗时: " + ", ".join(parts)
+
+    def to_dict(self):
+        return {
+            "cycle_id": self.cycle_id,
+            "key": self.key,
+            "job_id": self.job_id,
+            "target": self.target,
+            "outcome": self.outcome,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class _SpanContext:
+    def __init__(self, cycle, phase, attempt):
+        self.cycle = cycle
+        self.phase = phase
+        self.attempt = attempt
+
+    def __enter__(self):
+        self.cycle.start(self.phase, self.attempt)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cycle.finish(self.phase)
+        return False
+
+
+class LatencyRecorder:
+    """按阶段、按目标聚合各发送周期的耗时直方图"""
+
+    def __init__(self, recent=200, on_cycle=None):
+        self._on_cycle = on_cycle  # on_cycle(cycle)，每个周期结束后在锁外调用
+        self.profiler = None  # 可选的 CycleProfiler，开启后对每个新周期采样
+        self._lock = threading.Lock()
+        self._phases = {}  # phase -> Histogram
+        self._targets = {}  # target -> {phase -> Histogram}
+        self._recent = deque(maxlen=recent)
+        self._outcomes = {}
+
+    def new_cycle(self, target, job_id=None, content=None, scheduled_time=None):
+        cycle = SendCycle(target, job_id, recorder=self)
+        cycle.content = content
+        cycle.scheduled_time = scheduled_time
+        if job_id and scheduled_time:
+            # 同一任务同一发送时间、同一目标只发一次，补发、重新规划或重启后也不重复
+            cycle.key = f"{job_id}@{scheduled_time.isoformat(timespec='microseconds')}/{target}"
+        if self.profiler is not None:
+            self.profiler.begin(cycle)
+        return cycle
+
+    def record_cycle(self, cycle):
+        if cycle.profiler is not None:
+            cycle.profiler.end(cycle)
+        with self._lock:
+            for span in cycle.spans:
+                micros = span.duration_ns // 1000
+                self._phases.setdefault(span.phase, Histogram()).record(micros)
+                per_target = self._targets.setdefault(cycle.target, {})
+                per_target.setdefault(span.phase, Histogram()).record(micros)
+            self._outcomes[cycle.outcome] = self._outcomes.get(cycle.outcome, 0) + 1
+            self._recent.append(cycle.to_dict())
+        if self._on_cycle is not None:
+            self._on_cycle(cycle)
+
+    def histogram(self, phase, target=None):
+        """某阶段(可限定目标)的耗时摘要"""
+        with self._lock:
+            source = self._phases if target is None else self._targets.get(target, {})
+            hist = source.get(phase)
+            return hist.summary() if hist else {"count": 0}
+
+    def snapshot(self, recent=False):
+        with self._lock:
+            data = {
+                "phases": {p: h.summary() for p, h in self._phases.items()},
+                "targets": {
+                    t: {p: h.summary() for p, h in hists.items()}
+                    for t, hists in self._targets.items()
+                },
+                "outcomes": dict(self._outcomes),
+            }
+            if recent:
+                data["recent_cycles"] = list(self._recent)
+            return data
+
+    def to_json(self, recent=True):
+        return json.dumps(self.snapshot(recent), ensure_ascii=False, indent=2)
+
+    def export_json(self, path, recent=True):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json(recent))
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+            self._targets.clear()
+            self._recent.clear()
+            self._outcomes.clear()
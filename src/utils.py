@@ -9,12 +9,104 @@ filename: utils.py
 version: 1.0
 """
 
+import logging
 import threading
+from collections import deque
 from datetime import datetime
 
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
 
-def async_log(log_signal, message):
-    threading.Thread(target=lambda: log_signal.emit(message), daemon=True).start()
+
+class LogDispatcher:
+    """单线程日志分发器
+
+    日志行先进入有界队列，由一个常驻线程按批取出，每批只调用一次 emit_batch(lines)，
+    行的顺序与写入顺序一致。队列满时按 policy 处理:
+    drop_oldest 丢弃最旧的行，drop_newest 丢弃新行，block 阻塞写入方直到有空位。
+    """
+
+    def __init__(self, emit_batch, capacity=10000, max_batch=500, policy=DROP_OLDEST):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的溢出策略: {policy}")
+        self._emit_batch = emit_batch
+        self.capacity = capacity
+        self.max_batch = max_batch
+        self.policy = policy
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.queued = 0  # 累计入队行数
+        self.dropped = 0
+        self.max_depth = 0
+        self.batches = 0
+        self.delivered = 0
+        self._thread = threading.Thread(target=self._run, name="log-dispatcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, message):
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.capacity:
+                if self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._queue) >= self.capacity and not self._closed:
+                        self._cond.wait()
+            self._queue.append(message)
+            self.queued += 1
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify_all()
+            return True
+
+    def depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "depth": len(self._queue),
+                "max_depth": self.max_depth,
+                "batches": self.batches,
+                "delivered": self.delivered,
+            }
+
+    def close(self, timeout=2):
+        """投递完剩余日志后停止分发线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                count = min(len(self._queue), self.max_batch)
+                batch = [self._queue.popleft() for _ in range(count)]
+                self.batches += 1
+                self.delivered += count
+                self._cond.notify_all()  # 唤醒 block 策略下等待的写入方
+            try:
+                self._emit_batch(batch)
+            except Exception as e:
+                # 只写入日志文件(不经由本分发器)，避免界面回调出错时反复递归
+                logging.error(f"日志投递失败，丢弃 {len(batch)} 行: {e}", exc_info=True)
 
 
 def format_time(dt=None):
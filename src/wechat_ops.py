@@ -10,38 +10,225 @@ version: 1.0
 """
 
 """封装所有与企业微信窗口、键盘操作相关的底层实现"""
-import win32gui
-import keyboard
+import threading
 import time
 from config import WECHAT_WINDOW_TITLE
+from input_backend import Win32Backend
 
+_backend = None
 
-def activate_wechat(window_title=WECHAT_WINDOW_TITLE, delay=1.0):
-    hwnd = win32gui.FindWindow(None, window_title)
+# 各输入方式的累计耗时统计 {方式: {"count", "seconds", "chars"}}
+_input_stats = {}
+_stats_lock = threading.Lock()
+
+
+def set_backend(backend):
+    """设置默认输入后端，如 SimulatedBackend"""
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    """返回默认输入后端，未设置时使用 Win32Backend"""
+    global _backend
+    if _backend is None:
+        _backend = Win32Backend()
+    return _backend
+
+
+def wait_until(condition, timeout, interval=0.02, backend=None):
+    """轮询 condition 直到为真或超时，返回实际等待秒数
+
+    condition 返回 None 表示该状态无法观测，此时按 timeout 等满，保持原来的固定延时行为。
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        ready = condition()
+        if ready is None:
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                (backend or get_backend()).sleep(remaining)
+            break
+        if ready or time.monotonic() >= deadline:
+            break
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+    return time.monotonic() - start
+
+
+def wait_focus_change(before, timeout, interval=0.02, backend=None):
+    """等待输入焦点(焦点控件或光标位置)相对 before 发生变化"""
+    backend = backend or get_backend()
+    if before is None:
+        return wait_until(lambda: None, timeout, interval, backend)
+
+    def changed():
+        focus = backend.get_focus()
+        return None if focus is None else focus != before
+
+    return wait_until(changed, timeout, interval, backend)
+
+
+def activate_wechat(window_title=WECHAT_WINDOW_TITLE, delay=1.0, backend=None, interval=0.02):
+    """激活窗口，前台窗口变为目标句柄即返回，delay 为等待上限"""
+    backend = backend or get_backend()
+    hwnd = backend.find_window(window_title)
     if hwnd:
-        win32gui.SetForegroundWindow(hwnd)
-        time.sleep(delay)
+        activate_window(hwnd, delay, backend, interval)
         return True
     return False
 
 
-def search_and_select_chat(target, shortcuts, delays):
-    keyboard.press_and_release(shortcuts["open_search"])
-    time.sleep(delays["search_delay"])
-    keyboard.write(target)
-    time.sleep(delays["search_result_delay"])
-    keyboard.press_and_release("enter")
-    time.sleep(delays["chat_delay"])
+def activate_window(hwnd, delay=1.0, backend=None, interval=0.02):
+    """按句柄激活窗口，已在前台时不做任何操作"""
+    backend = backend or get_backend()
+    if backend.get_foreground() != hwnd:
+        backend.set_foreground(hwnd)
+        wait_until(lambda: backend.get_foreground() == hwnd, delay, interval, backend)
+
+
+def search_and_select_chat(target, shortcuts, delays, backend=None):
+    """打开搜索框、输入目标并进入会话；除搜索结果外各步骤的 DELAYS 均为等待上限"""
+    search_chat(target, shortcuts, delays, backend)
+    select_chat(delays, backend)
+
+
+def search_chat(target, shortcuts, delays, backend=None):
+    """打开搜索框并输入目标，等待搜索结果
+
+    输入目标后焦点一直停在搜索框里，搜索结果出现与否没有可观测的信号，因此按
+    search_result_delay 等满，不以焦点是否变化提前结束。
+    """
+    backend = backend or get_backend()
+    interval = delays.get("poll_interval", 0.02)
+    before = backend.get_focus()
+    backend.press(shortcuts["open_search"])
+    wait_focus_change(before, delays["search_delay"], interval, backend)
+    backend.write(target)
+    backend.sleep(delays["search_result_delay"])
 
 
-def input_message_content(content, delays):
+def select_chat(delays, backend=None):
+    """回车选中第一个搜索结果并等待会话打开"""
+    backend = backend or get_backend()
+    before = backend.get_focus()
+    backend.press("enter")
+    wait_focus_change(before, delays["chat_delay"], delays.get("poll_interval", 0.02), backend)
+
+
+def input_message_content(content, delays, backend=None, mode="type"):
+    """输入消息内容，返回实际使用的输入方式
+
+    mode="paste" 时整段内容一次性放入剪贴板后粘贴，并恢复用户原来的剪贴板文本；
+    剪贴板中有图片、文件等无法原样恢复的内容，或粘贴前出错时，回退为逐行输入。
+    """
+    backend = backend or get_backend()
+    if mode == "paste":
+        start = time.perf_counter()
+        if _paste_content(content, delays, backend):
+            _record_input("paste", time.perf_counter() - start, len(content))
+            return "paste"
+    start = time.perf_counter()
+    _type_content(content, delays, backend)
+    _record_input("type", time.perf_counter() - start, len(content))
+    return "type"
+
+
+def _type_content(content, delays, backend):
     lines = content.split("\n")
     for i, line in enumerate(lines):
-        keyboard.write(line)
-        time.sleep(0.1)
-        keyboard.press_and_release("shift+enter")
-        time.sleep(delays["line_delay"])
+        backend.write(line)
+        backend.sleep(0.1)
+        backend.press("shift+enter")
+        backend.sleep(delays["line_delay"])
+
+
+def _paste_content(content, delays, backend):
+    """粘贴整段内容；剪贴板无法原样恢复或粘贴按键失败时返回 False，由调用方回退"""
+    try:
+        if not backend.clipboard_restorable():
+            return False
+        saved = backend.get_clipboard()
+        backend.set_clipboard(content)
+    except Exception:
+        return False
+    try:
+        backend.press("ctrl+v")
+    except Exception:
+        _restore_clipboard(saved, backend)
+        return False
+    try:
+        # 目标窗口异步读取剪贴板，恢复前需稍作等待
+        backend.sleep(delays.get("paste_delay", 0.3))
+    finally:
+        _restore_clipboard(saved, backend)
+    return True
+
+
+def _restore_clipboard(saved, backend):
+    try:
+        backend.set_clipboard(saved)
+    except Exception:
+        pass  # 恢复失败不影响已粘贴的内容，不能因此重新输入
+
+
+def _record_input(mode, seconds, chars):
+    with _stats_lock:
+        stats = _input_stats.setdefault(mode, {"count": 0, "seconds": 0.0, "chars": 0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        stats["chars"] += chars
+
+
+def input_stats():
+    """各输入方式的次数、平均耗时及每千字符耗时"""
+    with _stats_lock:
+        return {
+            mode: {
+                "count": s["count"],
+                "avg_seconds": s["seconds"] / s["count"],
+                "seconds_per_kchar": s["seconds"] * 1000 / s["chars"] if s["chars"] else 0.0,
+            }
+            for mode, s in _input_stats.items()
+        }
+
+
+def clear_input(backend=None):
+    """清空当前输入框(全选后删除)，重新输入前调用，避免内容重复"""
+    backend = backend or get_backend()
+    backend.press("ctrl+a")
+    backend.press("backspace")
+
+
+def input_box_empty(delays, backend=None):
+    """发送按键出错后判断消息是否已发出: 全选并复制输入框，没有复制到内容说明已发送
+
+    返回 True(输入框为空)、False(内容仍在)或 None(无法判断)；用户原来的剪贴板文本会恢复，
+    剪贴板中有无法原样恢复的内容时不做检查，返回 None。
+    """
+    backend = backend or get_backend()
+    marker = f"auto_send-{time.monotonic_ns()}"
+    try:
+        if not backend.clipboard_restorable():
+            return None
+        saved = backend.get_clipboard()
+    except Exception:
+        return None
+    try:
+        backend.set_clipboard(marker)
+        backend.press("ctrl+a")
+        backend.press("ctrl+c")
+        backend.sleep(delays.get("paste_delay", 0.3))
+        copied = backend.get_clipboard()
+    except Exception:
+        return None
+    finally:
+        _restore_clipboard(saved, backend)
+    if copied is None:
+        return None
+    return copied == marker
 
 
-def send_message(shortcuts):
-    keyboard.press_and_release(shortcuts["send_message"])
+def send_message(shortcuts, backend=None):
+    backend = backend or get_backend()
+    backend.press(shortcuts["send_message"])
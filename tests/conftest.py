@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 23:05:12
+project: auto_send
+filename: conftest.py
+version: 1.0
+"""
+
+"""src 下的模块按顶层模块导入(与 main.py、bench_*.py 一致)；提供模拟后端的核心和等待工具"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+def wait_for(predicate, timeout=5.0, interval=0.02):
+    """轮询 predicate 直到为真，超时返回 False"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return bool(predicate())
+
+
+@pytest.fixture
+def backend():
+    from input_backend import SimulatedBackend
+
+    return SimulatedBackend(sleep_scale=0)
+
+
+@pytest.fixture
+def make_core(backend):
+    """make_core(store=None, backend=None) 创建使用模拟后端的 SchedulerCore，测试结束时关闭"""
+    from core import SchedulerCore
+
+    cores = []
+
+    def make(store=None, backend_=None):
+        core = SchedulerCore(backend_ or backend, store, on_log=lambda lines: None)
+        cores.append(core)
+        return core
+
+    yield make
+    for core in cores:
+        core.shutdown()
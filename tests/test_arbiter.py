@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 10:55:30
+project: auto_send
+filename: test_arbiter.py
+version: 1.0
+"""
+
+"""键盘占用的 EDF 规划，以及调度引擎连带分发发送时刻更早的任务"""
+from datetime import datetime, timedelta
+
+from arbiter import plan_slots, conflicts
+from clock import VirtualClock
+from engine import Job, JobEngine
+
+NOW = datetime(2030, 1, 7, 9, 0)
+
+
+def _at(seconds):
+    return NOW + timedelta(seconds=seconds)
+
+
+def test_independent_slots():
+    slots = plan_slots([("a", _at(60), 10, 4, 1), ("b", _at(120), 10, 4, 1)], NOW)
+    assert [s.job_id for s in slots] == ["a", "b"]
+    a, b = slots
+    assert (a.start, a.ready, a.release) == (_at(50), _at(54), _at(61))
+    assert b.start == _at(110) and b.blocked_by is None
+    assert not conflicts(slots)
+
+
+def test_slots_follow_fire_time_not_lead():
+    # b 的提前量更长，但发送时刻更早的 a 先占用键盘
+    slots = plan_slots([("b", _at(65), 60, 4, 1), ("a", _at(60), 10, 4, 1)], NOW)
+    assert [s.job_id for s in slots] == ["a", "b"]
+    a, b = slots
+    assert a.start == _at(50)
+    assert b.start == _at(61) and b.blocked_by == "a"
+    assert b.ready == _at(65) and b.feasible
+
+
+def test_conflict_when_keyboard_busy():
+    slots = plan_slots([("a", _at(60), 10, 4, 5), ("b", _at(62), 10, 4, 1)], NOW)
+    b = slots[1]
+    assert b.start == _at(65) and b.blocked_by == "a"
+    assert not b.feasible and b.late_seconds == 7
+    assert conflicts(slots) == [b]
+
+
+def test_prepare_longer_than_lead_starts_earlier():
+    (slot,) = plan_slots([("a", _at(60), 2, 5, 0)], NOW)
+    assert slot.start == _at(55) and slot.feasible
+
+
+def test_overdue_starts_now():
+    (slot,) = plan_slots([("a", _at(3), 10, 4, 0)], NOW)
+    assert slot.start == NOW and slot.late_seconds == 1
+    assert slot.blocked_by is None
+
+
+def test_engine_dispatches_earlier_fires_with_due_job():
+    clock = VirtualClock(NOW)
+    leads = {"long": 60.0, "short": 5.0}
+    fired = []
+    engine = JobEngine(lambda job, fire_time: fired.append(job.job_id), lambda job: leads[job.job_id], clock=clock)
+    engine.add_jobs([
+        Job("群A", "a", scheduled_time=_at(120), job_id="long"),
+        Job("群B", "b", scheduled_time=_at(100), job_id="short"),
+    ])
+    count, wait = engine.dispatch_due()
+    assert count == 0 and wait == 60
+    clock.advance(wait)
+    count, wait = engine.dispatch_due()
+    # long 到准备时刻时，发送更早的 short 一并交给按截止时刻排序的输入通道
+    assert count == 2 and sorted(fired) == ["long", "short"]
+    clock.advance(wait)
+    assert engine.dispatch_due() == (0, None)  # 不会再次分发
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 12:06:37
+project: auto_send
+filename: test_audit.py
+version: 1.0
+"""
+
+"""发送记录: 按目标链和时间二分查询、重启后恢复写了一半的记录"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from audit import AuditLog, _INDEX, format_record
+
+START = datetime(2030, 1, 7, 9, 0)
+
+
+def _record(i, target):
+    return {
+        "at": (START + timedelta(minutes=i)).isoformat(timespec="milliseconds"),
+        "target": target,
+        "outcome": "sent",
+        "seq": i,
+    }
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = AuditLog(str(tmp_path / "audit.jsonl"))
+    for i in range(30):
+        log.append(_record(i, ("群A", "群B", "群C")[i % 3]))
+    yield log
+    log.close()
+
+
+def _seqs(records):
+    return [r["seq"] for r in records]
+
+
+def test_query_all_newest_first(log):
+    assert len(log) == 30
+    assert _seqs(log.query(limit=5)) == [29, 28, 27, 26, 25]
+
+
+def test_query_by_target_follows_chain(log):
+    assert _seqs(log.query("群B")) == list(range(28, 0, -3))
+    assert _seqs(log.query("群B", limit=2)) == [28, 25]
+    assert log.query("群X") == []
+
+
+def test_query_by_time_range(log):
+    since = START + timedelta(minutes=10)
+    until = START + timedelta(minutes=14)
+    assert _seqs(log.query(since=since, until=until)) == [14, 13, 12, 11, 10]
+    assert _seqs(log.query("群A", since=since, until=until)) == [12]
+    assert _seqs(log.query(until=START)) == [0]
+    assert log.query(since=START + timedelta(days=1)) == []
+
+
+def test_times_never_go_backwards(tmp_path):
+    log = AuditLog(str(tmp_path / "audit.jsonl"))
+    log.append(_record(5, "群A"))
+    log.append(_record(1, "群A"))  # 时钟回拨: 索引时间取不减的值，二分查找仍然有效
+    assert _seqs(log.query(since=START + timedelta(minutes=5))) == [1, 5]
+    log.close()
+
+
+def test_reopen_keeps_index(log):
+    path = log.path
+    log.close()
+    reopened = AuditLog(path)
+    assert len(reopened) == 30
+    reopened.append(_record(30, "群A"))
+    assert _seqs(reopened.query("群A", limit=2)) == [30, 27]
+    reopened.close()
+
+
+def test_recover_torn_writes(log):
+    path = log.path
+    log.close()
+    # 数据已完整写入但索引未写入一条，另有一条写了一半
+    with open(path, "ab") as f:
+        f.write(b'{"at":"2030-01-07T09:30:00.000","target":"\xe7\xbe\xa4A","outcome":"sent","seq":30}\n')
+        f.write(b'{"at":"2030-01-07T09:31')
+    with open(path + ".idx", "ab") as f:
+        f.write(b"\0" * (_INDEX.size // 2))
+    recovered = AuditLog(path)
+    assert len(recovered) == 31
+    assert _seqs(recovered.query("群A", limit=2)) == [30, 27]
+    recovered.append(_record(31, "群B"))
+    assert _seqs(recovered.query(limit=2)) == [31, 30]
+    recovered.close()
+
+
+def test_format_record():
+    record = dict(_record(0, "群A"), job_id="j1", fire_error_ms=1.5)
+    assert format_record(record) == "2030-01-07T09:00:00.000  sent           群A  [j1]  误差 +1.500ms"
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 11:31:09
+project: auto_send
+filename: test_calibrate.py
+version: 1.0
+"""
+
+"""延时校准: 建议值的分位数与取整、超时和无法观测时保持原值、一轮测量、命名配置的读写"""
+import pytest
+
+import calibrate
+from calibrate import Calibration, ACTIVATE_KEY, SEARCH_KEY, RESULT_KEY, CHAT_KEY, CALIBRATED_KEYS
+
+CURRENT = {ACTIVATE_KEY: 0.5, SEARCH_KEY: 0.5, RESULT_KEY: 1.0, CHAT_KEY: 0.5}
+
+
+def test_quantile():
+    assert calibrate._quantile([0.1, 0.2, 0.3, 0.4], 0.5) == 0.2
+    assert calibrate._quantile([0.1, 0.2, 0.3, 0.4], 0.95) == 0.4
+    assert calibrate._quantile([0.7], 0.95) == 0.7
+
+
+def test_propose_rounds_up_quantile_with_margin():
+    calibration = Calibration("群A", confidence=0.95, margin=0.25)
+    for seconds in (0.10, 0.12, 0.20):
+        calibration.add(SEARCH_KEY, seconds, True)
+    for seconds in (0.01, 0.01, 0.01):
+        calibration.add(CHAT_KEY, seconds, True)
+    proposed = calibration.propose(CURRENT)
+    assert proposed[SEARCH_KEY] == 0.25  # 0.20 * 1.25 向上取整到 50 毫秒
+    assert proposed[CHAT_KEY] == calibrate.FLOOR
+
+
+def test_propose_keeps_current_without_evidence():
+    calibration = Calibration("群A")
+    calibration.add(ACTIVATE_KEY, 0.1, True)  # 样本不足
+    for _ in range(5):
+        calibration.add(RESULT_KEY, 0.0, None)  # 无法观测
+    proposed = calibration.propose(CURRENT)
+    assert proposed[ACTIVATE_KEY] == CURRENT[ACTIVATE_KEY]
+    assert proposed[RESULT_KEY] == CURRENT[RESULT_KEY]
+    assert calibration.unobservable == {RESULT_KEY}
+
+
+def test_propose_frequent_timeouts_never_shortens():
+    calibration = Calibration("群A", confidence=0.95)
+    for _ in range(3):
+        calibration.add(SEARCH_KEY, 0.2, True)
+    calibration.add(SEARCH_KEY, 5.0, False)
+    proposed = calibration.propose(CURRENT)
+    assert proposed[SEARCH_KEY] == CURRENT[SEARCH_KEY]
+    assert calibration.summary(SEARCH_KEY)["timeouts"] == 1
+
+
+def test_measure_round(backend):
+    backend.windows = {"微信": 5}
+    calibration = Calibration("群A")
+    delays = dict(CURRENT, poll_interval=0.005, settle_time=0.05)
+    calibrate.measure_round(calibration, 5, {"open_search": "ctrl+f"}, delays, backend)
+    assert calibration.rounds == 1
+    assert all(len(calibration.samples[key]) == 1 for key in CALIBRATED_KEYS)
+    assert calibration.samples[RESULT_KEY][0] >= 0.05
+    assert [e[2] for e in backend.keystrokes()] == ["ctrl+f", "群A", "enter"]
+    # 窗口已在前台时不再测量激活
+    calibrate.measure_round(calibration, 5, {"open_search": "ctrl+f"}, delays, backend)
+    assert len(calibration.samples[ACTIVATE_KEY]) == 1
+    assert len(calibration.samples[SEARCH_KEY]) == 2
+
+
+def test_profiles_roundtrip(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    assert calibrate.load_profiles(path) == {}
+    assert calibrate.get_profile(path, "office") is None
+    calibrate.save_profile(path, "office", {SEARCH_KEY: 0.25}, {"rounds": 3})
+    calibrate.save_profile(path, "home", {SEARCH_KEY: 0.4})
+    calibrate.save_profile(path, "office", {SEARCH_KEY: 0.3})
+    assert sorted(calibrate.load_profiles(path)) == ["home", "office"]
+    assert calibrate.get_profile(path, "office") == {SEARCH_KEY: 0.3}
+    assert not (tmp_path / "profiles.json.tmp").exists()
+
+
+@pytest.mark.parametrize("confidence", [0.5, 0.95])
+def test_to_dict(confidence):
+    calibration = Calibration("群A", confidence)
+    calibration.add(CHAT_KEY, 0.1, True)
+    data = calibration.to_dict()
+    assert data["confidence"] == confidence
+    assert data["steps"][CHAT_KEY]["count"] == 1
+    assert data["steps"][SEARCH_KEY] == {"count": 0, "timeouts": 0}
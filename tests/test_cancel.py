@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 23:24:31
+project: auto_send
+filename: test_cancel.py
+version: 1.0
+"""
+
+"""取消: 等待精确发送时被停止的发送周期以 cancelled 结束，不按键、不留下待触发的发送"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import wait_for
+from engine import Job
+
+
+@pytest.fixture
+def closed(make_core):
+    """(core, 已结束的周期列表)"""
+    core = make_core()
+    cycles = []
+    on_cycle = core.latency._on_cycle
+
+    def record(cycle):
+        cycles.append(cycle)
+        on_cycle(cycle)
+
+    core.latency._on_cycle = record
+    return core, cycles
+
+
+def _waiting(core):
+    return wait_for(lambda: core.fire.pending(), timeout=5)
+
+
+@pytest.mark.parametrize("target", ["群A", ["群A", "群B"]], ids=["single", "broadcast"])
+def test_stop_closes_waiting_cycle(closed, backend, target):
+    core, cycles = closed
+    core.add_job(Job(target, "hi", scheduled_time=datetime.now() + timedelta(seconds=3)))
+    assert _waiting(core)  # 已准备好，正在等待发送时刻
+
+    core.stop_scheduler()
+    assert wait_for(lambda: cycles, timeout=3)
+    assert [cycle.outcome for cycle in cycles] == ["cancelled"]
+    assert not core.fire.pending()
+    assert not backend.events_of("press", core.shortcuts["send_message"])
+
+
+def test_cancelled_send_is_not_marked_done(closed, tmp_path):
+    from job_store import JobStore
+
+    core, cycles = closed
+    store = JobStore(str(tmp_path / "jobs.db"))
+    core.attach_store(store)
+    job = Job("群A", "hi", scheduled_time=datetime.now() + timedelta(seconds=3), job_id="j1")
+    core.add_job(job)
+    assert _waiting(core)
+
+    core.fire.stop()  # 停机: 等待中的发送被放弃
+    assert wait_for(lambda: cycles, timeout=3)
+    assert cycles[0].outcome == "cancelled"
+    assert [stored.job_id for stored in store.load()] == ["j1"]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 09:12:40
+project: auto_send
+filename: test_chat_cache.py
+version: 1.0
+"""
+
+"""会话定位缓存: 命中与未命中、发送失败后失效、独立会话窗口的识别、复用当前会话的开关"""
+import pytest
+
+from chat_cache import ChatCache
+
+MAIN = 100
+
+
+class FakeBackend:
+    """只提供 ChatCache 用到的查询: 窗口标题 -> 句柄，句柄 -> 进程"""
+
+    def __init__(self, windows=None, processes=None):
+        self.windows = dict(windows or {})
+        self.processes = dict(processes or {})
+        self.foreground = MAIN
+        self.focus = 7
+
+    def find_window(self, title):
+        return self.windows.get(title, 0)
+
+    def get_window_process(self, hwnd):
+        return self.processes.get(hwnd, 1) if hwnd else None
+
+    def get_foreground(self):
+        return self.foreground
+
+    def get_focus(self):
+        return self.focus
+
+
+def _sent(cache, backend, target, hwnd=MAIN):
+    cache.remember(target, hwnd)
+    cache.mark_sent(backend)
+
+
+def test_current_chat_hit_after_send():
+    backend = FakeBackend()
+    cache = ChatCache(reuse_current=True)
+    assert not cache.is_open("群A", MAIN)
+    _sent(cache, backend, "群A")
+    cache.observe(backend)
+    assert cache.is_open("群A", MAIN)
+    assert not cache.is_open("群B", MAIN)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_pending_chat_is_not_reused():
+    cache = ChatCache(reuse_current=True)
+    cache.remember("群A", MAIN)  # 已输入内容、尚未发送
+    assert not cache.is_open("群A", MAIN)
+
+
+@pytest.mark.parametrize("change", ["foreground", "focus"])
+def test_observe_invalidates_on_window_or_focus_change(change):
+    backend = FakeBackend()
+    cache = ChatCache(reuse_current=True)
+    _sent(cache, backend, "群A")
+    setattr(backend, change, 999)
+    cache.observe(backend)
+    assert not cache.is_open("群A", MAIN)
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_failed_send_invalidates():
+    backend = FakeBackend()
+    cache = ChatCache(reuse_current=True)
+    _sent(cache, backend, "群A")
+    cache.remember("群A", MAIN)
+    cache.invalidate()  # 发送失败或无法确认时 core 调用
+    cache.mark_sent(backend)  # 失效后不再记录
+    assert not cache.is_open("群A", MAIN)
+
+
+def test_unobservable_focus_never_hits():
+    backend = FakeBackend()
+    backend.focus = None
+    cache = ChatCache(reuse_current=True)
+    _sent(cache, backend, "群A")
+    assert not cache.is_open("群A", MAIN)
+
+
+def test_current_chat_reuse_is_off_by_default():
+    backend = FakeBackend()
+    cache = ChatCache()
+    _sent(cache, backend, "群A")
+    cache.observe(backend)
+    assert not cache.is_open("群A", MAIN)
+
+
+def test_detached_window_of_same_process():
+    backend = FakeBackend(windows={"群A": 200, "群B": 300}, processes={MAIN: 1, 200: 1, 300: 2})
+    cache = ChatCache()
+    assert cache.detached_window("群A", backend, MAIN) == 200
+    assert cache.is_open("群A", 200)
+    assert cache.stats()["detached_hits"] == 1
+    # 其他进程中同名的窗口不是会话窗口
+    assert cache.detached_window("群B", backend, MAIN) == 0
+    assert cache.detached_window("群C", backend, MAIN) == 0
+    assert cache.stats()["detached_windows"] == 1
+
+
+def test_closed_detached_window_is_forgotten():
+    backend = FakeBackend(windows={"群A": 200})
+    cache = ChatCache()
+    assert cache.detached_window("群A", backend, MAIN) == 200
+    del backend.windows["群A"]
+    assert cache.detached_window("群A", backend, MAIN) == 0
+    assert not cache.is_open("群A", 200)
+
+
+def test_main_window_title_is_not_detached():
+    backend = FakeBackend(windows={"微信": MAIN})
+    assert ChatCache().detached_window("微信", backend, MAIN) == 0
+
+
+def test_disabled_cache_never_hits():
+    backend = FakeBackend(windows={"群A": 200})
+    cache = ChatCache(enabled=False, reuse_current=True)
+    assert cache.detached_window("群A", backend, MAIN) == 0
+    _sent(cache, backend, "群A")
+    assert not cache.is_open("群A", MAIN)
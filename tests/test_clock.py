@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 09:41:05
+project: auto_send
+filename: test_clock.py
+version: 1.0
+"""
+
+"""可替换的时钟: 使用 VirtualClock 时导入、规则预览和计时都只取虚拟时间"""
+from datetime import datetime
+
+from clock import VirtualClock
+from engine import Job, RULE
+import recurrence
+
+START = datetime(2020, 1, 6, 8, 0)  # 周一
+
+
+def test_virtual_clock_advances_only_on_request():
+    clock = VirtualClock(START)
+    assert clock.now() == START and clock.monotonic() == 0.0
+    clock.sleep(1.5)
+    clock.advance_to(datetime(2020, 1, 6, 8, 1))
+    assert clock.now() == datetime(2020, 1, 6, 8, 1)
+    assert clock.monotonic() == 60.0
+
+
+def test_rule_preview_uses_clock():
+    clock = VirtualClock(START)
+    rule = recurrence.compile_rule("0 9 * * 1-5")
+    assert rule.preview(2, clock=clock) == [datetime(2020, 1, 6, 9), datetime(2020, 1, 7, 9)]
+    rrule = recurrence.compile_rule("FREQ=DAILY;BYHOUR=7;BYMINUTE=30", clock=clock)
+    assert rrule.preview(1, clock=clock) == [datetime(2020, 1, 7, 7, 30)]
+
+
+def test_job_preview_uses_clock():
+    clock = VirtualClock(START)
+    job = Job("群A", "hi", RULE, scheduled_time=START, rule="30 8 * * *")
+    assert job.preview(1, clock=clock) == [datetime(2020, 1, 6, 8, 30)]
+
+
+def test_core_uses_clock(tmp_path):
+    from core import SchedulerCore
+    from input_backend import SimulatedBackend
+
+    clock = VirtualClock(START)
+    core = SchedulerCore(SimulatedBackend(sleep_scale=0), on_log=lambda lines: None, clock=clock)
+    try:
+        assert core.preview_fires("0 9 * * *", 1) == [datetime(2020, 1, 6, 9)]
+        path = tmp_path / "jobs.csv"
+        # 按真实时间已过去，按虚拟时间仍在将来
+        path.write_text("target,content,time\n群A,hi,2020-01-06 08:30:00\n", encoding="utf-8")
+        task = core.import_jobs(str(path), dry_run=True)
+        task.join()
+        assert task.error is None
+        assert [job.next_fire for job in task.result.jobs] == [datetime(2020, 1, 6, 8, 30)]
+    finally:
+        core.shutdown()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 12:25:14
+project: auto_send
+filename: test_clock_monitor.py
+version: 1.0
+"""
+
+"""时钟跳变: 监视器区分跳变与挂起，调度引擎和精确发送线程按新的墙上时间重新规划"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from clock import ClockMonitor, VirtualClock, JUMP, STALL
+from engine import Job, JobEngine, WEEKLY, MISFIRE_GRACE, MISFIRE_SKIP
+from fire import FireEngine
+
+START = datetime(2030, 1, 7, 9, 0)
+
+
+class Clocks:
+    """分别推进的墙上时间和单调时钟"""
+
+    def __init__(self):
+        self.wall = START
+        self.mono = 100.0
+
+    def tick(self, mono, wall=None):
+        self.mono += mono
+        self.wall += timedelta(seconds=mono if wall is None else wall)
+
+
+@pytest.fixture
+def monitored():
+    clocks = Clocks()
+    jumps = []
+    monitor = ClockMonitor(
+        lambda *args: jumps.append(args),
+        interval=1.0,
+        threshold=0.5,
+        now=lambda: clocks.wall,
+        monotonic=lambda: clocks.mono,
+    )
+    monitor._last = (clocks.wall, clocks.mono)  # 与 start() 相同的初始采样，不启动线程
+    return monitor, clocks, jumps
+
+
+def test_steady_clock_is_quiet(monitored):
+    monitor, clocks, jumps = monitored
+    for _ in range(5):
+        clocks.tick(1.0, 1.2)  # 允许范围内的走时偏差
+        assert monitor.check() is None
+    assert not jumps and monitor.jumps == 0
+
+
+@pytest.mark.parametrize("offset", [3600.0, -90.0])
+def test_wall_jump(monitored, offset):
+    monitor, clocks, jumps = monitored
+    clocks.tick(1.0, 1.0 + offset)
+    kind, measured = monitor.check()
+    assert kind == JUMP and measured == pytest.approx(offset)
+    assert jumps == [(JUMP, pytest.approx(offset), 1.0)]
+
+
+def test_stall(monitored):
+    monitor, clocks, jumps = monitored
+    clocks.tick(30.0)  # 两个时钟一起前进了 30 秒: 进程被整体挂起
+    kind, offset = monitor.check()
+    assert kind == STALL and offset == 0
+    assert jumps[0][2] == 30.0
+
+
+def test_handler_error_is_contained(monitored):
+    monitor, clocks, _ = monitored
+
+    def fail(*args):
+        raise RuntimeError("boom")
+
+    monitor.on_jump = fail
+    clocks.tick(1.0, 100.0)
+    assert monitor.check()[0] == JUMP
+    assert monitor.jumps == 1
+
+
+def _engine(clock, fired):
+    return JobEngine(lambda job, fire_time: fired.append((job.job_id, fire_time)), lambda job: 10.0, clock=clock)
+
+
+def test_engine_replan_after_forward_jump():
+    clock = VirtualClock(START)
+    fired = []
+    engine = _engine(clock, fired)
+    engine.add_jobs([
+        Job("群A", "a", scheduled_time=START + timedelta(minutes=5), job_id="once"),
+        Job("群B", "b", WEEKLY, days=[0], send_time=(START + timedelta(minutes=20)).time(), job_id="weekly"),
+    ])
+    clock._now += timedelta(minutes=10)  # 墙上时间前跳，单调时钟不动
+    missed = engine.replan(MISFIRE_GRACE, grace=600)
+    assert [(job.job_id, catch_up) for job, _, catch_up in missed] == [("once", True)]
+    engine.dispatch_due()
+    assert fired == [("once", START + timedelta(minutes=5))]
+    assert engine.get_job("weekly").next_fire == START + timedelta(minutes=20)
+
+
+def test_engine_replan_skip_moves_recurring_job_on():
+    clock = VirtualClock(START)
+    fired = []
+    engine = _engine(clock, fired)
+    engine.add_jobs([Job("群B", "b", WEEKLY, days=[0], send_time=START.time(), job_id="w")], now=START - timedelta(hours=1))
+    clock._now += timedelta(minutes=1)
+    missed = engine.replan(MISFIRE_SKIP)
+    assert [(job.job_id, fire, catch_up) for job, fire, catch_up in missed] == [("w", START, False)]
+    assert engine.get_job("w").next_fire == START + timedelta(days=7)
+    assert engine.dispatch_due()[0] == 0
+
+
+def test_fire_engine_replan_shifts_deadlines():
+    clock = VirtualClock(START)
+    engine = FireEngine(clock=clock)
+    try:
+        handle = engine.schedule(START + timedelta(hours=1), lambda error_ns: None, label="a")
+        before = handle.deadline_ns
+        clock._now += timedelta(minutes=30)  # 墙上时间前跳 30 分钟
+        assert engine.replan() == 1
+        assert handle.deadline_ns - before == pytest.approx(-1800e9, abs=1e8)
+    finally:
+        engine.cancel_all()
+        engine.stop()
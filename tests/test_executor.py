@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 10:38:12
+project: auto_send
+filename: test_executor.py
+version: 1.0
+"""
+
+"""有界执行器: 常驻工作线程、输入通道串行、按优先级执行、取消与统计"""
+import threading
+
+import pytest
+
+from executor import Executor, INPUT_LANE, POOL_LANE
+
+
+@pytest.fixture
+def executor():
+    executor = Executor(pool_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def _block(executor, lane=INPUT_LANE):
+    """占住通道的唯一(或第一个)工作线程，返回放行用的 Event"""
+    gate = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        gate.wait(5)
+
+    executor.submit(lane, hold, label="hold")
+    assert started.wait(5)
+    return gate
+
+
+def test_workers_start_on_first_submit_and_persist(executor):
+    lane = executor.lanes[POOL_LANE]
+    assert not lane._threads
+    names = {executor.call(POOL_LANE, lambda: threading.current_thread().name) for _ in range(20)}
+    assert names <= {"pool-0", "pool-1"}
+    assert len(lane._threads) == 2
+
+
+def test_input_lane_runs_by_priority(executor):
+    gate = _block(executor)
+    order = []
+    for priority in (3, 1, 2):
+        executor.submit(INPUT_LANE, order.append, (priority,), priority=priority)
+    assert executor.lanes[INPUT_LANE].depth() == 3
+    gate.set()
+    last = executor.submit(INPUT_LANE, lambda: None, priority=99)
+    assert last.join(5)
+    assert order == [1, 2, 3]
+
+
+def test_input_lane_is_serial(executor):
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active.append(1)
+            overlaps.append(len(active))
+        threading.Event().wait(0.01)
+        with lock:
+            active.pop()
+
+    tasks = [executor.submit(INPUT_LANE, work) for _ in range(5)]
+    assert all(task.join(5) for task in tasks)
+    assert max(overlaps) == 1
+
+
+def test_call_inline_on_own_lane(executor):
+    def outer():
+        # 已在输入通道中，嵌套 call 直接执行而不是排队等待自己
+        return executor.call(INPUT_LANE, lambda: executor.in_lane(INPUT_LANE))
+
+    assert executor.call(INPUT_LANE, outer) is True
+    assert not executor.in_lane(INPUT_LANE)
+
+
+def test_call_reraises_errors(executor):
+    def fail():
+        raise KeyError("x")
+
+    with pytest.raises(KeyError):
+        executor.call(POOL_LANE, fail)
+    assert executor.lanes[POOL_LANE].stats()["failed"] == 1
+
+
+def test_cancel_queued_task(executor):
+    gate = _block(executor)
+    ran = []
+    task = executor.submit(INPUT_LANE, ran.append, (1,))
+    assert task.cancel()
+    gate.set()
+    assert task.join(5)
+    assert not ran and task.cancelled
+    assert executor.lanes[INPUT_LANE].stats()["cancelled"] == 1
+
+
+def test_shutdown_cancels_pending(executor):
+    gate = _block(executor)
+    task = executor.submit(INPUT_LANE, lambda: None)
+    executor.shutdown()
+    assert task.join(1) and task.cancelled
+    gate.set()
+    late = executor.submit(INPUT_LANE, lambda: None)
+    assert late.done and late.cancelled
+
+
+def test_stats(executor):
+    gate = _block(executor)
+    executor.submit(INPUT_LANE, lambda: None)
+    stats = executor.stats()[INPUT_LANE]
+    assert stats["busy"] == 1 and stats["depth"] == 1 and stats["max_depth"] >= 1
+    gate.set()
+    executor.call(INPUT_LANE, lambda: None)
+    stats = executor.stats()[INPUT_LANE]
+    assert stats["completed"] == 3 and stats["busy"] == 0
+    assert stats["wait"]["count"] == 3
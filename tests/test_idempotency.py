@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 23:08:40
+project: auto_send
+filename: test_idempotency.py
+version: 1.0
+"""
+
+"""至多发送一次: 同一任务、同一发送时间、同一目标的幂等键只发送一次"""
+from datetime import datetime, timedelta
+
+import wechat_ops
+from audit import AuditLog
+from engine import Job
+
+
+def _sends(backend, core):
+    return len(backend.events_of("press", core.shortcuts["send_message"]))
+
+
+def test_same_key_is_sent_once(make_core, backend):
+    core = make_core()
+    fire_time = datetime(2026, 11, 2, 9, 0)
+    first = core.latency.new_cycle("群A", "job1", "hi", fire_time)
+    second = core.latency.new_cycle("群A", "job1", "hi", fire_time)
+    assert first.key == second.key
+
+    assert core.message_send(cycle=first)
+    assert core.message_send(cycle=second)
+    assert second.outcome == "duplicate"
+    assert _sends(backend, core) == 1
+
+
+def test_other_fire_time_or_target_is_sent(make_core, backend):
+    core = make_core()
+    fire_time = datetime(2026, 11, 2, 9, 0)
+    core.message_send(cycle=core.latency.new_cycle("群A", "job1", "hi", fire_time))
+    core.message_send(cycle=core.latency.new_cycle("群B", "job1", "hi", fire_time))
+    later = fire_time + timedelta(days=7)
+    core.message_send(cycle=core.latency.new_cycle("群A", "job1", "hi", later))
+    assert _sends(backend, core) == 3
+
+
+def test_sent_keys_survive_restart_through_audit_log(make_core, tmp_path):
+    from input_backend import SimulatedBackend
+
+    path = str(tmp_path / "audit.log")
+    fire_time = datetime(2026, 11, 2, 9, 0)
+    core = make_core()
+    core.attach_audit(AuditLog(path))
+    core.message_send(cycle=core.latency.new_cycle("群A", "job1", "hi", fire_time))
+    core.shutdown()  # 等待发送记录写完
+
+    backend = SimulatedBackend(sleep_scale=0)
+    restarted = make_core(backend_=backend)
+    restarted.attach_audit(AuditLog(path))
+    cycle = restarted.latency.new_cycle("群A", "job1", "hi", fire_time)
+    restarted.message_send(cycle=cycle)
+    assert cycle.outcome == "duplicate"
+    assert _sends(backend, restarted) == 0
+
+
+def test_send_error_after_delivery_is_not_retried(make_core, backend, monkeypatch):
+    def send_then_fail(shortcuts, backend=None):
+        backend.press(shortcuts["send_message"])
+        raise RuntimeError("按键后出错")
+
+    monkeypatch.setattr(wechat_ops, "send_message", send_then_fail)
+    monkeypatch.setattr(wechat_ops, "input_box_empty", lambda delays, backend=None: True)
+    core = make_core()
+    cycle = core.latency.new_cycle("群A", "job1", "hi", datetime(2026, 11, 2, 9, 0))
+    assert core.message_send(cycle=cycle)
+    assert cycle.outcome == "sent"
+    assert _sends(backend, core) == 1
+
+
+def test_unknown_send_is_not_retried_or_repeated(make_core, backend, monkeypatch):
+    def fail(shortcuts, backend=None):
+        raise RuntimeError("按键失败")
+
+    monkeypatch.setattr(wechat_ops, "send_message", fail)
+    monkeypatch.setattr(wechat_ops, "input_box_empty", lambda delays, backend=None: None)
+    core = make_core()
+    fire_time = datetime(2026, 11, 2, 9, 0)
+    cycle = core.latency.new_cycle("群A", "job1", "hi", fire_time)
+    assert not core.message_send(cycle=cycle)
+    assert cycle.outcome == "send_unknown"
+    again = core.latency.new_cycle("群A", "job1", "hi", fire_time)
+    core.message_send(cycle=again)
+    assert again.outcome == "duplicate"
+
+
+def test_scheduled_broadcast_targets_are_sent_once(make_core, backend):
+    core = make_core()
+    core.is_running = True
+    job = Job(["群A", "群B", "群C"], "hi", job_id="bc1")
+    fire_time = datetime.now() - timedelta(seconds=1)
+    core._schedule_broadcast(fire_time, job)
+    core._schedule_broadcast(fire_time, job)
+    assert _sends(backend, core) == 3
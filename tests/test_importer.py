@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 23:40:18
+project: auto_send
+filename: test_importer.py
+version: 1.0
+"""
+
+"""批量导入: 逐行校验，有效任务与全部错误行(带行号)一起报告"""
+import csv
+from datetime import datetime, time
+
+import pytest
+
+import importer
+from engine import MONTHLY, ONCE, RULE, WEEKLY
+
+NOW = datetime(2026, 11, 2, 8, 0)
+
+
+def _write(tmp_path, rows, header=("目标", "内容", "类型", "发送时间", "日期", "每天发送时间", "规则")):
+    path = tmp_path / "jobs.csv"
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+VALID = [
+    ["群A", "早上好", "", "2026-11-03 09:30:00", "", "", ""],
+    ["群B；群C", "周报", "每周", "", "0,4", "08:00", ""],
+    ["群D", "月报", "monthly", "", "15,-1", "08:00:00", ""],
+    ["群E", "提醒", "", "", "", "", "0 9 * * 1-5"],
+]
+
+
+def test_valid_rows(tmp_path):
+    result = importer.load_file(_write(tmp_path, VALID), NOW)
+    assert result.ok and result.rows == 4
+    once, weekly, monthly, rule = result.jobs
+    assert (once.kind, once.next_fire) == (ONCE, datetime(2026, 11, 3, 9, 30))
+    assert (weekly.kind, weekly.targets, weekly.days) == (WEEKLY, ["群B", "群C"], [0, 4])
+    assert weekly.send_time == time(8, 0)
+    assert (monthly.kind, monthly.days) == (MONTHLY, [-1, 15])
+    assert (rule.kind, rule.next_fire) == (RULE, datetime(2026, 11, 2, 9, 0))
+
+
+def test_all_errors_are_reported_with_row_numbers(tmp_path):
+    rows = VALID + [
+        ["", "x", "", "2026-11-03 09:00", "", "", ""],
+        ["群F", "", "", "2026-11-03 09:00", "", "", ""],
+        ["群F", "x", "", "2020-01-01 09:00", "", "", ""],
+        ["群F", "x", "每周", "", "9", "08:00", ""],
+        ["群F", "x", "", "", "", "", "61 * * * *"],
+        ["群F", "x", "bogus", "", "", "", ""],
+        ["群F", "x", "", "不是时间", "", "", ""],
+        ["群F", "x", "每月", "", "1", "", ""],
+    ]
+    result = importer.load_file(_write(tmp_path, rows), NOW)
+    assert len(result.jobs) == 4
+    # 表头是第 1 行，错误从第 6 行开始
+    assert [number for number, _ in result.errors] == list(range(6, 14))
+    messages = dict(result.errors)
+    assert "目标为空" in messages[6]
+    assert "内容为空" in messages[7]
+    assert "已过" in messages[8]
+    assert "日期无效" in messages[9]
+    assert "未知的任务类型" in messages[11]
+
+
+def test_blank_rows_are_skipped(tmp_path):
+    result = importer.load_file(_write(tmp_path, [VALID[0], ["", "", "", "", "", "", ""], VALID[1]]), NOW)
+    assert result.ok and result.rows == 2 and len(result.jobs) == 2
+
+
+def test_rows_checked_against_given_now(tmp_path):
+    path = _write(tmp_path, [VALID[0], VALID[3]] * 3)
+    later = importer.load_file(path, datetime(2026, 11, 3, 10, 0))
+    # 一次性任务的发送时间相对传入的 now 已过，规则任务从 now 之后算起
+    assert [number for number, _ in later.errors] == [2, 4, 6]
+    assert {job.next_fire for job in later.jobs} == {datetime(2026, 11, 4, 9, 0)}
+
+
+def test_english_header(tmp_path):
+    path = _write(tmp_path, [["群A", "hi", "once", "2026-11-03 09:30:00"]], ("target", "content", "kind", "time"))
+    assert len(importer.load_file(path, NOW).jobs) == 1
+
+
+def test_missing_required_column(tmp_path):
+    path = _write(tmp_path, [["群A", "2026-11-03 09:30:00"]], ("目标", "发送时间"))
+    with pytest.raises(importer.RowError):
+        importer.load_file(path, NOW)
+
+
+def test_core_import_adds_valid_jobs_only(make_core, tmp_path):
+    core = make_core()
+    rows = [["群A", "hi", "", "2099-01-01 09:00:00", "", "", ""], ["", "hi", "", "2099-01-01", "", "", ""]]
+    task = core.import_jobs(_write(tmp_path, rows))
+    task.join()
+    assert task.error is None and not task.result.ok
+    assert [job.target for job in core.list_jobs()] == ["群A"]
+
+
+def test_core_dry_run_adds_nothing(make_core, tmp_path):
+    core = make_core()
+    task = core.import_jobs(_write(tmp_path, [["群A", "hi", "", "2099-01-01 09:00:00", "", "", ""]]), dry_run=True)
+    task.join()
+    assert len(task.result.jobs) == 1
+    assert core.list_jobs() == []
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 11:10:44
+project: auto_send
+filename: test_lead.py
+version: 1.0
+"""
+
+"""自动提前量: 分位数、余量与触发误差、样本不足时的退回范围、重新布防的判断及其只移动准备时刻"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from clock import VirtualClock
+from engine import Job, JobEngine, WEEKLY, MISFIRE_FIRE_NOW
+from lead import LeadTuner, size_bucket, _percentile
+
+SHORT = "早上好"
+LONG = "x" * 300
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 21))
+    assert _percentile(values, 50) == 10
+    assert _percentile(values, 95) == 19
+    assert _percentile(values, 100) == 20
+    assert _percentile(list(range(1, 11)), 95) == 10
+    assert _percentile([3.0], 95) == 3.0
+    assert _percentile([5, 1, 3], 0) == 1
+
+
+def test_size_bucket():
+    lengths = (0, 15, 16, 63, 64, 255, 256, 1023, 1024, 100000)
+    assert [size_bucket("x" * n) for n in lengths] == [0, 0, 1, 1, 2, 2, 3, 3, 4, 4]
+
+
+def test_lead_from_percentile_and_margins():
+    tuner = LeadTuner(min_samples=5, percentile=95, margin_ratio=0.2, margin_seconds=0.5)
+    for seconds in (1.0, 1.0, 1.0, 1.0, 2.0):
+        tuner.record_prepare("群A", SHORT, seconds)
+    assert tuner.estimate_prepare("群A", SHORT) == 2.0
+    assert tuner.lead("群A", SHORT) == pytest.approx(2.0 * 1.2 + 0.5)
+    tuner.record_fire_error(0.3)
+    assert tuner.lead("群A", SHORT) == pytest.approx(2.0 * 1.2 + 0.5 + 0.3)
+
+
+def test_early_fires_do_not_shorten_lead():
+    tuner = LeadTuner(min_samples=1, margin_ratio=0, margin_seconds=0)
+    tuner.record_prepare("群A", SHORT, 1.0)
+    tuner.record_fire_error(-0.5)
+    assert tuner.lead("群A", SHORT) == 1.0
+
+
+def test_not_enough_samples():
+    tuner = LeadTuner(min_samples=5)
+    for _ in range(4):
+        tuner.record_prepare("群A", SHORT, 1.0)
+    assert tuner.lead("群A", SHORT) is None
+    assert tuner.estimate_prepare("群A", SHORT) is None
+
+
+def test_falls_back_to_wider_scopes():
+    tuner = LeadTuner(min_samples=3, margin_ratio=0, margin_seconds=0)
+    for _ in range(3):
+        tuner.record_prepare("群A", SHORT, 1.0)
+    tuner.record_prepare("群B", SHORT, 4.0)
+    # 群B 样本不足，退回到同长度的所有目标
+    assert tuner.estimate_prepare("群B", SHORT) == 4.0
+    tuner.record_prepare("群C", LONG, 9.0)
+    # 群C 和长内容都不足，全部记录里已有 5 次
+    assert tuner.estimate_prepare("群C", LONG) == 9.0
+    assert tuner.estimate_prepare("群A", SHORT) == 1.0
+
+
+def test_window_drops_old_samples():
+    tuner = LeadTuner(window=5, min_samples=5)
+    for _ in range(5):
+        tuner.record_prepare("群A", SHORT, 10.0)
+    for _ in range(5):
+        tuner.record_prepare("群A", SHORT, 1.0)
+    assert tuner.estimate_prepare("群A", SHORT) == 1.0
+
+
+def test_rearm_only_on_significant_change():
+    tuner = LeadTuner(min_samples=2, margin_ratio=0, margin_seconds=0)
+    assert tuner.record_prepare("群A", SHORT, 1.0) is False  # 样本不足
+    assert tuner.record_prepare("群A", SHORT, 1.0) is True  # 首次得到提前量
+    assert tuner.record_prepare("群A", SHORT, 1.05) is False  # 变化不超过 10%
+    assert tuner.record_prepare("群A", SHORT, 2.0) is True
+
+
+def test_stats_and_reset():
+    tuner = LeadTuner(min_samples=1)
+    tuner.record_prepare("群A", SHORT, 1.0)
+    tuner.record_fire_error(0.01)
+    stats = tuner.stats()
+    assert stats["scopes"]["群A/0"]["count"] == 1
+    assert stats["scopes"]["*/*"]["max"] == 1.0
+    assert stats["fire_error"]["count"] == 1
+    tuner.reset()
+    assert tuner.lead("群A", SHORT) is None
+    assert tuner.stats()["scopes"] == {}
+
+
+def test_rearm_shifts_prepare_times_only():
+    now = datetime(2030, 1, 7, 9, 0)  # 周一
+    clock = VirtualClock(now)
+    leads = {"missed": 10.0, "later": 10.0}
+    fired = []
+    engine = JobEngine(lambda job, fire_time: fired.append((job.job_id, fire_time)), lambda job: leads[job.job_id], clock=clock)
+    missed = Job("群A", "a", WEEKLY, days=[0], send_time=(now - timedelta(minutes=1)).time(), job_id="missed")
+    missed.next_fire = now - timedelta(minutes=1)  # 重启前错过、尚未补发的发送
+    later = Job("群B", "b", scheduled_time=now + timedelta(minutes=5), job_id="later")
+    later.next_fire = later.scheduled_time
+    engine.load_jobs([missed, later], MISFIRE_FIRE_NOW)
+
+    leads["later"] = 120.0
+    engine.rearm_all()  # 自动提前量变化
+    assert engine.get_job("missed").next_fire == now - timedelta(minutes=1)
+    count, wait = engine.dispatch_due()
+    assert fired == [("missed", now - timedelta(minutes=1))]
+    assert wait == 300 - 120
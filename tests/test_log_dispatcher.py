@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 10:20:47
+project: auto_send
+filename: test_log_dispatcher.py
+version: 1.0
+"""
+
+"""日志分发器: 按写入顺序分批投递，队列满时的三种策略，投递出错不影响后续日志"""
+import threading
+
+import pytest
+
+from conftest import wait_for
+from utils import LogDispatcher, DROP_OLDEST, DROP_NEWEST, BLOCK
+
+
+class Sink:
+    """第一批投递时阻塞，直到 release()，便于在分发线程忙时填满队列"""
+
+    def __init__(self, fail_first=False):
+        self.batches = []
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.fail_first = fail_first
+
+    def __call__(self, lines):
+        if not self.entered.is_set():
+            self.entered.set()
+            self.gate.wait(5)
+            if self.fail_first:
+                raise RuntimeError("界面已关闭")
+        self.batches.append(list(lines))
+
+    @property
+    def lines(self):
+        return [line for batch in self.batches for line in batch]
+
+    def release(self):
+        self.gate.set()
+
+
+def _stalled(policy, capacity=3):
+    sink = Sink()
+    dispatcher = LogDispatcher(sink, capacity=capacity, policy=policy)
+    dispatcher.put("first")
+    assert sink.entered.wait(5)  # 分发线程正在投递 first，其后的行留在队列中
+    return sink, dispatcher
+
+
+def test_lines_delivered_in_order_and_batched():
+    sink, dispatcher = _stalled(DROP_OLDEST, capacity=100)
+    for i in range(10):
+        dispatcher.put(i)
+    sink.release()
+    dispatcher.close()
+    assert sink.lines == ["first"] + list(range(10))
+    assert len(sink.batches) == 2  # 排队的 10 行合为一批
+    stats = dispatcher.stats()
+    assert stats["delivered"] == stats["queued"] == 11 and stats["dropped"] == 0
+
+
+def test_max_batch_splits_batches():
+    sink, dispatcher = _stalled(DROP_OLDEST, capacity=100)
+    dispatcher.max_batch = 4
+    for i in range(10):
+        dispatcher.put(i)
+    sink.release()
+    dispatcher.close()
+    assert [len(batch) for batch in sink.batches] == [1, 4, 4, 2]
+
+
+def test_drop_oldest_keeps_newest_lines():
+    sink, dispatcher = _stalled(DROP_OLDEST)
+    assert all(dispatcher.put(i) for i in range(5))
+    assert dispatcher.depth() == 3
+    sink.release()
+    dispatcher.close()
+    assert sink.lines == ["first", 2, 3, 4]
+    assert dispatcher.stats()["dropped"] == 2
+
+
+def test_drop_newest_rejects_new_lines():
+    sink, dispatcher = _stalled(DROP_NEWEST)
+    assert [dispatcher.put(i) for i in range(5)] == [True, True, True, False, False]
+    sink.release()
+    dispatcher.close()
+    assert sink.lines == ["first", 0, 1, 2]
+    assert dispatcher.stats()["dropped"] == 2
+
+
+def test_block_waits_for_room():
+    sink, dispatcher = _stalled(BLOCK)
+    for i in range(3):
+        dispatcher.put(i)
+    writer = threading.Thread(target=dispatcher.put, args=(3,))
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive()  # 队列已满，写入方被阻塞
+    sink.release()
+    writer.join(5)
+    assert not writer.is_alive()
+    dispatcher.close()
+    assert sink.lines == ["first", 0, 1, 2, 3]
+    assert dispatcher.stats()["dropped"] == 0
+
+
+def test_failed_delivery_does_not_stop_dispatcher():
+    sink = Sink(fail_first=True)
+    dispatcher = LogDispatcher(sink)
+    dispatcher.put("lost")
+    assert sink.entered.wait(5)
+    sink.release()
+    dispatcher.put("next")
+    assert wait_for(lambda: sink.lines == ["next"])
+    dispatcher.close()
+
+
+def test_put_after_close_is_rejected():
+    dispatcher = LogDispatcher(lambda lines: None)
+    dispatcher.close()
+    assert dispatcher.put("late") is False
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        LogDispatcher(lambda lines: None, policy="spill")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 11:48:52
+project: auto_send
+filename: test_metrics.py
+version: 1.0
+"""
+
+"""发送指标: 分片计数器、累计桶换算、Prometheus 文本格式和本机 HTTP 端点"""
+import re
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import Counter, MetricsServer, _buckets, render
+from tracing import Histogram
+
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z]+="[^"]*"\})? -?[0-9.e+-]+$')
+
+
+def test_counter_sums_thread_cells():
+    counter = Counter()
+
+    def work():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counter.inc(5)
+    assert counter.value() == 4005
+
+
+def test_buckets_are_cumulative():
+    hist = Histogram()
+    for micros in (50_000, 200_000, 200_000, 3_000_000, 60_000_000):
+        hist.record(micros)
+    cumulative, total = _buckets(hist, (0.1, 0.25, 1.0, 5.0))
+    assert cumulative == [(0.1, 1), (0.25, 3), (1.0, 3), (5.0, 4)]
+    assert total == 5
+
+
+def _parse(text):
+    """{(指标名, 标签): 值}，同时检查每一行的格式"""
+    samples = {}
+    helped = set()
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            helped.add(line.split()[2])
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name in helped and kind in ("counter", "gauge", "histogram")
+            continue
+        assert SAMPLE.match(line), line
+        key, value = line.rsplit(" ", 1)
+        name, _, labels = key.partition("{")
+        samples[(name, labels.rstrip("}"))] = float(value)
+    return samples
+
+
+def test_render_exposition_format(make_core):
+    core = make_core()
+    core.metrics.attempted.inc(3)
+    core.metrics.succeeded.inc(2)
+    core.metrics.failed.inc()
+    core.metrics.retries["send"].inc()
+    core.metrics.prepare.record(300_000)
+    core.metrics.prepare.record(40_000_000)
+    text = render(core)
+    assert text.endswith("\n")
+    samples = _parse(text)
+    assert samples[("auto_send_sends_attempted_total", "")] == 3
+    assert samples[("auto_send_sends_succeeded_total", "")] == 2
+    assert samples[("auto_send_sends_failed_total", "")] == 1
+    assert samples[("auto_send_retries_total", 'stage="send"')] == 1
+    assert samples[("auto_send_retries_total", 'stage="prepare"')] == 0
+    buckets = [
+        value for (name, _), value in samples.items() if name == "auto_send_prepare_seconds_bucket"
+    ]
+    assert buckets == sorted(buckets)  # 累计桶单调不减
+    assert samples[("auto_send_prepare_seconds_bucket", 'le="0.5"')] == 1
+    assert samples[("auto_send_prepare_seconds_bucket", 'le="+Inf"')] == 2
+    assert samples[("auto_send_prepare_seconds_count", "")] == 2
+    assert samples[("auto_send_prepare_seconds_sum", "")] == pytest.approx(40.3, rel=0.01)
+    assert samples[("auto_send_fire_error_seconds_count", "")] == 0
+    assert samples[("auto_send_threads", "")] >= 1
+
+
+def test_server_serves_metrics_on_localhost(make_core):
+    core = make_core()
+    server = MetricsServer(core, 0).start()
+    try:
+        assert server._httpd.server_address[0] == "127.0.0.1"
+        url = f"http://127.0.0.1:{server.port}"
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))  # 不经由环境中的代理
+        with opener.open(url + "/metrics", timeout=5) as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = response.read().decode("utf-8")
+        assert "# TYPE auto_send_sends_attempted_total counter" in body
+        with pytest.raises(urllib.error.HTTPError) as error:
+            opener.open(url + "/other", timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.stop()
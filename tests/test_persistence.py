@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 23:16:05
+project: auto_send
+filename: test_persistence.py
+version: 1.0
+"""
+
+"""任务持久化: 重启后恢复任务，分发后、发送结束前停机不丢失发送"""
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from clock import VirtualClock
+from engine import Job, JobEngine, MISFIRE_FIRE_NOW, MISFIRE_SKIP, WEEKLY
+from job_store import JobStore
+
+MONDAY_9 = datetime(2026, 11, 2, 9, 0)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def _engine(store, clock, fired):
+    return JobEngine(lambda job, fire_time: fired.append((job, fire_time)), lambda job: 5.0,
+                     store=store, clock=clock)
+
+
+def _stored(path):
+    store = JobStore(path)
+    try:
+        return {job.job_id: job.next_fire for job in store.load()}
+    finally:
+        store.close()
+
+
+def _jobs():
+    return [
+        Job("群A", "hi", scheduled_time=MONDAY_9, job_id="once"),
+        Job("群B", "hi", WEEKLY, days=[0], send_time=time(9, 0), job_id="weekly"),
+    ]
+
+
+def test_jobs_are_restored_after_restart(db):
+    clock = VirtualClock(MONDAY_9 - timedelta(hours=1))
+    store = JobStore(db)
+    _engine(store, clock, []).add_jobs(_jobs())
+    store.close()
+
+    store = JobStore(db)
+    engine = _engine(store, clock, [])
+    missed = engine.load_jobs(store.load())
+    assert missed == []
+    assert {job.job_id: job.next_fire for job in engine.jobs()} == {
+        "once": MONDAY_9,
+        "weekly": MONDAY_9,
+    }
+    store.close()
+
+
+def test_dispatched_send_is_kept_until_it_finishes(db):
+    clock = VirtualClock(MONDAY_9 - timedelta(seconds=2))  # 已进入 5 秒的提前量
+    fired = []
+    store = JobStore(db)
+    engine = _engine(store, clock, fired)
+    engine.add_jobs(_jobs())
+    assert engine.dispatch_due()[0] == 2
+
+    # 发送结束前任务库不变
+    assert _stored(db) == {"once": MONDAY_9, "weekly": MONDAY_9}
+
+    for job, fire_time in fired:
+        engine.fire_done(job, fire_time)
+    assert _stored(db) == {"weekly": MONDAY_9 + timedelta(days=7)}
+    store.close()
+
+
+def test_shutdown_inside_lead_window_is_recovered_as_missed(db):
+    clock = VirtualClock(MONDAY_9 - timedelta(seconds=2))
+    store = JobStore(db)
+    engine = _engine(store, clock, [])
+    engine.add_jobs(_jobs())
+    engine.dispatch_due()
+    store.close()  # 停机，分发出去的发送没有结束
+
+    clock.advance(60)
+    store = JobStore(db)
+    fired = []
+    restarted = _engine(store, clock, fired)
+    missed = restarted.load_jobs(store.load(), MISFIRE_FIRE_NOW)
+    assert sorted((job.job_id, fire_time, catch_up) for job, fire_time, catch_up in missed) == [
+        ("once", MONDAY_9, True),
+        ("weekly", MONDAY_9, True),
+    ]
+    restarted.dispatch_due()
+    assert sorted((job.job_id, fire_time) for job, fire_time in fired) == [
+        ("once", MONDAY_9),
+        ("weekly", MONDAY_9),
+    ]
+    store.close()
+
+
+def test_skip_policy_moves_recurring_job_to_next_fire(db):
+    clock = VirtualClock(MONDAY_9 - timedelta(hours=1))
+    store = JobStore(db)
+    _engine(store, clock, []).add_jobs(_jobs())
+    store.close()
+
+    clock.advance_to(MONDAY_9 + timedelta(hours=1))
+    store = JobStore(db)
+    engine = _engine(store, clock, [])
+    missed = engine.load_jobs(store.load(), MISFIRE_SKIP)
+    assert {job.job_id for job, _, catch_up in missed if not catch_up} == {"once", "weekly"}
+    assert {job.job_id: job.next_fire for job in engine.jobs()} == {
+        "weekly": MONDAY_9 + timedelta(days=7)
+    }
+    assert _stored(db) == {"weekly": MONDAY_9 + timedelta(days=7)}
+    store.close()
+
+
+def test_cancel_while_in_flight_is_not_restored(db):
+    clock = VirtualClock(MONDAY_9 - timedelta(seconds=2))
+    fired = []
+    store = JobStore(db)
+    engine = _engine(store, clock, fired)
+    engine.add_jobs(_jobs())
+    engine.dispatch_due()
+    assert engine.cancel_job("weekly")
+    assert "weekly" not in _stored(db)
+
+    for job, fire_time in fired:
+        engine.fire_done(job, fire_time)
+    assert _stored(db) == {}
+    store.close()
+
+
+def test_core_restores_jobs_from_store(make_core, db):
+    from input_backend import SimulatedBackend
+
+    core = make_core(JobStore(db))
+    core.add_job(Job("群A", "hi", scheduled_time=datetime.now() + timedelta(hours=1), job_id="j1"))
+    core.shutdown()
+
+    restarted = make_core(JobStore(db), SimulatedBackend(sleep_scale=0))
+    assert restarted.load_jobs() == 1
+    assert [job.job_id for job in restarted.list_jobs()] == ["j1"]
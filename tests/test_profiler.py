@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 12:44:03
+project: auto_send
+filename: test_profiler.py
+version: 1.0
+"""
+
+"""发送周期采样分析: 折叠栈和 speedscope 文件、超时截断、空闲时采样线程退出"""
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+from conftest import wait_for
+from profiler import CycleProfiler
+from tracing import LatencyRecorder
+
+COLLAPSED_LINE = re.compile(r"^[^;]+(;[^;]+ \([^:()]+:\d+\))+ \d+$")
+
+
+def _busy_until(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def _profiled(tmp_path, **kwargs):
+    written = queue.Queue()
+    profiler = CycleProfiler(str(tmp_path), interval=0.001, on_written=written.put, **kwargs)
+    recorder = LatencyRecorder()
+    recorder.profiler = profiler
+    return profiler, recorder, written
+
+
+def test_cycle_writes_collapsed_and_speedscope(tmp_path):
+    profiler, recorder, written = _profiled(tmp_path)
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_until, args=(stop,), name="busy-worker")
+    cycle = recorder.new_cycle("群A", job_id="j1")
+    worker.start()
+    time.sleep(0.1)
+    stop.set()
+    worker.join()
+    cycle.close("sent")
+    collapsed, speedscope = written.get(timeout=5)
+    assert os.path.dirname(collapsed) == str(tmp_path)
+    assert collapsed.endswith(f"_{cycle.cycle_id}.collapsed")
+
+    with open(collapsed, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(COLLAPSED_LINE.match(line) for line in lines), lines[:3]
+    busy = [line for line in lines if line.startswith("busy-worker;") and "_busy_until (test_profiler.py:" in line]
+    assert busy
+    # 忙线程被采样的总时长与实际运行时间同一量级(微秒)
+    assert 20_000 < sum(int(line.rsplit(" ", 1)[1]) for line in busy) < 1_000_000
+    assert not any(line.startswith("cycle-profiler;") for line in lines)
+
+    with open(speedscope, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["name"] == "群A [j1] sent"
+    frames = data["shared"]["frames"]
+    profiles = {p["name"]: p for p in data["profiles"]}
+    assert "busy-worker" in profiles
+    for profile in profiles.values():
+        assert profile["type"] == "sampled" and profile["unit"] == "seconds"
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(0 <= i < len(frames) for sample in profile["samples"] for i in sample)
+    assert any(frame["name"] == "_busy_until" for frame in frames)
+
+    # 没有进行中的周期时采样线程退出
+    assert wait_for(lambda: profiler._thread is None)
+
+
+def test_unfinished_cycle_is_truncated(tmp_path):
+    profiler, recorder, written = _profiled(tmp_path, max_seconds=0.05)
+    cycle = recorder.new_cycle("群B")
+    _, speedscope = written.get(timeout=5)
+    with open(speedscope, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["name"] == "群B [-] truncated"
+    assert wait_for(lambda: profiler._thread is None)
+    cycle.close("cancelled")  # 截断后结束不会再次写出
+    time.sleep(0.05)
+    assert written.empty()
+
+
+def test_profiler_off_costs_nothing(tmp_path):
+    recorder = LatencyRecorder()
+    cycle = recorder.new_cycle("群C")
+    cycle.close("sent")
+    assert cycle.profiler is None
+    assert os.listdir(tmp_path) == []
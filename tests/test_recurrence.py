@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-18 23:31:47
+project: auto_send
+filename: test_recurrence.py
+version: 1.0
+"""
+
+"""循环规则: 位集求出的日期和下一次发送时间与逐日检查的结果一致"""
+import calendar
+import time as _time
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+import recurrence
+from recurrence import _bits, _lowest_from
+
+
+def _days(year, month, accept):
+    """逐日检查得到的日期位集"""
+    ndays = calendar.monthrange(year, month)[1]
+    return _bits(d for d in range(1, ndays + 1) if accept(date(year, month, d)))
+
+
+def _months(years=(2026, 2027, 2028)):
+    # 覆盖每月 1 日落在一周中每一天、各种月长和闰年二月
+    return [(year, month) for year in years for month in range(1, 13)]
+
+
+def test_lowest_from():
+    mask = _bits([3, 9, 17])
+    assert _lowest_from(mask, 0) == 3
+    assert _lowest_from(mask, 4) == 9
+    assert _lowest_from(mask, 17) == 17
+    assert _lowest_from(mask, 18) == -1
+
+
+@pytest.mark.parametrize("weekdays", [[0], [0, 4], [5, 6], list(range(7))])
+def test_weekly_day_mask(weekdays):
+    rule = recurrence.weekly(weekdays, time(9, 0))
+    for year, month in _months():
+        assert rule.day_mask(year, month) == _days(year, month, lambda d: d.weekday() in weekdays)
+
+
+def test_monthly_day_mask_with_month_end():
+    rule = recurrence.monthly([15, -1, 31], time(9, 0))
+    for year, month in _months():
+        last = calendar.monthrange(year, month)[1]
+        assert rule.day_mask(year, month) == _days(year, month, lambda d: d.day in (15, 31, last))
+
+
+@pytest.mark.parametrize(
+    "expression, accept",
+    [
+        ("0 9 * * 5L", lambda d: d.weekday() == 4 and (d + timedelta(days=7)).month != d.month),
+        ("0 9 * * 1#2", lambda d: d.weekday() == 0 and 8 <= d.day <= 14),
+        ("0 9 LW * *", lambda d: d == _last_weekday(d.year, d.month)),
+        ("0 9 1,15 * 1", lambda d: d.day in (1, 15) or d.weekday() == 0),  # cron: 日与周取并集
+    ],
+)
+def test_cron_day_mask(expression, accept):
+    rule = recurrence.compile_cron(expression)
+    for year, month in _months():
+        assert rule.day_mask(year, month) == _days(year, month, accept), (expression, year, month)
+
+
+def _last_weekday(year, month):
+    d = date(year, month, calendar.monthrange(year, month)[1])
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d
+
+
+def test_rrule_setpos_last_weekday():
+    rule = recurrence.compile_rrule(
+        "FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1;BYHOUR=17;BYMINUTE=0;BYSECOND=0",
+        datetime(2026, 1, 1),
+    )
+    for year, month in _months():
+        assert rule.day_mask(year, month) == _bits([_last_weekday(year, month).day])
+
+
+def _brute_next(accept, hour, minute, after):
+    """逐日找出严格晚于 after 的下一次发送时间"""
+    day = after.date()
+    for _ in range(9 * 366):
+        moment = datetime.combine(day, time(hour, minute))
+        if moment > after and accept(day):
+            return moment
+        day += timedelta(days=1)
+    return None
+
+
+@pytest.mark.parametrize(
+    "expression, accept",
+    [
+        ("30 8 * * 1-5", lambda d: d.weekday() < 5),
+        ("30 8 L * *", lambda d: (d + timedelta(days=1)).day == 1),
+        ("30 8 29 2 *", lambda d: d.month == 2 and d.day == 29),
+        ("30 8 * 3,9 6", lambda d: d.month in (3, 9) and d.weekday() == 5),  # cron 6 为周六
+    ],
+)
+def test_next_after_matches_day_by_day_search(expression, accept):
+    rule = recurrence.compile_cron(expression)
+    after = datetime(2026, 1, 1, 8, 30)
+    for _ in range(40):
+        expected = _brute_next(accept, 8, 30, after)
+        assert rule.next_after(after) == expected
+        after = expected + timedelta(seconds=1) if expected else after + timedelta(days=17)
+
+
+def test_impossible_rule_has_no_next_fire():
+    assert recurrence.compile_cron("0 0 30 2 *").next_after(datetime(2026, 1, 1)) is None
+
+
+def test_rrule_interval_and_until():
+    start = datetime(2026, 11, 2, 9, 0)  # 周一
+    rule = recurrence.compile_rrule("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO;UNTIL=20261201T000000", start)
+    assert rule.preview(5, start - timedelta(seconds=1)) == [
+        datetime(2026, 11, 2, 9, 0),
+        datetime(2026, 11, 16, 9, 0),
+        datetime(2026, 11, 30, 9, 0),
+    ]
+
+
+def test_default_rrule_start_is_not_cached():
+    first = recurrence.compile_rule("FREQ=DAILY;BYHOUR=9;BYMINUTE=0;BYSECOND=0")
+    _time.sleep(1.01)
+    second = recurrence.compile_rule("FREQ=DAILY;BYHOUR=9;BYMINUTE=0;BYSECOND=0")
+    assert second.not_before > first.not_before
+    assert recurrence.compile_rule("0 9 * * *") is recurrence.compile_rule(" 0 9 * * * ")
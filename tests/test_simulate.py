@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: fenwickxie
+date: 2026-10-19 10:02:18
+project: auto_send
+filename: test_simulate.py
+version: 1.0
+"""
+
+"""虚拟时钟模拟: 发送时间与系统时钟下的 JobEngine 一致，键盘占用冲突被找出"""
+import threading
+from datetime import datetime, time, timedelta
+
+from engine import Job, JobEngine, ONCE, WEEKLY, RULE
+from simulate import simulate
+
+START = datetime(2030, 1, 7)  # 周一
+
+
+def _jobs():
+    return [
+        Job("群A", "早", WEEKLY, days=[0, 2], send_time=time(9, 0), job_id="a"),
+        Job("群B", "通知", ONCE, scheduled_time=datetime(2030, 1, 8, 12), job_id="b"),
+        Job("群C", "提醒", RULE, scheduled_time=START, rule="0 9 * * 2", job_id="c"),
+        Job("群D", "同时", ONCE, scheduled_time=datetime(2030, 1, 7, 9), job_id="d"),
+    ]
+
+
+def _expected(jobs, start, end):
+    fires = []
+    for job in jobs:
+        fire = job.next_fire_after(start)
+        while fire is not None and fire <= end:
+            fires.append((fire, job.job_id))
+            fire = None if job.kind == ONCE else job.next_fire_after(fire)
+    return sorted(fires)
+
+
+def test_fire_times_follow_recurrences():
+    jobs = _jobs()
+    report = simulate(jobs, 7, START)
+    assert sorted((f.fire_time, f.job.job_id) for f in report.fires) == _expected(
+        jobs, START, START + timedelta(days=7)
+    )
+    # 分发时刻为发送时刻减去提前量
+    for fire in report.fires:
+        assert fire.dispatched == fire.fire_time - timedelta(seconds=fire.lead)
+    # 传入的任务不被修改
+    assert all(job.next_fire is None for job in jobs)
+
+
+def test_simultaneous_fires_conflict():
+    report = simulate(_jobs(), 7, START)
+    conflicts = report.conflicts
+    assert [(f.job.job_id, f.blocked_by) for f in conflicts] == [("d", "a")]
+    assert conflicts[0].slot.late_seconds > 0
+    assert "冲突 1 次" in report.summary()
+
+
+def test_matches_engine_under_system_clock():
+    start = datetime.now() + timedelta(seconds=0.3)
+    jobs = [
+        Job("群A", "a", ONCE, scheduled_time=start + timedelta(seconds=0.1), job_id="a"),
+        Job("群B", "b", ONCE, scheduled_time=start + timedelta(seconds=0.4), job_id="b"),
+        Job("群C", "c", RULE, scheduled_time=start, rule="* * * * *", job_id="c"),
+    ]
+    report = simulate(jobs, 1 / 1440, start)  # 一分钟
+    simulated = sorted((f.fire_time, f.job.job_id) for f in report.fires)
+
+    fired = []
+    done = threading.Event()
+
+    def on_fire(job, fire_time):
+        fired.append((fire_time, job.job_id))
+        engine.fire_done(job, fire_time)
+        if len(fired) == 2:
+            done.set()
+
+    # 提前量为 0: 分发时刻即发送时刻；分钟规则的发送在一分钟后，只比较两次一次性发送
+    engine = JobEngine(on_fire, lambda job: 0.0)
+    engine.add_jobs([Job.from_dict(job.to_dict()) for job in jobs[:2]])
+    engine.start()
+    try:
+        assert done.wait(5)
+    finally:
+        engine.stop()
+    assert sorted(fired) == [fire for fire in simulated if fire[1] != "c"]
+    assert [fire for fire in simulated if fire[1] == "c"] == [
+        (jobs[2].next_fire_after(start), "c")
+    ]